@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class BackendConfig(AppConfig):
+    name = "backend"
+
+    def ready(self):
+        from . import connections, instrumentation
+
+        connections.connect_signals()
+        instrumentation.connect_signals()
@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from .lifespan import LifespanApplication  # noqa: E402  (needs configured settings)
+
+application = LifespanApplication(django_application)
@@ -0,0 +1,35 @@
+"""Cache backends that report hits and misses to :mod:`backend.instrumentation`."""
+
+from __future__ import annotations
+
+from django.core.cache.backends import filebased, locmem, redis
+
+from . import instrumentation
+
+_MISSING = object()
+
+
+class CacheStatsMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        instrumentation.record_cache(key, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        for key in keys:
+            instrumentation.record_cache(key, key in found)
+        return found
+
+
+class FileBasedCache(CacheStatsMixin, filebased.FileBasedCache):
+    pass
+
+
+class LocMemCache(CacheStatsMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(CacheStatsMixin, redis.RedisCache):
+    pass
@@ -0,0 +1,148 @@
+"""Content-negotiated response compression.
+
+:class:`backend.middleware.CompressionMiddleware` compresses responses of at
+least ``COMPRESSION_MIN_BYTES`` with the best encoding the client accepts:
+Brotli when the ``brotli`` package is installed, otherwise gzip.  Reference
+endpoints listed in ``COMPRESSION_CACHED_VIEWS`` change rarely, so their bodies
+are compressed once at the highest level and the result is kept in the shared
+cache, keyed by a digest of the uncompressed body.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_sequence
+
+from core.services import metrics
+
+from .instrumentation import view_label
+
+try:  # pragma: no cover - exercised only where brotli is installed
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0)
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+# Levels for bodies compressed per request versus once for the cache.
+FAST_LEVELS = {"br": 4, "gzip": 6}
+CACHED_LEVELS = {"br": 11, "gzip": 9}
+
+_accept_encoding_re = _lazy_re_compile(r"\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?")
+
+
+def available_encodings() -> tuple:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an ``Accept-Encoding`` header to its q-value."""
+
+    weights: Dict[str, float] = {}
+    for part in header.split(","):
+        match = _accept_encoding_re.match(part)
+        if not match:
+            continue
+        coding, quality = match.groups()
+        try:
+            weights[coding.lower()] = float(quality) if quality is not None else 1.0
+        except ValueError:
+            continue
+    return weights
+
+
+def negotiate(header: str, encodings: Optional[tuple] = None) -> Optional[str]:
+    """Pick the preferred supported encoding, or ``None`` for identity."""
+
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for coding in encodings or available_encodings():
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    # mtime=0 keeps the output deterministic, so cached and fresh bodies agree.
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _cached_compress(body: bytes, encoding: str) -> bytes:
+    key = f"compressed:{encoding}:{hashlib.sha256(body).hexdigest()}"
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(body, encoding, CACHED_LEVELS[encoding])
+        cache.set(key, compressed, settings.COMPRESSION_CACHE_SECONDS)
+        metrics.increment("compression_cache_total", {"result": "miss"})
+    else:
+        metrics.increment("compression_cache_total", {"result": "hit"})
+    return compressed
+
+
+def _compressible(response) -> bool:
+    if response.has_header("Content-Encoding") or response.status_code < 200 or response.status_code == 206:
+        return False
+    content_type = response.get("Content-Type", "").split(";", 1)[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _weaken_etag(response) -> None:
+    # The compressed body differs byte for byte; see Django's GZipMiddleware.
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = "W/" + etag
+
+
+def compress_response(request, response):
+    """Compress ``response`` in place if the client and content allow it."""
+
+    if not _compressible(response):
+        return response
+    patch_vary_headers(response, ("Accept-Encoding",))
+    accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    # Streams are gzipped chunk by chunk; async iterators are left as they are.
+    if response.streaming and response.is_async:
+        return response
+    encoding = negotiate(accept, ("gzip",) if response.streaming else None)
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        response.streaming_content = compress_sequence(response.streaming_content)
+        del response.headers["Content-Length"]
+    else:
+        body = response.content
+        if len(body) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        if view_label(request) in settings.COMPRESSION_CACHED_VIEWS:
+            compressed = _cached_compress(body, encoding)
+        else:
+            compressed = compress(body, encoding, FAST_LEVELS[encoding])
+        if len(compressed) >= len(body):
+            return response
+        metrics.observe(
+            "http_compression_ratio", len(compressed) / len(body), {"encoding": encoding}, buckets=RATIO_BUCKETS
+        )
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+
+    _weaken_etag(response)
+    response.headers["Content-Encoding"] = encoding
+    return response
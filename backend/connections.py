@@ -0,0 +1,91 @@
+"""Connection-churn metrics and a database health endpoint.
+
+Every time Django opens a connection (or checks one out of a psycopg pool)
+``connection_created`` fires; comparing that with the number of finished
+requests shows whether persistent connections are actually being reused.
+Counters are per process.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict
+
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+
+_lock = threading.Lock()
+_opened: Counter = Counter()
+_requests = 0
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    with _lock:
+        _opened[connection.alias] += 1
+
+
+def _on_request_finished(sender, **kwargs):
+    global _requests
+    with _lock:
+        _requests += 1
+
+
+def connect_signals() -> None:
+    connection_created.connect(_on_connection_created, dispatch_uid="backend-connection-created")
+    request_finished.connect(_on_request_finished, dispatch_uid="backend-connection-requests")
+
+
+def reset_stats() -> None:
+    global _requests
+    with _lock:
+        _opened.clear()
+        _requests = 0
+
+
+def connection_stats() -> Dict[str, Any]:
+    """Per-alias opened-connection counts and connections opened per request."""
+
+    with _lock:
+        requests = _requests
+        opened = dict(_opened)
+
+    aliases: Dict[str, Any] = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        entry: Dict[str, Any] = {
+            "opened": opened.get(alias, 0),
+            "opened_per_request": round(opened.get(alias, 0) / requests, 4) if requests else None,
+            "conn_max_age": settings_dict.get("CONN_MAX_AGE", 0),
+            "health_checks": settings_dict.get("CONN_HEALTH_CHECKS", False),
+        }
+        pool = getattr(connections[alias], "pool", None) if "pool" in settings_dict.get("OPTIONS", {}) else None
+        if pool is not None:
+            entry["pool"] = pool.get_stats()
+        aliases[alias] = entry
+    return {"requests": requests, "aliases": aliases}
+
+
+def database_health(request):
+    """Run ``SELECT 1`` on every alias and report latency alongside churn stats."""
+
+    checks: Dict[str, Any] = {}
+    healthy = True
+    for alias in connections:
+        began = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            checks[alias] = {"ok": True, "latency_ms": round((time.perf_counter() - began) * 1000, 3)}
+        except Exception as exc:  # pragma: no cover - depends on the deployment
+            healthy = False
+            checks[alias] = {"ok": False, "error": str(exc)}
+
+    return JsonResponse(
+        {"healthy": healthy, "checks": checks, **connection_stats()},
+        status=200 if healthy else 503,
+    )
@@ -0,0 +1,120 @@
+"""Database connection profiles for the backend settings."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict
+
+# Applied to every new SQLite connection by the "production" profile.
+#
+# - WAL lets readers keep working while a writer (e.g. sync_aircraft_database)
+#   holds its transaction open, instead of failing with "database is locked".
+# - synchronous=NORMAL is durable under WAL except for power loss mid-checkpoint
+#   and avoids an fsync per commit.
+# - mmap_size/cache_size keep the hot pages of the airport and aircraft tables
+#   in memory; temp_store keeps sort/GROUP BY scratch space off disk.
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative = KiB, i.e. 64MiB per connection
+    "temp_store": "MEMORY",
+}
+
+# Pragmas that need write access to the file; skipped on read-only connections.
+_WRITE_PRAGMAS = {"journal_mode"}
+
+
+def sqlite_init_command(*, read_only: bool = False) -> str:
+    pragmas = [
+        f"PRAGMA {name}={value}"
+        for name, value in SQLITE_PRAGMAS.items()
+        if not (read_only and name in _WRITE_PRAGMAS)
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return ";".join(pragmas)
+
+
+def sqlite_database(
+    path: Path | str,
+    *,
+    profile: str = "production",
+    read_only: bool = False,
+    busy_timeout: float = 20.0,
+    conn_max_age: int = 0,
+) -> Dict[str, Any]:
+    """Build a ``DATABASES`` entry for the SQLite file at ``path``.
+
+    ``profile="default"`` returns Django's stock configuration.  The production
+    profile applies :data:`SQLITE_PRAGMAS` on connect, waits up to
+    ``busy_timeout`` seconds for locks, and starts write transactions with
+    ``BEGIN IMMEDIATE`` so two writers queue on the busy timeout instead of
+    deadlocking when both try to upgrade a read lock.  ``read_only`` opens the
+    file with ``mode=ro`` for replica-style aliases.  ``conn_max_age`` keeps
+    connections (and their applied pragmas) open across requests.
+    """
+
+    name = f"file:{path}?mode=ro" if read_only else path
+    database: Dict[str, Any] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": name,
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": conn_max_age != 0,
+    }
+    if profile != "production":
+        return database
+
+    options: Dict[str, Any] = {
+        "timeout": busy_timeout,
+        "init_command": sqlite_init_command(read_only=read_only),
+    }
+    if not read_only:
+        options["transaction_mode"] = "IMMEDIATE"
+    database["OPTIONS"] = options
+    return database
+
+
+def postgres_database(
+    *,
+    name: str,
+    user: str,
+    password: str,
+    host: str,
+    port: str = "5432",
+    read_only: bool = False,
+    pool: bool = True,
+    pool_min_size: int = 2,
+    pool_max_size: int = 10,
+    pool_timeout: float = 10.0,
+    conn_max_age: int = 0,
+) -> Dict[str, Any]:
+    """Build a ``DATABASES`` entry for PostgreSQL.
+
+    With ``pool`` enabled connections come from a per-process psycopg pool
+    (``pip install "psycopg[pool]"``), which already hands out only healthy
+    connections; Django requires ``CONN_MAX_AGE=0`` in that mode.  Without a
+    pool, ``conn_max_age`` enables Django's persistent connections with health
+    checks, which suits an external pooler such as PgBouncer.
+    """
+
+    options: Dict[str, Any] = {}
+    if pool:
+        options["pool"] = {
+            "min_size": pool_min_size,
+            "max_size": pool_max_size,
+            "timeout": pool_timeout,
+        }
+    if read_only:
+        options["options"] = "-c default_transaction_read_only=on"
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": name,
+        "USER": user,
+        "PASSWORD": password,
+        "HOST": host,
+        "PORT": port,
+        "CONN_MAX_AGE": 0 if pool else conn_max_age,
+        "CONN_HEALTH_CHECKS": not pool and conn_max_age != 0,
+        "OPTIONS": options,
+    }
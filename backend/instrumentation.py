@@ -0,0 +1,186 @@
+"""Per-request performance accounting.
+
+:class:`backend.middleware.RequestMetricsMiddleware` opens a
+:class:`RequestStats` for each request in a context variable.  DB time is
+collected by an ``execute_wrapper`` that :func:`connect_signals` installs on
+every connection as it opens.  The wrapper reports to the stats of whichever
+request it runs for.  Under ASGI this is the request whose ``sync_to_async``
+worker thread runs the query, because those threads inherit the request's
+context.  Cache hits and misses are counted by the backends in
+:mod:`backend.cache` and rendering time by :mod:`backend.renderers`; at the end
+of the request the totals become histograms in :mod:`core.services.metrics`,
+labelled by view.  Requests slower than ``SLOW_REQUEST_SECONDS`` are logged
+with their SQL (sampled by ``SLOW_REQUEST_SAMPLE_RATE``).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import random
+import sysconfig
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from core.services import metrics
+
+slow_request_logger = logging.getLogger("backend.slow_requests")
+
+# Cap on the SQL kept per request for the slow-request log.
+MAX_RECORDED_QUERIES = 100
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+STACK_SAMPLE_DEPTH = 10
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    serialization_time: float = 0.0
+    sql: List[Tuple[str, float]] = field(default_factory=list)
+    # Executions per SQL string (parameters are separate, so an N+1 loop
+    # repeats one string) and where the first excess repeat came from.
+    statements: "Counter[str]" = field(default_factory=Counter)
+    repeat_stacks: Dict[str, List[str]] = field(default_factory=dict)
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    began = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - began
+        stats.queries += 1
+        stats.db_time += elapsed
+        if len(stats.sql) < MAX_RECORDED_QUERIES:
+            stats.sql.append((sql, elapsed))
+        stats.statements[sql] += 1
+        if stats.statements[sql] == settings.QUERY_BUDGET_MAX_REPEATS + 1:
+            stats.repeat_stacks[sql] = _stack_sample()
+
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_SITE_PACKAGES = (sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"])
+
+
+def _is_library_internal(filename: str) -> bool:
+    if f"{os.sep}django{os.sep}db{os.sep}" in filename:
+        return True
+    return filename.startswith(_STDLIB) and not filename.startswith(_SITE_PACKAGES)
+
+
+def _stack_sample() -> List[str]:
+    """The innermost frames that led to a query, skipping the ORM and stdlib."""
+
+    frames = [
+        frame
+        for frame in traceback.extract_stack()[:-2]
+        if not _is_library_internal(frame.filename)
+    ]
+    return [f"{frame.filename}:{frame.lineno} in {frame.name}" for frame in frames[-STACK_SAMPLE_DEPTH:]]
+
+
+def record_cache(key: str, hit: bool) -> None:
+    # Only the part before the first ":" becomes a label, e.g. "aircraft-feed".
+    prefix = key.split(":", 1)[0] if ":" in key else "other"
+    metrics.increment("cache_requests_total", {"prefix": prefix, "result": "hit" if hit else "miss"})
+    stats = _current.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def record_serialization(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.serialization_time += seconds
+
+
+def _install_query_recorder(sender, connection, **kwargs):
+    # Connections are per thread and may reconnect, so guard against stacking.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def connect_signals() -> None:
+    connection_created.connect(_install_query_recorder, dispatch_uid="backend-instrumentation-queries")
+
+
+@contextmanager
+def measure() -> Iterator[RequestStats]:
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def view_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route or "unnamed"
+
+
+def finish(request, response, stats: RequestStats) -> None:
+    elapsed = time.perf_counter() - stats.started
+    view = view_label(request)
+    labels = {"view": view, "method": request.method}
+    metrics.increment("http_requests_total", {**labels, "status": str(response.status_code)})
+    metrics.observe("http_request_duration_seconds", elapsed, labels)
+    metrics.observe("http_request_db_queries", stats.queries, labels, buckets=QUERY_COUNT_BUCKETS)
+    metrics.observe("http_request_db_seconds", stats.db_time, labels)
+    metrics.observe("http_request_serialization_seconds", stats.serialization_time, labels)
+    if not response.streaming:
+        metrics.observe("http_response_bytes", len(response.content), labels, buckets=BYTES_BUCKETS)
+    if stats.cache_hits or stats.cache_misses:
+        metrics.observe(
+            "http_request_cache_hit_ratio",
+            stats.cache_hits / (stats.cache_hits + stats.cache_misses),
+            labels,
+            buckets=(0.0, 0.25, 0.5, 0.75, 1.0),
+        )
+
+    if elapsed >= settings.SLOW_REQUEST_SECONDS and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE:
+        slowest = sorted(stats.sql, key=lambda item: item[1], reverse=True)
+        slow_request_logger.warning(
+            "Slow request %s %s (%s): %.3fs, %d queries in %.3fs, cache %d hit/%d miss, "
+            "serialization %.3fs\n%s",
+            request.method,
+            request.get_full_path(),
+            view,
+            elapsed,
+            stats.queries,
+            stats.db_time,
+            stats.cache_hits,
+            stats.cache_misses,
+            stats.serialization_time,
+            "\n".join(f"  {duration * 1000:8.2f}ms  {sql}" for sql, duration in slowest),
+        )
@@ -0,0 +1,64 @@
+"""ASGI lifespan support for background work tied to the server process."""
+
+from __future__ import annotations
+
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LifespanApplication:
+    """Wrap the Django ASGI app and answer ``lifespan`` events.
+
+    Django's own handler rejects lifespan scopes.  On startup this starts the
+    cache refresh scheduler in a daemon thread when
+    ``REFRESH_SCHEDULER_IN_PROCESS`` is enabled and lets the async feed pool
+    its HTTP clients on the server's loop; on shutdown it stops the scheduler
+    and closes those clients.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self._scheduler = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.application(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                from core.services.async_feed import enable_pooling
+
+                enable_pooling()
+                try:
+                    self.startup()
+                except Exception as exc:  # pragma: no cover - reported to the server
+                    logger.exception("Lifespan startup failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                from core.services.async_feed import aclose_clients
+
+                await aclose_clients()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def startup(self) -> None:
+        if not settings.REFRESH_SCHEDULER_IN_PROCESS:
+            return
+        from core.services.scheduler import start_in_background
+
+        self._scheduler = start_in_background()
+
+    def shutdown(self) -> None:
+        if self._scheduler is None:
+            return
+        thread, stop = self._scheduler
+        stop.set()
+        thread.join(timeout=5)
+        self._scheduler = None
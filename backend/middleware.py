@@ -0,0 +1,137 @@
+"""Project-level middleware."""
+
+from __future__ import annotations
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+from . import compression, instrumentation, query_budget
+from .routers import STICKY_COOKIE, RoutingState, routing_state, sticky_cache_key
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class DatabaseRoutingMiddleware:
+    """Scope :class:`backend.routers.ReadReplicaRouter` decisions to one request.
+
+    After a request that wrote to the database the client is pinned to the
+    primary for ``DATABASE_REPLICA_STICKY_SECONDS`` so it reads its own writes
+    even if the replica lags.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _state_for(self, request) -> RoutingState:
+        return RoutingState(
+            request=request,
+            safe_method=request.method in SAFE_METHODS,
+            sticky_cookie=STICKY_COOKIE in request.COOKIES,
+        )
+
+    def _finish(self, request, response, state: RoutingState):
+        if not state.wrote:
+            return response
+        window = settings.DATABASE_REPLICA_STICKY_SECONDS
+        if window <= 0:
+            return response
+        response.set_cookie(STICKY_COOKIE, "1", max_age=window, httponly=True, samesite="Lax")
+        user = getattr(request, "user", None)
+        if getattr(user, "is_authenticated", False):
+            # Token-authenticated clients may not keep cookies; pin the user too.
+            cache.set(sticky_cache_key(user.pk), True, window)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_state(self._state_for(request)) as state:
+            response = self.get_response(request)
+        return self._finish(request, response, state)
+
+    async def __acall__(self, request):
+        with routing_state(self._state_for(request)) as state:
+            response = await self.get_response(request)
+        return self._finish(request, response, state)
+
+
+class RequestMetricsMiddleware:
+    """Record wall, DB, cache and serialization figures for every request.
+
+    See :mod:`backend.instrumentation`; the totals are served at ``/metrics``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with instrumentation.measure() as stats:
+            response = self.get_response(request)
+            instrumentation.finish(request, response, stats)
+        return response
+
+    async def __acall__(self, request):
+        with instrumentation.measure() as stats:
+            response = await self.get_response(request)
+            instrumentation.finish(request, response, stats)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Enforce view query budgets; see :mod:`backend.query_budget`.
+
+    Must sit inside :class:`RequestMetricsMiddleware`, which counts the queries.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        query_budget.check(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        query_budget.check(request, response)
+        return response
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip or Brotli; see :mod:`backend.compression`."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compression.compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compression.compress_response(request, await self.get_response(request))
@@ -0,0 +1,81 @@
+"""Per-action query budgets for API views.
+
+A view declares the most queries each action may run::
+
+    class AirportViewSet(viewsets.ModelViewSet):
+        query_budgets = {"list": 4, "retrieve": 4}
+
+:class:`QueryBudgetMiddleware` compares every response against its budget and
+also flags any SQL statement executed more than ``QUERY_BUDGET_MAX_REPEATS``
+times in one request, the signature of an N+1 loop.  ``QUERY_BUDGET_MODE``
+decides what happens to a violation: ``"raise"`` (the test runner's default)
+raises :class:`QueryBudgetExceeded`, ``"log"`` logs it with a stack sample
+from the repeated query, ``"off"`` skips the checks.  Budgets count every
+query in the request, authentication lookups included, and under ASGI the
+queries of the ``sync_to_async`` thread running the view.  Actions that repeat
+statements on purpose, such as batched imports, can lift the repeat limit::
+
+        query_repeat_limits = {"import_logbook": None}
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import List, Optional
+
+from django.conf import settings
+
+from . import instrumentation
+
+logger = logging.getLogger("backend.query_budget")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in ``"raise"`` mode when a response breaks its query budget."""
+
+
+def view_action(request) -> Optional[tuple]:
+    """``(view class, action name)`` for the view that handled ``request``."""
+
+    match = getattr(request, "resolver_match", None)
+    func = getattr(match, "func", None)
+    view_class = getattr(func, "cls", None) or getattr(func, "view_class", None)
+    if view_class is None:
+        return None
+    actions = getattr(func, "actions", None) or {}
+    return view_class, actions.get(request.method.lower(), request.method.lower())
+
+
+def violations(request, stats: instrumentation.RequestStats) -> List[str]:
+    problems = []
+    limit = settings.QUERY_BUDGET_MAX_REPEATS
+    handled = view_action(request)
+    if handled is not None:
+        view_class, action = handled
+        budget = getattr(view_class, "query_budgets", {}).get(action)
+        if budget is not None and stats.queries > budget:
+            problems.append(
+                f"{view_class.__name__}.{action} ran {stats.queries} queries; its budget is {budget}."
+            )
+        limit = getattr(view_class, "query_repeat_limits", {}).get(action, limit)
+    if limit is None:
+        return problems
+    for sql, count in stats.statements.items():
+        if count > limit:
+            stack = "\n".join(f"    {frame}" for frame in stats.repeat_stacks.get(sql, []))
+            problems.append(f"Repeated {count} times (limit {limit}): {sql}\n{stack}")
+    return problems
+
+
+def check(request, response) -> None:
+    mode = settings.QUERY_BUDGET_MODE
+    stats = instrumentation.current_stats()
+    if mode == "off" or stats is None:
+        return
+    problems = violations(request, stats)
+    if not problems:
+        return
+    message = f"Query budget exceeded for {request.method} {request.get_full_path()}:\n" + "\n".join(problems)
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
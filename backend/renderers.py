@@ -0,0 +1,219 @@
+"""DRF renderers used by the API."""
+
+from __future__ import annotations
+
+import csv
+import io
+import struct
+import time
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+from . import instrumentation
+
+try:  # pragma: no cover - exercised only where orjson is installed
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:  # pragma: no cover - exercised only where msgpack is installed
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+# Key order is kept as is; datetimes go through DRF's encoder so they are
+# formatted exactly like the stdlib path.
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS
+    if orjson is not None
+    else 0
+)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """:class:`JSONRenderer` that reports its time as request serialization time."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        began = time.perf_counter()
+        try:
+            return self.encode(data, accepted_media_type, renderer_context)
+        finally:
+            instrumentation.record_serialization(time.perf_counter() - began)
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONRenderer(TimedJSONRenderer):
+    """:class:`TimedJSONRenderer` that encodes with ``orjson`` when it is installed.
+
+    Output matches :class:`JSONRenderer` byte for byte for API payloads
+    (compact, UTF-8, ``\\u2028``/``\\u2029`` escaped, DRF's date and decimal
+    formatting).  Indented output, ``UNICODE_JSON=False`` and anything orjson
+    cannot encode (e.g. integers beyond 64 bits) use the stdlib path.  Floats in
+    exponent notation are spelled ``1e16`` rather than ``1e+16``.  NaN and
+    infinities are written as ``null``, where DRF's strict mode raises
+    ``ValueError``.  Finding them first would mean walking every payload in
+    Python, so code that can produce them (e.g. ``spot_traffic``) must map
+    them to ``None`` itself.
+    """
+
+    def encode(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type or "", renderer_context or {})
+        ):
+            return super().encode(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().encode(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, keeping the output a valid JS literal.
+        return rendered.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+def render_json(data) -> bytes:
+    """Encode ``data`` as the API's JSON renderer would, for plain Django views."""
+
+    return FastJSONRenderer().render(data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Render one JSON document per line: each of ``results`` or the whole payload.
+
+    Large unlimited responses are streamed in this format by
+    :mod:`core.services.feed_stream` instead of going through a renderer.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data["results"] if isinstance(data, dict) and "results" in data else [data]
+        return b"".join(render_json(row) + b"\n" for row in rows)
+
+
+class CSVRenderer(BaseRenderer):
+    """Render a list of flat objects (or a single one) as CSV with a header row.
+
+    Large exports stream CSV themselves; this covers everything else an
+    endpoint offering CSV may answer with, such as error details.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+
+_UINT_FORMATS = ((0xCC, ">B"), (0xCD, ">H"), (0xCE, ">I"), (0xCF, ">Q"))
+_INT_FORMATS = ((0xD0, ">b"), (0xD1, ">h"), (0xD2, ">i"), (0xD3, ">q"))
+
+
+def _pack(obj, out: bytearray, default) -> None:
+    # Smallest encoding for each value, as msgpack.packb(use_bin_type=True).
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True or obj is False:
+        out.append(0xC3 if obj else 0xC2)
+    elif isinstance(obj, int):
+        if -0x20 <= obj < 0x80:
+            out += struct.pack(">b", obj)
+            return
+        for tag, fmt in _UINT_FORMATS if obj >= 0 else _INT_FORMATS:
+            try:
+                packed = struct.pack(fmt, obj)
+            except struct.error:
+                continue
+            out.append(tag)
+            out += packed
+            return
+        raise OverflowError("Integer value out of range for MessagePack")
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        encoded = obj.encode("utf-8")
+        _pack_header(out, len(encoded), fix=(0xA0, 32), sized=((0xD9, ">B"), (0xDA, ">H"), (0xDB, ">I")))
+        out += encoded
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        _pack_header(out, len(data), fix=None, sized=((0xC4, ">B"), (0xC5, ">H"), (0xC6, ">I")))
+        out += data
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(out, len(obj), fix=(0x90, 16), sized=((0xDC, ">H"), (0xDD, ">I")))
+        for item in obj:
+            _pack(item, out, default)
+    elif isinstance(obj, dict):
+        _pack_header(out, len(obj), fix=(0x80, 16), sized=((0xDE, ">H"), (0xDF, ">I")))
+        for key, value in obj.items():
+            _pack(key, out, default)
+            _pack(value, out, default)
+    else:
+        _pack(default(obj), out, default)
+
+
+def _pack_header(out: bytearray, length: int, *, fix, sized) -> None:
+    if fix is not None and length < fix[1]:
+        out.append(fix[0] | length)
+        return
+    for tag, fmt in sized:
+        if length < 1 << (8 * struct.calcsize(fmt)):
+            out.append(tag)
+            out += struct.pack(fmt, length)
+            return
+    raise ValueError("Object too large for MessagePack")
+
+
+def packb(data, default=None) -> bytes:
+    """Encode ``data`` as MessagePack, with the ``msgpack`` package if installed.
+
+    Values MessagePack has no type for go through ``default`` (DRF's JSON
+    encoder unless given), so dates and decimals look the same as in JSON.
+    """
+
+    default = default or encoders.JSONEncoder().default
+    if msgpack is not None:
+        return msgpack.packb(data, default=default, use_bin_type=True)
+    out = bytearray()
+    _pack(data, out, default)
+    return bytes(out)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render responses as MessagePack for ``Accept: application/msgpack``.
+
+    Maps keep the serializer's field order, so every response of one endpoint
+    lists its keys in the same order and clients can decode positionally.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        began = time.perf_counter()
+        try:
+            return packb(data)
+        finally:
+            instrumentation.record_serialization(time.perf_counter() - began)
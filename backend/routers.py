@@ -0,0 +1,131 @@
+"""Database routing between the primary and the read replica.
+
+Reads are only sent to ``DATABASE_READ_ALIAS`` inside a request handled by
+:class:`backend.middleware.DatabaseRoutingMiddleware`, and only when it is safe:
+
+- the request uses a safe HTTP method;
+- nothing has been written during the request (read-after-write stays on the
+  primary);
+- the client has not written recently.  After a write the middleware marks the
+  client "sticky" for ``DATABASE_REPLICA_STICKY_SECONDS`` (a cookie plus a
+  per-user cache key) so, for example, the ``/seen/`` list fetched right after
+  logging an aircraft is not served from a replica that has yet to catch up.
+
+Management commands, shells and background threads always use the primary.
+"""
+
+from __future__ import annotations
+
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = "db_primary_sticky"
+ROUTED_APPS = {"core"}
+
+
+def sticky_cache_key(user_id: Any) -> str:
+    return f"db-primary-sticky:{user_id}"
+
+
+@dataclass
+class RoutingState:
+    request: Any = None
+    safe_method: bool = False
+    sticky_cookie: bool = False
+    wrote: bool = False
+    _sticky_user: Optional[bool] = field(default=None, repr=False)
+
+    def user_is_sticky(self) -> bool:
+        if self._sticky_user is None:
+            user = getattr(self.request, "user", None)
+            user_id = getattr(user, "pk", None) if getattr(user, "is_authenticated", False) else None
+            self._sticky_user = bool(user_id and cache.get(sticky_cache_key(user_id)))
+        return self._sticky_user
+
+    def can_use_replica(self) -> bool:
+        return (
+            self.safe_method
+            and not self.wrote
+            and not self.sticky_cookie
+            and not self.user_is_sticky()
+        )
+
+
+_state: contextvars.ContextVar[Optional[RoutingState]] = contextvars.ContextVar(
+    "db_routing_state", default=None
+)
+
+
+def current_state() -> Optional[RoutingState]:
+    return _state.get()
+
+
+@contextmanager
+def routing_state(state: RoutingState) -> Iterator[RoutingState]:
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def _location(alias: str) -> tuple:
+    settings_dict = connections[alias].settings_dict
+    return tuple(str(settings_dict.get(key) or "") for key in ("HOST", "PORT", "NAME"))
+
+
+def replica_alias() -> Optional[str]:
+    """The configured read alias, or ``None`` when it is just the primary again.
+
+    A replica counts as the primary when its ``HOST``, ``PORT`` and ``NAME``
+    all match the primary's, as with the test runner's ``TEST["MIRROR"]``.
+    Reading through a mirror's second connection would only lose sight of
+    the test's uncommitted rows.  Any difference counts as a replica: a
+    Postgres replica on another host may keep the primary's database name,
+    and the default SQLite replica opens the same file through a read-only
+    ``file:...?mode=ro`` URI.
+    """
+
+    alias = getattr(settings, "DATABASE_READ_ALIAS", DEFAULT_DB_ALIAS)
+    if alias == DEFAULT_DB_ALIAS or alias not in connections.settings:
+        return None
+    if _location(alias) == _location(DEFAULT_DB_ALIAS):
+        return None
+    return alias
+
+
+class ReadReplicaRouter:
+    """Send safe, write-free request reads of ``core`` models to the replica."""
+
+    def db_for_read(self, model, **hints):
+        state = current_state()
+        if state is None or model._meta.app_label not in ROUTED_APPS:
+            return None
+        alias = replica_alias()
+        if alias and state.can_use_replica():
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current_state()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, getattr(settings, "DATABASE_READ_ALIAS", DEFAULT_DB_ALIAS)}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary; it is never migrated directly.
+        if db != DEFAULT_DB_ALIAS and db == getattr(settings, "DATABASE_READ_ALIAS", None):
+            return False
+        return None
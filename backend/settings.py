@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
+
+from .db import postgres_database, sqlite_database
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,16 +43,21 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "corsheaders",
+    "backend",
     "core",
 ]
 
 MIDDLEWARE = [
+    "backend.middleware.RequestMetricsMiddleware",  # outermost, so it times everything
+    "backend.middleware.QueryBudgetMiddleware",
+    "backend.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",  # must be near the top
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "backend.middleware.DatabaseRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -77,12 +85,74 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# DATABASE_ENGINE=sqlite (the default) or postgres.
+#
+# SQLITE_PROFILE=production (the default) enables WAL, connection pragmas and a
+# busy timeout (see backend/db.py); SQLITE_PROFILE=default keeps Django's stock
+# SQLite behaviour. The "replica" alias is a read-only connection that
+# backend.routers.ReadReplicaRouter uses for safe requests to the core API. It
+# opens the same file unless SQLITE_REPLICA_PATH points at a separate copy.
+#
+# DB_CONN_MAX_AGE keeps connections open between requests (with health checks)
+# so requests do not pay to connect. With POSTGRES_POOL=1 each process instead
+# draws from a psycopg connection pool sized by POSTGRES_POOL_MIN/MAX_SIZE.
+DATABASE_ENGINE = os.getenv("DATABASE_ENGINE", "sqlite")
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "300"))
+
+if DATABASE_ENGINE == "postgres":
+    _postgres = {
+        "name": os.getenv("POSTGRES_DB", "planespotter"),
+        "user": os.getenv("POSTGRES_USER", "planespotter"),
+        "password": os.getenv("POSTGRES_PASSWORD", ""),
+        "port": os.getenv("POSTGRES_PORT", "5432"),
+        "pool": os.getenv("POSTGRES_POOL", "1") == "1",
+        "pool_min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2")),
+        "pool_max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")),
+        "pool_timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", "10")),
+        "conn_max_age": DB_CONN_MAX_AGE,
     }
-}
+    _postgres_host = os.getenv("POSTGRES_HOST", "localhost")
+    DATABASES = {
+        "default": postgres_database(host=_postgres_host, **_postgres),
+        "replica": {
+            **postgres_database(
+                host=os.getenv("POSTGRES_REPLICA_HOST", _postgres_host),
+                read_only=True,
+                **{**_postgres, "name": os.getenv("POSTGRES_REPLICA_DB", _postgres["name"])},
+            ),
+            "TEST": {"MIRROR": "default"},
+        },
+    }
+else:
+    SQLITE_PATH = os.getenv("SQLITE_PATH", str(BASE_DIR / "db.sqlite3"))
+    SQLITE_REPLICA_PATH = os.getenv("SQLITE_REPLICA_PATH", SQLITE_PATH)
+    SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+    SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "20"))
+
+    DATABASES = {
+        "default": sqlite_database(
+            SQLITE_PATH,
+            profile=SQLITE_PROFILE,
+            busy_timeout=SQLITE_BUSY_TIMEOUT,
+            conn_max_age=DB_CONN_MAX_AGE,
+        ),
+        "replica": {
+            **sqlite_database(
+                SQLITE_REPLICA_PATH,
+                profile=SQLITE_PROFILE,
+                read_only=True,
+                busy_timeout=SQLITE_BUSY_TIMEOUT,
+                conn_max_age=DB_CONN_MAX_AGE,
+            ),
+            "TEST": {"MIRROR": "default"},
+        },
+    }
+DATABASE_ROUTERS = ["backend.routers.ReadReplicaRouter"]
+# Set DATABASE_READ_ALIAS=default to turn replica reads off entirely.
+DATABASE_READ_ALIAS = os.getenv("DATABASE_READ_ALIAS", "replica")
+# How long a client that wrote keeps reading from the primary; set it above the
+# replica's worst expected replication lag.
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv("DATABASE_REPLICA_STICKY_SECONDS", "5"))
 
 
 # Password validation
@@ -136,7 +206,68 @@ CORS_ALLOW_ALL_ORIGINS = True  # ⚠️ Dev only! Lock down in production.
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "backend.renderers.FastJSONRenderer",
+        "backend.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+}
+
+
+# Request instrumentation (see backend.instrumentation). Requests slower than
+# SLOW_REQUEST_SECONDS log their SQL; SLOW_REQUEST_SAMPLE_RATE is the fraction
+# of those that are logged.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "1.0"))
+# Query budgets (see backend.query_budget): "log" in production, "raise" under
+# the test runner (backend.test_runner), or "off".
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+QUERY_BUDGET_MAX_REPEATS = int(os.getenv("QUERY_BUDGET_MAX_REPEATS", "3"))
+TEST_RUNNER = "backend.test_runner.QueryBudgetTestRunner"
+# Comma-separated client addresses allowed to read /metrics. Loopback only by
+# default; list the scraper's address to widen it (empty allows nobody).
+METRICS_ALLOWED_IPS = tuple(
+    ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()
+)
+
+# Response compression (see backend.compression). Bodies smaller than
+# COMPRESSION_MIN_BYTES are sent as they are; the reference views listed in
+# COMPRESSION_CACHED_VIEWS are compressed once and kept in the cache.
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_CACHED_VIEWS = tuple(
+    name.strip()
+    for name in os.getenv(
+        "COMPRESSION_CACHED_VIEWS",
+        "airport-list,airport-detail,frequency-list,aircraft-list,badge-list",
+    ).split(",")
+    if name.strip()
+)
+COMPRESSION_CACHE_SECONDS = int(os.getenv("COMPRESSION_CACHE_SECONDS", "3600"))
+
+
+# Cache shared by every worker process. CACHE_BACKEND=file (the default) keeps
+# entries under CACHE_LOCATION on local disk; CACHE_BACKEND=redis points at a
+# Redis-compatible server (CACHE_LOCATION=redis://host:6379/0, needs redis-py);
+# CACHE_BACKEND=locmem is per-process and only suitable for a single worker.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+# The backend.cache classes add hit/miss counting (see backend.instrumentation).
+_cache_backends = {
+    "file": "backend.cache.FileBasedCache",
+    "redis": "backend.cache.RedisCache",
+    "locmem": "backend.cache.LocMemCache",
+}
+CACHES = {
+    "default": {
+        "BACKEND": _cache_backends[CACHE_BACKEND],
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION",
+            "redis://127.0.0.1:6379/0"
+            if CACHE_BACKEND == "redis"
+            else os.path.join(tempfile.gettempdir(), "planespotter-cache"),
+        ),
+        "TIMEOUT": 300,
+    }
 }
 
 
@@ -147,4 +278,94 @@ AIRCRAFT_FEED_URL = os.getenv(
 )
 AIRCRAFT_FEED_TIMEOUT = int(os.getenv("AIRCRAFT_FEED_TIMEOUT", "15"))
 AIRCRAFT_FEED_CACHE_SECONDS = int(os.getenv("AIRCRAFT_FEED_CACHE_SECONDS", "900"))
+# Stale copies are served for this long past expiry while one worker refreshes.
+AIRCRAFT_FEED_STALE_SECONDS = int(os.getenv("AIRCRAFT_FEED_STALE_SECONDS", "3600"))
+# Fraction by which each entry's freshness is randomly spread (0.1 = ±10%).
+AIRCRAFT_FEED_CACHE_JITTER = float(os.getenv("AIRCRAFT_FEED_CACHE_JITTER", "0.1"))
+# Upper bound on one refresh; a crashed refresher's lock expires after this.
+AIRCRAFT_FEED_LOCK_SECONDS = int(os.getenv("AIRCRAFT_FEED_LOCK_SECONDS", "60"))
+
+# Airport reference list (see core.services.airports)
+AIRPORT_REFERENCE_CACHE_SECONDS = int(os.getenv("AIRPORT_REFERENCE_CACHE_SECONDS", "3600"))
+# How often each worker checks whether another one changed airports and its
+# in-memory autocomplete index needs rebuilding (see core.services.airport_autocomplete).
+AIRPORT_AUTOCOMPLETE_CHECK_SECONDS = float(os.getenv("AIRPORT_AUTOCOMPLETE_CHECK_SECONDS", "5"))
+
+# Live aircraft passing spotting locations (see core.services.spot_traffic).
+# State vectors are polled from LIVE_TRAFFIC_URL at most every
+# LIVE_TRAFFIC_POLL_SECONDS; an aircraft is incoming when, holding its speed
+# and track, it comes within LIVE_TRAFFIC_RADIUS_KM of a spot within
+# LIVE_TRAFFIC_HORIZON_SECONDS.
+LIVE_TRAFFIC_URL = os.getenv("LIVE_TRAFFIC_URL", "https://opensky-network.org/api/states/all")
+LIVE_TRAFFIC_TIMEOUT = int(os.getenv("LIVE_TRAFFIC_TIMEOUT", "15"))
+LIVE_TRAFFIC_POLL_SECONDS = int(os.getenv("LIVE_TRAFFIC_POLL_SECONDS", "15"))
+LIVE_TRAFFIC_STALE_SECONDS = int(os.getenv("LIVE_TRAFFIC_STALE_SECONDS", "120"))
+LIVE_TRAFFIC_HORIZON_SECONDS = int(os.getenv("LIVE_TRAFFIC_HORIZON_SECONDS", "600"))
+LIVE_TRAFFIC_RADIUS_KM = float(os.getenv("LIVE_TRAFFIC_RADIUS_KM", "3"))
+
+# Background cache refresh (see core.services.scheduler). Jobs run once a cache
+# entry has lived REFRESH_SCHEDULER_LEAD of its TTL; failures back off
+# exponentially from REFRESH_SCHEDULER_BACKOFF_SECONDS up to the maximum.
+REFRESH_SCHEDULER_IN_PROCESS = os.getenv("REFRESH_SCHEDULER_IN_PROCESS", "0") == "1"
+REFRESH_SCHEDULER_LEAD = float(os.getenv("REFRESH_SCHEDULER_LEAD", "0.8"))
+REFRESH_SCHEDULER_JITTER = float(os.getenv("REFRESH_SCHEDULER_JITTER", "0.1"))
+REFRESH_SCHEDULER_BACKOFF_SECONDS = int(os.getenv("REFRESH_SCHEDULER_BACKOFF_SECONDS", "30"))
+REFRESH_SCHEDULER_MAX_BACKOFF_SECONDS = int(os.getenv("REFRESH_SCHEDULER_MAX_BACKOFF_SECONDS", "900"))
 AIRCRAFT_FEED_MAX_RESULTS = int(os.getenv("AIRCRAFT_FEED_MAX_RESULTS", "200"))
+# Pooled upstream connections per event loop for the async feed client.
+AIRCRAFT_FEED_MAX_CONNECTIONS = int(os.getenv("AIRCRAFT_FEED_MAX_CONNECTIONS", "20"))
+# Circuit breaker: after this many consecutive feed failures, skip the feed for
+# AIRCRAFT_FEED_BREAKER_RESET_SECONDS before letting a single probe through.
+AIRCRAFT_FEED_BREAKER_FAILURES = int(os.getenv("AIRCRAFT_FEED_BREAKER_FAILURES", "5"))
+AIRCRAFT_FEED_BREAKER_RESET_SECONDS = int(os.getenv("AIRCRAFT_FEED_BREAKER_RESET_SECONDS", "60"))
+# Answer from cached/bundled data if the feed takes longer than this (0 = wait
+# for AIRCRAFT_FEED_TIMEOUT); the download still completes into the cache.
+AIRCRAFT_FEED_HEDGE_SECONDS = float(os.getenv("AIRCRAFT_FEED_HEDGE_SECONDS", "0"))
+# CSVs merged by registration when syncing the aircraft table, as comma-separated
+# name=location pairs (a URL or local path) in order of precedence, e.g.
+# "opensky=https://...,ginfo=/srv/data/g-info.csv". Empty syncs AIRCRAFT_FEED_URL
+# alone. AIRCRAFT_FEED_FIELD_PRECEDENCE reorders sources for single fields, e.g.
+# "operator=ginfo>opensky,owner=ginfo>opensky".
+AIRCRAFT_FEED_SOURCES = tuple(
+    tuple(part.strip() for part in pair.split("=", 1))
+    for pair in os.getenv("AIRCRAFT_FEED_SOURCES", "").split(",")
+    if "=" in pair
+)
+AIRCRAFT_FEED_FIELD_PRECEDENCE = {
+    field.strip(): tuple(name.strip() for name in names.split(">") if name.strip())
+    for field, names in (
+        pair.split("=", 1) for pair in os.getenv("AIRCRAFT_FEED_FIELD_PRECEDENCE", "").split(",") if "=" in pair
+    )
+}
+# Rows each source sorts in memory before spilling a run to AIRCRAFT_FEED_SORT_DIR
+# (default: the system temporary directory) while merging sources.
+AIRCRAFT_FEED_SORT_RUN_ROWS = int(os.getenv("AIRCRAFT_FEED_SORT_RUN_ROWS", "200000"))
+AIRCRAFT_FEED_SORT_DIR = os.getenv("AIRCRAFT_FEED_SORT_DIR") or None
+# Feed rows written per batch by sync_aircraft_database.
+AIRCRAFT_SYNC_BATCH_SIZE = int(os.getenv("AIRCRAFT_SYNC_BATCH_SIZE", "2000"))
+
+
+# Spotting photo derivatives (see core.services.photo_derivatives)
+PHOTO_DERIVATIVE_WIDTHS = tuple(
+    int(width)
+    for width in os.getenv("PHOTO_DERIVATIVE_WIDTHS", "320,800,1600").split(",")
+    if width.strip()
+)
+PHOTO_DERIVATIVE_FORMATS = ("webp", "jpeg")
+PHOTO_DERIVATIVE_QUALITY = int(os.getenv("PHOTO_DERIVATIVE_QUALITY", "82"))
+PHOTO_DERIVATIVE_WORKERS = int(os.getenv("PHOTO_DERIVATIVE_WORKERS", "2"))
+PHOTO_DERIVATIVES_ASYNC = os.getenv("PHOTO_DERIVATIVES_ASYNC", "1") == "1"
+# Maximum dHash Hamming distance treated as a near-duplicate. The banded index in
+# core.services.photo_store only guarantees candidates up to a distance of 3.
+PHOTO_NEAR_DUPLICATE_DISTANCE = int(os.getenv("PHOTO_NEAR_DUPLICATE_DISTANCE", "3"))
+
+# Resumable photo uploads (see core.services.photo_uploads)
+PHOTO_UPLOAD_TEMP_DIR = os.getenv("PHOTO_UPLOAD_TEMP_DIR", os.path.join(BASE_DIR, "upload_tmp"))
+PHOTO_UPLOAD_MAX_BYTES = int(os.getenv("PHOTO_UPLOAD_MAX_BYTES", str(64 * 1024 * 1024)))
+PHOTO_UPLOAD_EXPIRY_HOURS = int(os.getenv("PHOTO_UPLOAD_EXPIRY_HOURS", "24"))
+
+# Logbook export and import (see core.services.logbook): rows fetched per
+# database round trip while exporting, and lines resolved and inserted per batch
+# while importing.
+LOGBOOK_EXPORT_CHUNK_SIZE = int(os.getenv("LOGBOOK_EXPORT_CHUNK_SIZE", "2000"))
+LOGBOOK_IMPORT_BATCH_SIZE = int(os.getenv("LOGBOOK_IMPORT_BATCH_SIZE", "1000"))
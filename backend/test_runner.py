@@ -0,0 +1,37 @@
+"""Test runner that turns query-budget violations into test failures.
+
+It also gives each run a cache of its own in a temporary directory, so the
+tests' ``cache.clear()`` calls never touch a development server's cache and
+concurrent runs do not see each other's entries.
+"""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_MODE = "raise"
+        self.cache_dir = tempfile.mkdtemp(prefix="planespotter-test-cache-")
+        self.cache_settings = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "backend.cache.FileBasedCache",
+                    "LOCATION": self.cache_dir,
+                    "TIMEOUT": 300,
+                }
+            }
+        )
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
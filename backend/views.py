@@ -0,0 +1,32 @@
+"""Project-level operational endpoints."""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from core.services import metrics
+
+from .connections import connection_stats
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _connection_gauges() -> str:
+    stats = connection_stats()
+    lines = ["# TYPE db_connections_opened_total counter"]
+    for alias, entry in stats["aliases"].items():
+        lines.append(f'db_connections_opened_total{{alias="{alias}"}} {entry["opened"]}')
+    return "\n".join(lines) + "\n"
+
+
+def prometheus_metrics(request):
+    """Expose this process's metrics in the Prometheus text format.
+
+    Series are per process; with several workers scrape each one (or run a
+    single worker per target) rather than behind a load balancer.
+    """
+
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render_prometheus() + _connection_gauges(), content_type=PROMETHEUS_CONTENT_TYPE)
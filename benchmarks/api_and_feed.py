@@ -0,0 +1,315 @@
+"""Benchmark the feed pipeline and the API against synthetic data.
+
+For each fleet size a child process gets a throwaway SQLite database and file
+cache, writes an OpenSky-format CSV of that many rows and serves it from a
+local HTTP stub, then measures:
+
+- ``fetch_live_fleet`` latency, uncached (full download and parse) and cached;
+- ``sync_aircraft_database`` throughput in rows per second;
+- requests per second and latency for the API endpoints under concurrent load,
+  with synthetic spotters holding large ``UserSeen`` logbooks and a large forum.
+
+Results are printed as JSON and optionally written to ``--output``, so runs on
+two commits can be compared with ``--compare``::
+
+    python benchmarks/api_and_feed.py --rows 10000 100000 --output before.json
+    python benchmarks/api_and_feed.py --rows 10000 100000 --compare before.json
+
+The 1M-row fleet works too but the sync alone takes a while.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import functools
+import http.server
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+ENDPOINTS = ["/api/airports/", "/api/aircraft/", "/api/seen/", "/api/posts/"]
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summary(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 3) if samples else None,
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 3) if samples else None,
+        "max_ms": round(max(samples) * 1000, 3) if samples else None,
+    }
+
+
+class _QuietFileHandler(http.server.SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(server) -> str:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def start_feed_stub(directory: Path, latency: float) -> http.server.ThreadingHTTPServer:
+    handler = type("FeedStubHandler", (_QuietFileHandler,), {"latency": latency})
+    return http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(handler, directory=str(directory))
+    )
+
+
+def load_test(url: str, *, concurrency: int, duration: float, token: str) -> dict:
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+        # Every worker completes at least one request, however slow.
+        while True:
+            began = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                with lock:
+                    latencies.append(time.perf_counter() - began)
+            except (urllib.error.URLError, OSError) as exc:
+                with lock:
+                    errors.append(str(exc))
+            if time.perf_counter() >= deadline:
+                return
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    return {
+        "requests_per_second": round(len(latencies) / elapsed, 2),
+        "errors": len(errors),
+        "latency": _summary(latencies),
+    }
+
+
+def run_workload(args) -> dict:
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+    import django
+
+    django.setup()
+
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from core.models import Aircraft
+    from core.services import fetch_live_fleet, sync_aircraft_database
+
+    from synthetic import create_forum, create_logbooks, write_fleet_csv
+
+    workdir = Path(os.environ["BENCH_WORKDIR"])
+    write_fleet_csv(workdir / "fleet.csv", args.rows)
+    stub = start_feed_stub(workdir, args.stub_latency)
+    feed_url = f"{_serve(stub)}/fleet.csv"
+
+    call_command("migrate", verbosity=0)
+
+    uncached, cached = [], []
+    for _ in range(args.repeats):
+        cache.clear()
+        began = time.perf_counter()
+        records = fetch_live_fleet(url=feed_url)
+        uncached.append(time.perf_counter() - began)
+    for _ in range(args.repeats * 10):
+        began = time.perf_counter()
+        fetch_live_fleet(url=feed_url)
+        cached.append(time.perf_counter() - began)
+
+    cache.clear()
+    began = time.perf_counter()
+    with override_settings(AIRCRAFT_FEED_URL=feed_url):
+        sync = sync_aircraft_database(use_cache=False)
+    sync_seconds = time.perf_counter() - began
+
+    people = create_logbooks(args.users, args.logbook_size)
+    create_forum(args.posts, args.comments, people[0])
+    token = str(RefreshToken.for_user(people[0]).access_token)
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(get_wsgi_application())
+    base_url = _serve(server)
+    api = {
+        endpoint: load_test(
+            f"{base_url}{endpoint}", concurrency=args.concurrency, duration=args.duration, token=token
+        )
+        for endpoint in args.endpoints
+    }
+    server.shutdown()
+    stub.shutdown()
+
+    return {
+        "rows": args.rows,
+        "feed": {
+            "records": len(records),
+            "uncached": _summary(uncached),
+            "cached": _summary(cached),
+        },
+        "sync": {
+            **sync,
+            "aircraft": Aircraft.objects.count(),
+            "seconds": round(sync_seconds, 3),
+            "rows_per_second": round(sync["processed"] / sync_seconds, 1) if sync_seconds else None,
+        },
+        "api": api,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _headline(result: dict) -> dict:
+    """Flatten one fleet-size result into the numbers worth comparing."""
+
+    numbers = {
+        "feed.uncached.p50_ms": result["feed"]["uncached"]["p50_ms"],
+        "feed.cached.p50_ms": result["feed"]["cached"]["p50_ms"],
+        "sync.rows_per_second": result["sync"]["rows_per_second"],
+    }
+    for endpoint, stats in result["api"].items():
+        numbers[f"api.{endpoint}.requests_per_second"] = stats["requests_per_second"]
+        numbers[f"api.{endpoint}.p99_ms"] = stats["latency"]["p99_ms"]
+    return numbers
+
+
+def compare(baseline: dict, current: dict) -> list:
+    """Per-metric change from ``baseline`` to ``current`` for matching fleet sizes."""
+
+    before = {result["rows"]: _headline(result) for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        for metric, value in _headline(result).items():
+            old = before.get(result["rows"], {}).get(metric)
+            rows.append(
+                {
+                    "rows": result["rows"],
+                    "metric": metric,
+                    "before": old,
+                    "after": value,
+                    "ratio": round(value / old, 3) if old and value is not None else None,
+                }
+            )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000], help="Fleet sizes to run.")
+    parser.add_argument("--repeats", type=int, default=3, help="Uncached feed fetches per size.")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds the feed stub waits.")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logbook-size", type=int, default=2_000)
+    parser.add_argument("--posts", type=int, default=5_000)
+    parser.add_argument("--comments", type=int, default=5, help="Comments per post.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per endpoint.")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS)
+    parser.add_argument("--output", type=Path, help="Also write the JSON report here.")
+    parser.add_argument("--compare", type=Path, help="Earlier report to compare against.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.rows = args.rows[0]
+        print(json.dumps(run_workload(args)))
+        return
+
+    forwarded = [
+        "--repeats", str(args.repeats),
+        "--stub-latency", str(args.stub_latency),
+        "--users", str(args.users),
+        "--logbook-size", str(args.logbook_size),
+        "--posts", str(args.posts),
+        "--comments", str(args.comments),
+        "--concurrency", str(args.concurrency),
+        "--duration", str(args.duration),
+        "--endpoints", *args.endpoints,
+    ]  # fmt: skip
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = {
+                **os.environ,
+                "BENCH_WORKDIR": workdir,
+                "SQLITE_PATH": str(Path(workdir) / "bench.sqlite3"),
+                "CACHE_BACKEND": "file",
+                "CACHE_LOCATION": str(Path(workdir) / "cache"),
+                # Import the whole fleet rather than the default API cap.
+                "AIRCRAFT_FEED_MAX_RESULTS": "0",
+                "QUERY_BUDGET_MODE": "off",
+                "SLOW_REQUEST_SAMPLE_RATE": "0",
+                "REFRESH_SCHEDULER_IN_PROCESS": "",
+            }
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--rows", str(rows), *forwarded],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in {"child", "output", "compare"}},
+        "results": results,
+    }
+    if args.compare:
+        report["comparison"] = compare(json.loads(args.compare.read_text()), report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, default=str))
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
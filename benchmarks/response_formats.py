@@ -0,0 +1,119 @@
+"""Compare JSON and MessagePack payload size and encode time.
+
+Builds the full-fleet ``/fleet/live/`` payload from a synthetic OpenSky fleet
+and the full ``/airports/`` list (seeded airports plus synthetic ones with
+frequencies and spotting locations) in a throwaway SQLite database, then
+encodes both with each renderer and prints a JSON summary::
+
+    python benchmarks/response_formats.py --fleet-rows 100000 --airports 2000
+
+Sizes are reported raw and gzipped, since responses above
+``COMPRESSION_MIN_BYTES`` go out compressed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _best_of(encode, data, repeats: int) -> tuple:
+    timings = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        body = encode(data)
+        timings.append(time.perf_counter() - began)
+    return body, min(timings)
+
+
+def build_payloads(fleet_rows: int, airports: int) -> dict:
+    from core.models import Airport, Frequency, SpottingLocation
+    from core.serializers import AirportSerializer
+    from core.services.aircraft_feed import AircraftRecord
+    from core.views import AirportViewSet
+
+    from synthetic import fleet_rows as synthetic_fleet
+
+    results = [AircraftRecord.from_row(row).as_dict() for row in synthetic_fleet(fleet_rows)]
+    fleet = {"count": len(results), "results": results, "filters": {"registration": None, "country": None}}
+
+    created = Airport.objects.bulk_create(
+        Airport(
+            icao=f"Z{index // 26 // 26 % 26 + 65:c}{index // 26 % 26 + 65:c}{index % 26 + 65:c}",
+            iata="",
+            name=f"Benchmark Field {index}",
+            city="Testville",
+            lat=50 + index % 500 / 100,
+            lon=-5 + index % 700 / 100,
+        )
+        for index in range(airports)
+    )
+    Frequency.objects.bulk_create(
+        Frequency(airport=airport, service=service, mhz=118.5 + offset / 40, description="")
+        for airport in created
+        for offset, service in enumerate(("Tower", "Ground", "ATIS"))
+    )
+    SpottingLocation.objects.bulk_create(
+        SpottingLocation(airport=airport, title=f"{airport.name} viewing area", lat=airport.lat, lon=airport.lon)
+        for airport in created
+    )
+    airport_list = AirportSerializer(AirportViewSet.queryset.all(), many=True).data
+    return {"fleet": fleet, "airports": airport_list}
+
+
+def run(fleet_rows: int, airports: int, repeats: int) -> dict:
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+
+    from backend import renderers
+
+    call_command("migrate", verbosity=0)
+    payloads = build_payloads(fleet_rows, airports)
+    encoders = {
+        "json": JSONRenderer().render,
+        "json-fast" + ("" if renderers.orjson is not None else " (stdlib fallback)"): renderers.render_json,
+        "msgpack" + ("" if renderers.msgpack is not None else " (pure Python)"): renderers.packb,
+    }
+
+    report = {}
+    for name, data in payloads.items():
+        report[name] = {}
+        for label, encode in encoders.items():
+            body, seconds = _best_of(encode, data, repeats)
+            report[name][label] = {
+                "bytes": len(body),
+                "gzip_bytes": len(gzip.compress(body, compresslevel=6)),
+                "encode_ms": round(seconds * 1000, 3),
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleet-rows", type=int, default=100_000)
+    parser.add_argument("--airports", type=int, default=2_000)
+    parser.add_argument("--repeats", type=int, default=5, help="Encodes per format; the best is kept.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["SQLITE_PATH"] = str(Path(workdir) / "bench.sqlite3")
+        os.environ["CACHE_BACKEND"] = "locmem"
+        sys.path.insert(0, str(ROOT))
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+        import django
+
+        django.setup()
+        print(json.dumps(run(args.fleet_rows, args.airports, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
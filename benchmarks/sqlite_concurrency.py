@@ -0,0 +1,174 @@
+"""Measure API-style reads and logbook writes while an aircraft sync is running.
+
+Runs the same workload against a throwaway SQLite file once per profile
+(``SQLITE_PROFILE=default`` and ``production``) and prints a JSON summary::
+
+    python benchmarks/sqlite_concurrency.py --rows 200000 --readers 4
+
+The writer mimics ``sync_aircraft_database``: one long transaction inserting
+aircraft in batches.  Readers query airports through the read alias and a
+second writer logs ``UserSeen`` rows, recording latency and lock failures.
+SQLite allows one writer at a time, so the logbook writes still queue behind
+the sync; the production profile makes them wait rather than fail early.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summary(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 3) if samples else None,
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 3) if samples else None,
+        "max_ms": round(max(samples) * 1000, 3) if samples else None,
+    }
+
+
+def run_workload(rows: int, readers: int, batch: int) -> dict:
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import OperationalError, connections, transaction
+
+    from core.models import Aircraft, Airport, UserSeen
+
+    call_command("migrate", verbosity=0)
+    user = get_user_model().objects.create_user(username="bench", password="bench")
+    seen_targets = list(Aircraft.objects.values_list("pk", flat=True))
+
+    sync_started = threading.Event()
+    sync_done = threading.Event()
+    read_latency, read_errors = [], []
+    write_latency, write_errors = [], []
+
+    def sync_writer():
+        try:
+            with transaction.atomic():
+                sync_started.set()
+                for start in range(0, rows, batch):
+                    Aircraft.objects.bulk_create(
+                        Aircraft(registration=f"BENCH{index:07d}", type="A320", airline="Bench Air")
+                        for index in range(start, min(start + batch, rows))
+                    )
+        finally:
+            sync_started.set()
+            sync_done.set()
+            connections.close_all()
+
+    def reader():
+        sync_started.wait()
+        while not sync_done.is_set():
+            began = time.perf_counter()
+            try:
+                list(Airport.objects.using(settings.DATABASE_READ_ALIAS).order_by("icao")[:50])
+                read_latency.append(time.perf_counter() - began)
+            except OperationalError as exc:
+                read_errors.append(str(exc))
+        connections.close_all()
+
+    def seen_writer():
+        sync_started.wait()
+        for aircraft_id in seen_targets:
+            if sync_done.is_set():
+                break
+            began = time.perf_counter()
+            try:
+                UserSeen.objects.create(user=user, aircraft_id=aircraft_id)
+                write_latency.append(time.perf_counter() - began)
+            except OperationalError as exc:
+                write_errors.append(str(exc))
+        connections.close_all()
+
+    threads = [threading.Thread(target=sync_writer), threading.Thread(target=seen_writer)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "profile": settings.SQLITE_PROFILE,
+        "sync_rows": rows,
+        "sync_seconds": round(time.perf_counter() - began, 3),
+        "reads": _summary(read_latency),
+        "read_errors": len(read_errors),
+        "seen_writes": _summary(write_latency),
+        "seen_write_errors": len(write_errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=2_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_workload(args.rows, args.readers, args.batch)))
+        return
+
+    results = []
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = {
+                **os.environ,
+                "SQLITE_PROFILE": profile,
+                "SQLITE_PATH": str(Path(workdir) / "bench.sqlite3"),
+                # Short enough that lock waits show up as errors in the report.
+                "SQLITE_BUSY_TIMEOUT": os.environ.get("SQLITE_BUSY_TIMEOUT", "5"),
+            }
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--child",
+                    "--rows",
+                    str(args.rows),
+                    "--batch",
+                    str(args.batch),
+                    "--readers",
+                    str(args.readers),
+                ],
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
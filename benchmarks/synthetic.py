@@ -0,0 +1,231 @@
+"""Synthetic data for the benchmarks: OpenSky fleets, OurAirports data, logbooks and forums.
+
+Everything is seeded, so two runs with the same arguments build the same data
+and results can be compared between commits.
+"""
+
+from __future__ import annotations
+
+import csv
+import random
+from pathlib import Path
+
+OPENSKY_COLUMNS = [
+    "icao24",
+    "registration",
+    "manufacturericao",
+    "manufacturername",
+    "model",
+    "typecode",
+    "serialnumber",
+    "linenumber",
+    "icaoaircrafttype",
+    "operator",
+    "operatorcallsign",
+    "operatoricao",
+    "operatoriata",
+    "owner",
+    "testreg",
+    "registered",
+    "reguntil",
+    "status",
+    "built",
+    "firstflightdate",
+    "seatconfiguration",
+    "engines",
+    "modes",
+    "adsb",
+    "acars",
+    "notes",
+    "categoryDescription",
+    "registeredcountry",
+    "operatorcountry",
+]
+
+TYPES = [
+    ("AIRBUS", "Airbus", "A320-214", "A320", "L2J"),
+    ("AIRBUS", "Airbus", "A321-251NX", "A21N", "L2J"),
+    ("BOEING", "Boeing", "737-8AS", "B738", "L2J"),
+    ("BOEING", "Boeing", "787-9", "B789", "L2J"),
+    ("EMBRAER", "Embraer", "ERJ 190-100 LR", "E190", "L2J"),
+    ("ATR", "ATR", "ATR 72-600", "AT76", "L2T"),
+    ("CESSNA", "Cessna", "172S Skyhawk SP", "C172", "L1P"),
+]
+OPERATORS = [
+    ("easyJet Airline Company", "EASY", "EZY", "United Kingdom"),
+    ("Ryanair", "RYANAIR", "RYR", "Ireland"),
+    ("British Airways", "SPEEDBIRD", "BAW", "United Kingdom"),
+    ("Deutsche Lufthansa", "LUFTHANSA", "DLH", "Germany"),
+    ("Southwest Airlines", "SOUTHWEST", "SWA", "United States"),
+    ("Air Canada", "AIR CANADA", "ACA", "Canada"),
+    ("", "", "", "United States"),
+]
+PREFIXES = {"United Kingdom": "G-", "Ireland": "EI-", "Germany": "D-", "United States": "N", "Canada": "C-"}
+
+
+def registration(index: int, country: str) -> str:
+    prefix = PREFIXES[country]
+    if prefix == "N":
+        return f"N{index + 10000}"
+    letters = ""
+    value = index
+    for _ in range(4):
+        value, remainder = divmod(value, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return f"{prefix}{letters}{value or ''}"
+
+
+def fleet_rows(count: int, *, seed: int = 1):
+    rng = random.Random(seed)
+    for index in range(count):
+        manufacturer_icao, manufacturer, model, typecode, icao_type = rng.choice(TYPES)
+        operator, callsign, operator_icao, country = rng.choice(OPERATORS)
+        row = dict.fromkeys(OPENSKY_COLUMNS, "")
+        row.update(
+            icao24=f"{index:06x}",
+            registration=registration(index, country),
+            manufacturericao=manufacturer_icao,
+            manufacturername=manufacturer,
+            model=model,
+            typecode=typecode,
+            serialnumber=str(10000 + index),
+            icaoaircrafttype=icao_type,
+            operator=operator,
+            operatorcallsign=callsign,
+            operatoricao=operator_icao,
+            owner=operator or f"Private owner {index}",
+            built=str(rng.randint(1985, 2024)),
+            registeredcountry=country,
+            operatorcountry=country,
+        )
+        yield row
+
+
+def write_fleet_csv(path: Path, count: int, *, seed: int = 1) -> Path:
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=OPENSKY_COLUMNS, quoting=csv.QUOTE_MINIMAL)
+        writer.writeheader()
+        writer.writerows(fleet_rows(count, seed=seed))
+    return path
+
+
+OURAIRPORTS_COLUMNS = [
+    "id",
+    "ident",
+    "type",
+    "name",
+    "latitude_deg",
+    "longitude_deg",
+    "elevation_ft",
+    "continent",
+    "iso_country",
+    "iso_region",
+    "municipality",
+    "scheduled_service",
+    "gps_code",
+    "iata_code",
+    "local_code",
+    "home_link",
+    "wikipedia_link",
+    "keywords",
+]
+FREQUENCY_COLUMNS = ["id", "airport_ref", "airport_ident", "type", "description", "frequency_mhz"]
+AIRPORT_TYPES = ["small_airport"] * 6 + ["medium_airport", "large_airport", "heliport", "closed"]
+
+
+def write_ourairports_csvs(directory: Path, count: int, *, seed: int = 4) -> tuple:
+    """Write OurAirports-format ``airports.csv`` and ``airport-frequencies.csv``."""
+
+    rng = random.Random(seed)
+    airports_path = Path(directory) / "airports.csv"
+    frequencies_path = Path(directory) / "airport-frequencies.csv"
+    with open(airports_path, "w", newline="", encoding="utf-8") as airports, open(
+        frequencies_path, "w", newline="", encoding="utf-8"
+    ) as frequencies:
+        airport_writer = csv.DictWriter(airports, fieldnames=OURAIRPORTS_COLUMNS)
+        frequency_writer = csv.DictWriter(frequencies, fieldnames=FREQUENCY_COLUMNS)
+        airport_writer.writeheader()
+        frequency_writer.writeheader()
+        frequency_id = 0
+        for index in range(count):
+            ident = "".join(chr(ord("A") + index // 26 ** power % 26) for power in (3, 2, 1, 0))
+            airport_writer.writerow(
+                dict.fromkeys(OURAIRPORTS_COLUMNS, "")
+                | {
+                    "id": index + 1,
+                    "ident": ident,
+                    "type": rng.choice(AIRPORT_TYPES),
+                    "name": f"Synthetic Field {index}",
+                    "latitude_deg": round(rng.uniform(-60, 70), 6),
+                    "longitude_deg": round(rng.uniform(-180, 180), 6),
+                    "iso_country": rng.choice(["GB", "US", "DE", "FR", "CA", "AU"]),
+                    "municipality": f"Town {index % 5000}",
+                    "gps_code": ident,
+                    "iata_code": ident[1:] if index % 10 == 0 else "",
+                }
+            )
+            for service in rng.sample(["TWR", "GND", "ATIS", "APP", "CTAF"], rng.randint(0, 3)):
+                frequency_id += 1
+                frequency_writer.writerow(
+                    {
+                        "id": frequency_id,
+                        "airport_ref": index + 1,
+                        "airport_ident": ident,
+                        "type": service,
+                        "description": f"{ident} {service}",
+                        "frequency_mhz": f"{rng.uniform(118, 137):.3f}",
+                    }
+                )
+    return airports_path, frequencies_path
+
+
+def create_logbooks(users: int, entries_per_user: int, *, seed: int = 2, batch: int = 5000):
+    """Create ``users`` spotters with ``entries_per_user`` sightings each.
+
+    A spotter logs each aircraft once, so logbooks are capped at the fleet size.
+    """
+
+    from django.contrib.auth import get_user_model
+
+    from core.models import Aircraft, Airport, UserSeen
+
+    rng = random.Random(seed)
+    aircraft_ids = list(Aircraft.objects.values_list("pk", flat=True))
+    airport_ids = list(Airport.objects.values_list("pk", flat=True))
+    User = get_user_model()
+    created = User.objects.bulk_create(
+        User(username=f"bench-spotter-{index}", password="!") for index in range(users)
+    )
+    people = list(User.objects.filter(username__in=[user.username for user in created]))
+    pending = []
+    for user in people:
+        for aircraft_id in rng.sample(aircraft_ids, min(entries_per_user, len(aircraft_ids))):
+            pending.append(UserSeen(user=user, aircraft_id=aircraft_id, airport_id=rng.choice(airport_ids)))
+            if len(pending) >= batch:
+                UserSeen.objects.bulk_create(pending)
+                pending = []
+    UserSeen.objects.bulk_create(pending)
+    return people
+
+
+def create_forum(posts: int, comments_per_post: int, author, *, seed: int = 3, batch: int = 5000) -> None:
+    from core.models import Airport, Comment, Post
+
+    rng = random.Random(seed)
+    airport_ids = list(Airport.objects.values_list("pk", flat=True))
+    Post.objects.bulk_create(
+        (
+            Post(user=author, airport_id=rng.choice(airport_ids), title=f"Bench thread {index}", body="Runway report " * 20)
+            for index in range(posts)
+        ),
+        batch_size=batch,
+    )
+    post_ids = list(Post.objects.filter(user=author).values_list("pk", flat=True))
+    pending = []
+    for post_id in post_ids:
+        for index in range(comments_per_post):
+            pending.append(Comment(post_id=post_id, user=author, body=f"Reply {index}"))
+            if len(pending) >= batch:
+                Comment.objects.bulk_create(pending)
+                pending = []
+    Comment.objects.bulk_create(pending)
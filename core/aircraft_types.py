@@ -0,0 +1,82 @@
+"""Group aircraft type strings into families such as ``A320neo`` or ``737 MAX``.
+
+The feed describes the same airframe many ways: an ICAO designator (``A20N``),
+a manufacturer model (``A320-251N``) or a marketing name (``A320neo``).  The
+family is worked out from the designator when there is one and otherwise from
+the model string, so every variant of a type can be filtered on one indexed
+value.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Tuple
+
+FAMILY_MAX_LENGTH = 40
+
+# ICAO type designators (Doc 8643) for the types spotters ask about most.
+FAMILY_BY_CODE: Dict[str, str] = {
+    **dict.fromkeys(("A318", "A319", "A320", "A321"), "A320"),
+    **dict.fromkeys(("A19N", "A20N", "A21N"), "A320neo"),
+    **dict.fromkeys(("BCS1", "BCS3"), "A220"),
+    **dict.fromkeys(("A332", "A333"), "A330"),
+    **dict.fromkeys(("A338", "A339"), "A330neo"),
+    **dict.fromkeys(("A342", "A343", "A345", "A346"), "A340"),
+    **dict.fromkeys(("A359", "A35K"), "A350"),
+    "A388": "A380",
+    **dict.fromkeys(("B733", "B734", "B735"), "737 Classic"),
+    **dict.fromkeys(("B736", "B737", "B738", "B739"), "737NG"),
+    **dict.fromkeys(("B37M", "B38M", "B39M", "B3XM"), "737 MAX"),
+    **dict.fromkeys(("B744", "B748"), "747"),
+    **dict.fromkeys(("B752", "B753"), "757"),
+    **dict.fromkeys(("B762", "B763", "B764"), "767"),
+    **dict.fromkeys(("B772", "B773", "B77L", "B77W"), "777"),
+    **dict.fromkeys(("B778", "B779"), "777X"),
+    **dict.fromkeys(("B788", "B789", "B78X"), "787"),
+    **dict.fromkeys(("E170", "E175", "E190", "E195", "E75L", "E75S"), "E-Jet"),
+    **dict.fromkeys(("E290", "E295"), "E-Jet E2"),
+    **dict.fromkeys(("CRJ1", "CRJ2", "CRJ7", "CRJ9", "CRJX"), "CRJ"),
+    **dict.fromkeys(("DH8A", "DH8B", "DH8C", "DH8D"), "Dash 8"),
+    **dict.fromkeys(("AT43", "AT45", "AT46", "AT72", "AT75", "AT76"), "ATR"),
+}
+
+# Checked in order against the upper-cased model string; first match wins.
+FAMILY_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(p), family)
+    for p, family in (
+        (r"\bA3(19|20|21)(NEO|-\d{3}NX?)\b", "A320neo"),
+        (r"\bA3(18|19|20|21)\b", "A320"),
+        (r"\bA220\b|\bBD-500\b|\bCS[13]00\b", "A220"),
+        (r"\bA330(NEO|-[89]\d\d)\b", "A330neo"),
+        (r"\bA330\b", "A330"),
+        (r"\bA340\b", "A340"),
+        (r"\bA350\b", "A350"),
+        (r"\bA380\b", "A380"),
+        (r"\b737[- ]?MAX\b|\b737-[789]\b", "737 MAX"),
+        (r"\b737-[6789]\w\w\b", "737NG"),
+        (r"\b737-[345]\w\w\b", "737 Classic"),
+        (r"\b777-[89]\b|\b777X\b", "777X"),
+        (r"\b(747|757|767|777|787)\b", r"\1"),
+        (r"\bE(MB|RJ)?-?19[05]-E2\b", "E-Jet E2"),
+        (r"\bE(MB|RJ)?-?1[79][05]\b", "E-Jet"),
+        (r"\bCRJ", "CRJ"),
+        (r"\bDHC-?8\b|\bDASH ?8\b|\bQ400\b", "Dash 8"),
+        (r"\bATR[- ]?(42|72)\b", "ATR"),
+    )
+]
+
+
+def type_family(name: str, type_code: str = "") -> str:
+    """The family ``name``/``type_code`` belongs to, or ``""`` when unknown."""
+
+    code = (type_code or "").strip().upper()
+    if code in FAMILY_BY_CODE:
+        return FAMILY_BY_CODE[code]
+    text = (name or "").strip().upper()
+    if text in FAMILY_BY_CODE:
+        return FAMILY_BY_CODE[text]
+    for pattern, family in FAMILY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.expand(family)
+    return code[:FAMILY_MAX_LENGTH]
@@ -0,0 +1,51 @@
+"""Custom model fields used by the core app."""
+
+from __future__ import annotations
+
+import hashlib
+
+from django.db import models
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_sha256(file) -> str:
+    """Stream ``file`` through SHA-256 and rewind it."""
+
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedImageField(models.ImageField):
+    """An ``ImageField`` that stores each distinct file exactly once.
+
+    Before a new file is committed its SHA-256 is written to ``hash_field`` on
+    the instance, so a callable ``upload_to`` can derive the storage name from
+    the digest.  When that name already exists in storage the instance simply
+    points at it and nothing is written.
+    """
+
+    def __init__(self, *args, hash_field: str = "sha256", **kwargs):
+        self.hash_field = hash_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.hash_field != "sha256":
+            kwargs["hash_field"] = self.hash_field
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        if file and not file._committed:
+            setattr(model_instance, self.hash_field, content_sha256(file.file))
+            name = self.generate_filename(model_instance, file.name)
+            if self.storage.exists(name):
+                file.name = name
+                file._committed = True
+                return file
+        return super().pre_save(model_instance, add)
@@ -0,0 +1,76 @@
+"""Spatial keys and great-circle distances for airports and spots.
+
+The globe is cut into ``CELL_DEGREES`` squares numbered row by row from the
+south-west corner.  Each airport stores the number of the square it lies in
+(``Airport.spatial_cell``, indexed), so a nearest-airport lookup only reads
+the few squares around a point instead of the whole table.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import List, Tuple
+
+CELL_DEGREES = 1.0
+CELL_ROWS = int(180 / CELL_DEGREES)
+CELL_COLUMNS = int(360 / CELL_DEGREES)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def cell_position(lat: float, lon: float) -> Tuple[int, int]:
+    row = min(max(int(math.floor((lat + 90) / CELL_DEGREES)), 0), CELL_ROWS - 1)
+    column = int(math.floor((lon + 180) / CELL_DEGREES)) % CELL_COLUMNS
+    return row, column
+
+
+def spatial_cell(lat: float, lon: float) -> int:
+    """The number of the grid square containing ``(lat, lon)``."""
+
+    row, column = cell_position(lat, lon)
+    return row * CELL_COLUMNS + column
+
+
+def cells_around(lat: float, lon: float, radius: int) -> List[int]:
+    """Grid squares within ``radius`` squares of the one holding ``(lat, lon)``.
+
+    Columns wrap around the antimeridian; rows stop at the poles.
+    """
+
+    row, column = cell_position(lat, lon)
+    columns = {(column + offset) % CELL_COLUMNS for offset in range(-radius, radius + 1)}
+    return [
+        cell_row * CELL_COLUMNS + cell_column
+        for cell_row in range(max(row - radius, 0), min(row + radius, CELL_ROWS - 1) + 1)
+        for cell_column in sorted(columns)
+    ]
+
+
+def covered_km(lat: float, lon: float, radius: int) -> float:
+    """Distance from ``(lat, lon)`` that :func:`cells_around` is sure to cover.
+
+    Anything closer than this lies in one of the returned squares.
+    """
+
+    row, column = cell_position(lat, lon)
+    south = (row - radius) * CELL_DEGREES - 90
+    north = (row + radius + 1) * CELL_DEGREES - 90
+    west = (column - radius) * CELL_DEGREES - 180
+    east = (column + radius + 1) * CELL_DEGREES - 180
+    lat_margin = min(lat - south if south > -90 else math.inf, north - lat if north < 90 else math.inf)
+    if 2 * radius + 1 >= CELL_COLUMNS:
+        lon_margin = math.inf
+    else:
+        # Meridians converge, so a degree of longitude is shortest at the
+        # square's edge furthest from the equator.
+        widest = min(max(abs(south), abs(north)), 90)
+        lon_margin = min(lon - west, east - lon) * math.cos(math.radians(widest))
+    return min(lat_margin, lon_margin) * KM_PER_DEGREE
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,41 @@
+"""Management command to move legacy photos into content-addressed storage."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from core.models import Photo
+
+
+class Command(BaseCommand):
+    help = (
+        "Hash photos stored before content addressing, deduplicate their files and "
+        "compute perceptual hashes."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:  # type: ignore[override]
+        migrated = missing = 0
+        for photo in Photo.objects.filter(sha256="").exclude(image="").iterator(chunk_size=200):
+            legacy_name = photo.image.name
+            storage = photo.image.storage
+            if not storage.exists(legacy_name):
+                missing += 1
+                self.stderr.write(f"Missing file for photo {photo.pk}: {legacy_name}")
+                continue
+
+            with storage.open(legacy_name, "rb") as handle:
+                photo.image = File(handle, name=legacy_name)
+                photo.save()
+
+            if photo.image.name != legacy_name and not Photo.objects.filter(image=legacy_name).exists():
+                storage.delete(legacy_name)
+            migrated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Moved {migrated} photos to content-addressed storage ({missing} missing).")
+        )
+
+        return None
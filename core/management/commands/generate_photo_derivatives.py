@@ -0,0 +1,77 @@
+"""Management command to backfill resized derivatives for existing photos."""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.models import Photo
+from core.services import photo_derivatives
+
+
+class Command(BaseCommand):
+    help = "Generate WebP/JPEG derivatives for photos that are missing them."
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes. Defaults to the number of CPU cores.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate derivatives even for photos that already have them.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:  # type: ignore[override]
+        if options.get("force"):
+            photos = Photo.objects.exclude(image="").only("pk", "image", "derivatives")
+        else:
+            pending = list(photo_derivatives.pending_photo_ids())
+            photos = Photo.objects.filter(pk__in=pending).only("pk", "image", "derivatives")
+        photos = list(photos)
+
+        workers = max(1, options.get("workers") or 1)
+        generated = failed = 0
+
+        if workers == 1:
+            for photo in photos:
+                try:
+                    derivatives = photo_derivatives.render_derivatives(photo.image.name)
+                except photo_derivatives.PhotoDerivativeError as exc:
+                    failed += 1
+                    self.stderr.write(str(exc))
+                    continue
+                photo_derivatives.record_derivatives(photo, derivatives)
+                generated += 1
+        else:
+            # Worker processes only decode and encode images; this process keeps
+            # the database connection and records the results.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(photo_derivatives.render_derivatives, photo.image.name): photo
+                    for photo in photos
+                }
+                for future in as_completed(futures):
+                    photo = futures[future]
+                    try:
+                        derivatives = future.result()
+                    except photo_derivatives.PhotoDerivativeError as exc:
+                        failed += 1
+                        self.stderr.write(str(exc))
+                        continue
+                    photo_derivatives.record_derivatives(photo, derivatives)
+                    generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated derivatives for {generated} photos ({failed} failed).")
+        )
+
+        return None
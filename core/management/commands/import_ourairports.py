@@ -0,0 +1,69 @@
+"""Management command to bulk import airports from OurAirports-format CSVs."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import airport_import
+
+
+class Command(BaseCommand):
+    help = "Upsert airports and their frequencies from OurAirports airports.csv / airport-frequencies.csv."
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument("airports", type=Path, help="Path to airports.csv (may be gzip/bz2/xz/zstd compressed).")
+        parser.add_argument(
+            "--frequencies",
+            type=Path,
+            help="Path to airport-frequencies.csv. Listed airports have their frequencies replaced.",
+        )
+        parser.add_argument(
+            "--countries",
+            type=Path,
+            help="Path to countries.csv, to store country names instead of ISO codes.",
+        )
+        parser.add_argument(
+            "--type",
+            action="append",
+            dest="types",
+            help=(
+                "OurAirports airport type to import. May be given more than once. "
+                "Defaults to large, medium and small airports and seaplane bases."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows written per bulk statement.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:  # type: ignore[override]
+        started = time.monotonic()
+        try:
+            summary = airport_import.import_ourairports(
+                options["airports"],
+                frequencies_path=options.get("frequencies"),
+                countries_path=options.get("countries"),
+                types=set(options["types"]) if options.get("types") else None,
+                batch_size=options["batch_size"],
+            )
+        except (OSError, airport_import.AirportImportError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {summary['airports']} airports and {summary['frequencies']} frequencies "
+                f"in {time.monotonic() - started:.1f}s."
+            )
+        )
+        self.stdout.write(
+            "Skipped airports: {skipped_airports}, Skipped frequencies: {skipped_frequencies}, "
+            "Indexed: {indexed}".format(**summary)
+        )
+
+        return None
@@ -0,0 +1,29 @@
+"""Management command to discard abandoned resumable photo uploads."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from core.services.photo_uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete resumable photo uploads (and their staged bytes) that have gone stale."
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument(
+            "--hours",
+            type=int,
+            help="Age in hours after which an untouched upload is discarded. "
+            "Defaults to PHOTO_UPLOAD_EXPIRY_HOURS.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:  # type: ignore[override]
+        hours = options.get("hours")
+        removed = purge_stale_uploads(timedelta(hours=hours) if hours else None)
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} stale uploads."))
+
+        return None
@@ -0,0 +1,32 @@
+"""Management command to rebuild the full-text search index from scratch."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for posts, comments, spots and airports."
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument(
+            "--kind",
+            action="append",
+            choices=search.SEARCH_KINDS,
+            help="Only rebuild documents of this kind. May be given more than once.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:  # type: ignore[override]
+        if not search.search_backend_available():
+            raise CommandError("The full-text index requires the SQLite FTS5 backend.")
+
+        summary = search.rebuild_index(options.get("kind"))
+        for kind, written in summary.items():
+            self.stdout.write(f"Indexed {written} {kind} documents.")
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
+
+        return None
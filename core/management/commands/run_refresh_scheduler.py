@@ -0,0 +1,51 @@
+"""Management command that keeps feed and reference caches warm."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.scheduler import RefreshScheduler, default_jobs
+
+
+class Command(BaseCommand):
+    help = "Refresh the aircraft feed and airport reference caches before they expire."
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every job a single time and exit instead of looping.",
+        )
+        parser.add_argument(
+            "--job",
+            action="append",
+            dest="jobs",
+            help="Only run the named job (repeatable).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> str | None:  # type: ignore[override]
+        jobs = default_jobs()
+        if options.get("jobs"):
+            known = {job.name for job in jobs}
+            unknown = set(options["jobs"]) - known
+            if unknown:
+                raise CommandError(f"Unknown job(s): {', '.join(sorted(unknown))}. Choose from {', '.join(sorted(known))}.")
+            jobs = [job for job in jobs if job.name in options["jobs"]]
+
+        scheduler = RefreshScheduler(jobs)
+        if options.get("once"):
+            failed = [job.name for job in jobs if not scheduler.run_job(job)[0]]
+            if failed:
+                raise CommandError(f"Refresh failed for: {', '.join(failed)}")
+            self.stdout.write(self.style.SUCCESS(f"Refreshed {len(jobs)} cache(s)."))
+            return None
+
+        stop = threading.Event()
+        try:
+            scheduler.run_forever(stop)
+        except KeyboardInterrupt:
+            stop.set()
+        return None
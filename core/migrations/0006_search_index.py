@@ -0,0 +1,44 @@
+# Creates the SQLite FTS5 table used by core.services.search
+from django.db import migrations
+
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_search_index USING fts5("
+    "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+# rowid = object id * 8 + kind code (see core.services.search._KIND_CODES).
+POPULATE = [
+    "INSERT INTO core_search_index (rowid, title, body) "
+    "SELECT id * 8 + 1, name, trim(icao || ' ' || iata || ' ' || city) FROM core_airport",
+    "INSERT INTO core_search_index (rowid, title, body) "
+    "SELECT id * 8 + 2, title, trim(description || char(10) || tips) FROM core_spottinglocation",
+    "INSERT INTO core_search_index (rowid, title, body) "
+    "SELECT id * 8 + 3, title, body FROM core_post",
+    "INSERT INTO core_search_index (rowid, title, body) "
+    "SELECT id * 8 + 4, '', body FROM core_comment",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE_TABLE)
+    for statement in POPULATE:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_forum_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
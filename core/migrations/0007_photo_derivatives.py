@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="photo",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:07
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_photo_derivatives"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="photo",
+            name="sha256",
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.CreateModel(
+            name="PhotoUpload",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("caption", models.CharField(blank=True, max_length=200)),
+                ("filename", models.CharField(max_length=200)),
+                ("size", models.PositiveBigIntegerField()),
+                ("sha256", models.CharField(blank=True, max_length=64)),
+                ("received", models.PositiveBigIntegerField(default=0)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                ("spot", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="core.spottinglocation")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="photo_uploads", to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
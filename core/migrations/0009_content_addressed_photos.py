@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:10
+
+import core.fields
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_resumable_photo_uploads"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PhotoBlob",
+            fields=[
+                ("sha256", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=255)),
+                ("refcount", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="duplicate_of",
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="near_duplicates", to="core.photo"),
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="phash",
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="phash_band0",
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="phash_band1",
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="phash_band2",
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="phash_band3",
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="photo",
+            name="image",
+            field=core.fields.ContentAddressedImageField(upload_to=core.models.photo_upload_to),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_content_addressed_photos"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userseen",
+            name="seen_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+from core.aircraft_types import type_family
+
+
+def intern_dimensions(apps, schema_editor):
+    Aircraft = apps.get_model("core", "Aircraft")
+    AircraftType = apps.get_model("core", "AircraftType")
+    Operator = apps.get_model("core", "Operator")
+
+    type_names = Aircraft.objects.exclude(type="").values_list("type", flat=True).distinct()
+    AircraftType.objects.bulk_create(
+        [AircraftType(name=name, family=type_family(name)) for name in type_names], batch_size=1000
+    )
+    operator_names = Aircraft.objects.exclude(airline="").values_list("airline", flat=True).distinct()
+    Operator.objects.bulk_create([Operator(name=name) for name in operator_names], batch_size=1000)
+
+    # One correlated UPDATE per column, using the unique name indexes.
+    Aircraft.objects.exclude(type="").update(
+        aircraft_type_id=Subquery(AircraftType.objects.filter(name=OuterRef("type")).values("pk")[:1])
+    )
+    Aircraft.objects.exclude(airline="").update(
+        operator_id=Subquery(Operator.objects.filter(name=OuterRef("airline")).values("pk")[:1])
+    )
+
+
+def restore_strings(apps, schema_editor):
+    Aircraft = apps.get_model("core", "Aircraft")
+    AircraftType = apps.get_model("core", "AircraftType")
+    Operator = apps.get_model("core", "Operator")
+
+    Aircraft.objects.filter(aircraft_type__isnull=False).update(
+        type=Subquery(AircraftType.objects.filter(pk=OuterRef("aircraft_type_id")).values("name")[:1])
+    )
+    Aircraft.objects.filter(operator__isnull=False).update(
+        airline=Subquery(Operator.objects.filter(pk=OuterRef("operator_id")).values("name")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_userseen_seen_at_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AircraftType",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=120, unique=True)),
+                ("type_code", models.CharField(blank=True, max_length=4)),
+                ("family", models.CharField(blank=True, db_index=True, max_length=40)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Operator",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=200, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="aircraft",
+            name="aircraft_type",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="aircraft",
+                to="core.aircrafttype",
+            ),
+        ),
+        migrations.AddField(
+            model_name="aircraft",
+            name="operator",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="aircraft",
+                to="core.operator",
+            ),
+        ),
+        migrations.RunPython(intern_dimensions, restore_strings),
+        migrations.RemoveField(
+            model_name="aircraft",
+            name="airline",
+        ),
+        migrations.RemoveField(
+            model_name="aircraft",
+            name="type",
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:08
+
+from django.db import migrations, models
+
+from core.geo import spatial_cell
+
+
+def fill_spatial_cells(apps, schema_editor):
+    Airport = apps.get_model("core", "Airport")
+    airports = list(Airport.objects.only("lat", "lon"))
+    for airport in airports:
+        airport.spatial_cell = spatial_cell(airport.lat, airport.lon)
+    Airport.objects.bulk_update(airports, ["spatial_cell"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_aircraft_type_operator"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="airport",
+            name="spatial_cell",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_spatial_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_airport_spatial_cell"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aircraft",
+            name="sync_generation",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+    ]
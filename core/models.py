@@ -1,5 +1,13 @@
+import posixpath
+import uuid
+
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from .aircraft_types import FAMILY_MAX_LENGTH, type_family
+from .fields import ContentAddressedImageField
+from .geo import spatial_cell
 
 class Airport(models.Model):
     icao = models.CharField(max_length=4, unique=True)
@@ -9,6 +17,15 @@ class Airport(models.Model):
     country = models.CharField(max_length=120, default="United Kingdom")
     lat = models.FloatField()
     lon = models.FloatField()
+    # Grid square of (lat, lon) for nearest-airport lookups (see core.geo).
+    spatial_cell = models.PositiveIntegerField(default=0, db_index=True)
+
+    def save(self, *args, **kwargs):
+        self.spatial_cell = spatial_cell(self.lat, self.lon)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"lat", "lon"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "spatial_cell"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.icao} – {self.name}"
@@ -45,23 +62,130 @@ class AirportResource(models.Model):
     class Meta:
         ordering = ["airport", "title"]
 
+def photo_upload_to(instance, filename):
+    """Content-addressed path, e.g. ``spot_photos/sha256/9f/9f86d0….jpg``."""
+
+    extension = posixpath.splitext(filename)[1].lower()
+    extension = {".jpeg": ".jpg", "": ".jpg"}.get(extension, extension)
+    digest = instance.sha256
+    return f"spot_photos/sha256/{digest[:2]}/{digest}{extension}"
+
 class Photo(models.Model):
     spot = models.ForeignKey(SpottingLocation, on_delete=models.CASCADE, related_name="photos")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
-    image = models.ImageField(upload_to="spot_photos/")
+    image = ContentAddressedImageField(upload_to=photo_upload_to, hash_field="sha256")
+    caption = models.CharField(max_length=200, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # Resized copies written by core.services.photo_derivatives:
+    # {"source": <image name>, "files": {"webp": {"320": <storage name>, ...}, ...}}
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    # 64-bit dHash (stored signed) split into four 16-bit bands; any hash within
+    # Hamming distance 3 shares at least one band, so each band is indexed.
+    phash = models.BigIntegerField(null=True, blank=True, editable=False)
+    phash_band0 = models.PositiveIntegerField(null=True, blank=True, db_index=True, editable=False)
+    phash_band1 = models.PositiveIntegerField(null=True, blank=True, db_index=True, editable=False)
+    phash_band2 = models.PositiveIntegerField(null=True, blank=True, db_index=True, editable=False)
+    phash_band3 = models.PositiveIntegerField(null=True, blank=True, db_index=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="near_duplicates",
+    )
+
+class PhotoBlob(models.Model):
+    """A stored photo file shared by every :class:`Photo` with the same content."""
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255)
+    refcount = models.PositiveIntegerField(default=0)
+
+class PhotoUpload(models.Model):
+    """A resumable photo upload whose bytes are staged in ``PHOTO_UPLOAD_TEMP_DIR``."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="photo_uploads")
+    spot = models.ForeignKey(SpottingLocation, on_delete=models.CASCADE, related_name="+")
     caption = models.CharField(max_length=200, blank=True)
+    filename = models.CharField(max_length=200)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)  # optional client-declared digest
+    received = models.PositiveBigIntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+class DimensionManager(models.Manager):
+    def intern(self, name, **defaults):
+        """The row named ``name`` (created on first use), or ``None`` for a blank name."""
+
+        name = (name or "").strip()[: self.model._meta.get_field("name").max_length]
+        if not name:
+            return None
+        return self.get_or_create(name=name, defaults=defaults)[0]
+
+class AircraftType(models.Model):
+    """One distinct type string from the feed, shared by every airframe carrying it."""
+
+    name = models.CharField(max_length=120, unique=True)           # A320-214, B738, DH8D...
+    type_code = models.CharField(max_length=4, blank=True)          # ICAO designator, e.g. A20N
+    family = models.CharField(max_length=FAMILY_MAX_LENGTH, blank=True, db_index=True)  # A320neo, 737 MAX...
+
+    objects = DimensionManager()
+
+    def save(self, *args, **kwargs):
+        if not self.family:
+            self.family = type_family(self.name, self.type_code)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+class Operator(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+
+    objects = DimensionManager()
+
+    def __str__(self):
+        return self.name
 
 class Aircraft(models.Model):
     registration = models.CharField(max_length=16, unique=True)  # e.g., G-EZTH
-    type = models.CharField(max_length=120, blank=True)          # A320-214, B738, DH8D...
-    airline = models.CharField(max_length=200, blank=True)
+    aircraft_type = models.ForeignKey(
+        AircraftType, on_delete=models.PROTECT, null=True, blank=True, related_name="aircraft"
+    )
+    operator = models.ForeignKey(Operator, on_delete=models.PROTECT, null=True, blank=True, related_name="aircraft")
     country = models.CharField(max_length=120, blank=True)
+    # Stamp of the last feed sync that wrote this row; a pruning sync deletes
+    # the rows it did not stamp.
+    sync_generation = models.PositiveIntegerField(default=0, db_index=True)
+
+    # ``type`` and ``airline`` used to be text columns; they stay readable and
+    # writable (also as constructor arguments) so callers and the API keep
+    # working.  Select the relations when reading them for many rows.
+    @property
+    def type(self):
+        return self.aircraft_type.name if self.aircraft_type_id else ""
+
+    @type.setter
+    def type(self, value):
+        self.aircraft_type = AircraftType.objects.intern(value)
+
+    @property
+    def airline(self):
+        return self.operator.name if self.operator_id else ""
+
+    @airline.setter
+    def airline(self, value):
+        self.operator = Operator.objects.intern(value)
 
 class UserSeen(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="seen")
     aircraft = models.ForeignKey(Aircraft, on_delete=models.CASCADE, related_name="seen_by")
-    seen_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add so imported logbooks keep their dates.
+    seen_at = models.DateTimeField(default=timezone.now)
     airport = models.ForeignKey(Airport, on_delete=models.SET_NULL, null=True, blank=True)
 
     class Meta:
@@ -74,12 +198,23 @@ class Post(models.Model):
     body = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created"], name="post_created_idx"),
+            models.Index(fields=["airport", "-created"], name="post_airport_created_idx"),
+        ]
+
 class Comment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     body = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "created"], name="comment_post_created_idx"),
+        ]
+
 class Badge(models.Model):
     code = models.CharField(max_length=50, unique=True)   # e.g., FIRST_SPOT, HUNDRED_SPOTS
     name = models.CharField(max_length=120)
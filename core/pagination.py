@@ -0,0 +1,26 @@
+"""Pagination classes shared by the core API viewsets."""
+
+from __future__ import annotations
+
+from rest_framework.pagination import CursorPagination
+
+
+class ForumCursorPagination(CursorPagination):
+    """Keyset pagination for forum threads, newest first.
+
+    Cursor pagination filters on ``created`` instead of using ``OFFSET``/``COUNT``
+    so fetching a page costs a single indexed range scan however deep the
+    client has scrolled.
+    """
+
+    ordering = "-created"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class CommentCursorPagination(ForumCursorPagination):
+    """Keyset pagination for comments, oldest first so threads read top-down."""
+
+    ordering = "created"
+    page_size = 50
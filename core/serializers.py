@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 
@@ -7,6 +8,7 @@ from .models import (
     SpottingLocation,
     AirportResource,
     Photo,
+    PhotoUpload,
     Aircraft,
     UserSeen,
     Post,
@@ -14,6 +16,7 @@ from .models import (
     Badge,
     UserBadge,
 )
+from .services.photo_derivatives import derivative_urls
 
 class FrequencySerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,17 +39,48 @@ class AirportSerializer(serializers.ModelSerializer):
     resources = AirportResourceSerializer(many=True, read_only=True)
     class Meta:
         model = Airport
-        fields = "__all__"
+        exclude = ["spatial_cell"]
 
 class PhotoSerializer(serializers.ModelSerializer):
+    derivatives = serializers.SerializerMethodField()
+
     class Meta:
         model = Photo
-        fields = "__all__"
+        exclude = ["phash_band0", "phash_band1", "phash_band2", "phash_band3"]
+
+    def get_derivatives(self, obj):
+        request = self.context.get("request")
+        return derivative_urls(obj, request.build_absolute_uri if request else None)
+
+class PhotoUploadSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source="received", read_only=True)
+
+    class Meta:
+        model = PhotoUpload
+        fields = ["id", "spot", "caption", "filename", "size", "sha256", "offset", "created"]
+        read_only_fields = ["id", "offset", "created"]
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError(_("Size must be positive."))
+        if value > settings.PHOTO_UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(_("File is larger than the upload limit."))
+        return value
+
+    def validate_sha256(self, value):
+        value = value.strip().lower()
+        if value and (len(value) != 64 or any(char not in "0123456789abcdef" for char in value)):
+            raise serializers.ValidationError(_("sha256 must be a hex digest."))
+        return value
 
 class AircraftSerializer(serializers.ModelSerializer):
+    # Plain strings, as before types and operators moved to their own tables.
+    type = serializers.CharField(max_length=120, required=False, allow_blank=True)
+    airline = serializers.CharField(max_length=200, required=False, allow_blank=True)
+
     class Meta:
         model = Aircraft
-        fields = "__all__"
+        fields = ["id", "registration", "type", "airline", "country"]
 
 class UserSeenSerializer(serializers.ModelSerializer):
     aircraft = AircraftSerializer(read_only=True)
@@ -98,16 +132,31 @@ class UserSeenSerializer(serializers.ModelSerializer):
 
         return attrs
 
-class PostSerializer(serializers.ModelSerializer):
+class CommentSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username", read_only=True)
+
     class Meta:
-        model = Post
+        model = Comment
         fields = "__all__"
 
-class CommentSerializer(serializers.ModelSerializer):
+class PostSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username", read_only=True)
+    comment_count = serializers.SerializerMethodField()
+
     class Meta:
-        model = Comment
+        model = Post
         fields = "__all__"
 
+    def get_comment_count(self, obj):
+        # List and detail querysets annotate the count; freshly created posts do not.
+        count = getattr(obj, "comment_count", None)
+        if count is None:
+            count = obj.comments.count()
+        return count
+
+class PostDetailSerializer(PostSerializer):
+    comments = CommentSerializer(many=True, read_only=True)
+
 class BadgeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Badge
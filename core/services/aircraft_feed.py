@@ -3,24 +3,57 @@
 from __future__ import annotations
 
 import csv
+import heapq
 import io
 import logging
+import tempfile
+import threading
+import urllib.parse
 import urllib.request
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, fields
+from functools import partial
+from itertools import groupby, islice
+from operator import attrgetter, itemgetter
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, List, Optional, Set
+from typing import IO, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
 
 from django.conf import settings
-from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Max
 
-from core.models import Aircraft
+from core.aircraft_types import type_family
+from core.models import Aircraft, AircraftType, Operator
+
+from . import feed_cache, feed_compression, metrics
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
 
 
 class AircraftFeedError(RuntimeError):
     """Raised when a live aircraft feed cannot be retrieved."""
 
 
+class FeedCircuitOpen(AircraftFeedError, CircuitOpenError):
+    """Raised without contacting the feed while its circuit breaker is open."""
+
+
+class FeedHedged(AircraftFeedError):
+    """Raised when the feed has not answered within ``AIRCRAFT_FEED_HEDGE_SECONDS``."""
+
+
+# Shared by every worker through the cache: once the feed has failed
+# AIRCRAFT_FEED_BREAKER_FAILURES times in a row, requests skip straight to the
+# cached or bundled data until a single probe gets through again.
+feed_breaker = CircuitBreaker(
+    "aircraft-feed",
+    failure_threshold=lambda: settings.AIRCRAFT_FEED_BREAKER_FAILURES,
+    reset_timeout=lambda: settings.AIRCRAFT_FEED_BREAKER_RESET_SECONDS,
+    failure_types=(AircraftFeedError,),
+    open_error=FeedCircuitOpen,
+)
+
+
 logger = logging.getLogger(__name__)
 
 
@@ -93,19 +126,23 @@ class AircraftRecord:
         }
 
 
+FEED_HEADERS = {
+    "User-Agent": "PlaneSpotter/1.0 (+https://github.com/)",
+    "Accept": "text/csv,application/octet-stream",
+}
+
+
 def _open_feed(url: str) -> io.TextIOBase:
-    """Open the remote CSV feed with sane defaults."""
+    """Open the remote CSV feed with sane defaults, decompressing it as it arrives."""
 
     try:
         request = urllib.request.Request(
-            url,
-            headers={
-                "User-Agent": "PlaneSpotter/1.0 (+https://github.com/)",
-                "Accept": "text/csv,application/octet-stream",
-            },
+            url, headers={**FEED_HEADERS, "Accept-Encoding": feed_compression.accept_encoding()}
         )
         response = urllib.request.urlopen(request, timeout=settings.AIRCRAFT_FEED_TIMEOUT)
-        return io.TextIOWrapper(response, encoding="utf-8", errors="replace")
+        return feed_compression.open_text(
+            response, name=url, content_encoding=response.headers.get("Content-Encoding", "")
+        )
     except Exception as exc:  # pragma: no cover - network errors mocked in tests
         raise AircraftFeedError(str(exc)) from exc
 
@@ -117,6 +154,202 @@ def _iter_records(reader: Iterable[Dict[str, str]]) -> Iterator[AircraftRecord]:
             yield record
 
 
+def _matches(record: AircraftRecord, registration_filter: Optional[str], country_filter: Optional[str]) -> bool:
+    if registration_filter and registration_filter not in record.registration.lower():
+        return False
+    if country_filter and country_filter not in record.country.lower():
+        return False
+    return True
+
+
+def _read_records(
+    handle: io.TextIOBase,
+    *,
+    limit: Optional[int] = None,
+    registration_filter: Optional[str] = None,
+    country_filter: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    reader = csv.DictReader(handle)
+    matches: List[Dict[str, str]] = []
+    for record in _iter_records(reader):
+        if not _matches(record, registration_filter, country_filter):
+            continue
+        matches.append(record.as_dict())
+        if limit is not None and len(matches) >= limit:
+            break
+    return matches
+
+
+def cache_options() -> Dict[str, float]:
+    return {
+        "ttl": settings.AIRCRAFT_FEED_CACHE_SECONDS,
+        "stale_ttl": settings.AIRCRAFT_FEED_STALE_SECONDS,
+        "jitter": settings.AIRCRAFT_FEED_CACHE_JITTER,
+    }
+
+
+def _cached_limit(limit: Optional[int]) -> Optional[int]:
+    """Row count stored for an unfiltered request capped at ``limit``.
+
+    Every capped request shares the ``AIRCRAFT_FEED_MAX_RESULTS`` entry and is
+    sliced from it, so there is one key per feed to keep warm.
+    """
+
+    max_results = settings.AIRCRAFT_FEED_MAX_RESULTS
+    if limit is not None and max_results > 0:
+        return max_results
+    return limit
+
+
+def feed_cache_key(limit: Optional[int], url: Optional[str] = None) -> str:
+    limit_key = limit if limit is not None else "all"
+    return f"aircraft-feed:{limit_key}:{url or ''}"
+
+
+def refresh_live_fleet(*, url: Optional[str] = None) -> int:
+    """Download the feed into the cache ahead of expiry and return the row count.
+
+    Refreshes the entry every unfiltered :func:`fetch_live_fleet` call reads.
+    Unlike a request-time miss this never falls back to the bundled sample, so
+    :class:`AircraftFeedError` reaches the caller and the cached copy survives.
+    """
+
+    cached_limit = settings.AIRCRAFT_FEED_MAX_RESULTS or None
+    query = FeedQuery(cached_limit, cached_limit, feed_cache_key(cached_limit, url), None, None)
+    matches = feed_breaker.call(partial(_read_feed, url or settings.AIRCRAFT_FEED_URL, query))
+    feed_cache.store(feed_cache_key(cached_limit, url), matches, **cache_options())
+    return len(matches)
+
+
+@dataclass(frozen=True)
+class FeedQuery:
+    """How a :func:`fetch_live_fleet` call reads the feed and its cache.
+
+    ``limit`` is the number of rows returned, ``read_limit`` the number read
+    (and cached) and ``cache_key`` is ``None`` for uncached, filtered reads.
+    """
+
+    limit: Optional[int]
+    read_limit: Optional[int]
+    cache_key: Optional[str]
+    registration_filter: Optional[str]
+    country_filter: Optional[str]
+
+    @classmethod
+    def build(
+        cls,
+        *,
+        registration: Optional[str] = None,
+        country: Optional[str] = None,
+        limit: Optional[int] = None,
+        url: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> "FeedQuery":
+        max_results = settings.AIRCRAFT_FEED_MAX_RESULTS
+
+        unlimited_requested = limit is not None and limit <= 0
+        if unlimited_requested:
+            effective_limit: Optional[int] = None
+        else:
+            effective_limit = limit
+
+        if max_results > 0 and not unlimited_requested:
+            if effective_limit is None:
+                effective_limit = max_results
+            else:
+                effective_limit = min(effective_limit, max_results)
+
+        cache_key = None
+        read_limit = effective_limit
+
+        registration_filter = registration.lower() if registration else None
+        country_filter = country.lower() if country else None
+
+        if use_cache and registration_filter is None and country_filter is None:
+            read_limit = _cached_limit(effective_limit)
+            cache_key = feed_cache_key(read_limit, url)
+
+        return cls(effective_limit, read_limit, cache_key, registration_filter, country_filter)
+
+    def read(self, handle: io.TextIOBase) -> List[Dict[str, str]]:
+        return _read_records(
+            handle,
+            limit=self.read_limit,
+            registration_filter=self.registration_filter,
+            country_filter=self.country_filter,
+        )
+
+    def accepts(self, record: AircraftRecord) -> bool:
+        return _matches(record, self.registration_filter, self.country_filter)
+
+    def trim(self, matches: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        if self.limit is not None:
+            return matches[: self.limit]
+        return matches
+
+
+def open_fallback() -> io.TextIOBase:
+    if not FALLBACK_DATASET.exists():
+        raise AircraftFeedError("Aircraft feed is unavailable and no fallback dataset is bundled")
+    return feed_compression.open_file(FALLBACK_DATASET)
+
+
+def load_fallback(query: FeedQuery) -> List[Dict[str, str]]:
+    with open_fallback() as handle:
+        return query.read(handle)
+
+
+def _read_feed(url: str, query: FeedQuery) -> List[Dict[str, str]]:
+    try:
+        with _open_feed(url) as handle:
+            return query.read(handle)
+    except OSError as exc:
+        # Timeouts and resets while streaming the body, after _open_feed returned.
+        raise AircraftFeedError(str(exc)) from exc
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="aircraft-feed")
+_in_flight: Dict[Hashable, Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+def _finish_flight(key: Hashable, query: FeedQuery, future: Future) -> None:
+    with _in_flight_lock:
+        _in_flight.pop(key, None)
+    # A hedged caller has already answered from the fallback; keep what the
+    # slow download eventually produced for the next request.
+    if getattr(future, "hedged", False) and query.cache_key and future.exception() is None:
+        feed_cache.store(query.cache_key, future.result(), **cache_options())
+
+
+def load_feed(url: str, query: FeedQuery) -> List[Dict[str, str]]:
+    """Read the feed through :data:`feed_breaker`, hedged by a latency budget.
+
+    With ``AIRCRAFT_FEED_HEDGE_SECONDS`` set the download runs on a worker
+    thread (shared by concurrent identical requests) and :class:`FeedHedged` is
+    raised if it has not finished in time, so the caller can answer from the
+    cached or bundled data while the download carries on.
+    """
+
+    budget = settings.AIRCRAFT_FEED_HEDGE_SECONDS
+    if budget <= 0:
+        return feed_breaker.call(partial(_read_feed, url, query))
+
+    key = (url, query)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        if future is None:
+            future = _hedge_pool.submit(feed_breaker.call, partial(_read_feed, url, query))
+            _in_flight[key] = future
+            future.add_done_callback(partial(_finish_flight, key, query))
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeout:
+        future.hedged = True  # type: ignore[attr-defined]
+        metrics.increment("aircraft_feed_hedged_total")
+        raise FeedHedged(f"Aircraft feed did not answer within {budget}s") from None
+
+
 def fetch_live_fleet(
     *,
     registration: Optional[str] = None,
@@ -130,138 +363,357 @@ def fetch_live_fleet(
     Results can be filtered by registration substring and country (case insensitive).
     """
 
-    max_results = settings.AIRCRAFT_FEED_MAX_RESULTS
+    query = FeedQuery.build(
+        registration=registration, country=country, limit=limit, url=url, use_cache=use_cache
+    )
+    feed_url = url or settings.AIRCRAFT_FEED_URL
 
-    unlimited_requested = limit is not None and limit <= 0
-    if unlimited_requested:
-        effective_limit: Optional[int] = None
-    else:
-        effective_limit = limit
+    def _load_from_feed() -> List[Dict[str, str]]:
+        return load_feed(feed_url, query)
 
-    if max_results > 0 and not unlimited_requested:
-        if effective_limit is None:
-            effective_limit = max_results
+    try:
+        if query.cache_key:
+            # One worker downloads the feed when the entry goes stale; the rest
+            # keep serving the previous copy instead of stampeding the source.
+            matches = feed_cache.get_or_refresh(
+                query.cache_key,
+                _load_from_feed,
+                lock_timeout=settings.AIRCRAFT_FEED_LOCK_SECONDS,
+                **cache_options(),
+            )
         else:
-            effective_limit = min(effective_limit, max_results)
+            matches = _load_from_feed()
+    except AircraftFeedError as exc:
+        logger.warning("Falling back to bundled aircraft sample dataset", exc_info=True)
+        metrics.increment("aircraft_feed_fallback_total", {"reason": type(exc).__name__})
+        matches = load_fallback(query)
+        if query.cache_key:
+            feed_cache.store(query.cache_key, matches, **cache_options())
 
-    cache_key = None
+    return query.trim(matches)
 
-    registration_filter = registration.lower() if registration else None
-    country_filter = country.lower() if country else None
 
-    if use_cache and registration_filter is None and country_filter is None:
-        limit_key = effective_limit if effective_limit is not None else "all"
-        cache_key = f"aircraft-feed:{limit_key}:{url or ''}"
-        cached = cache.get(cache_key)
-        if cached is not None:
-            if effective_limit is None:
-                return cached
-            return cached[:effective_limit]
-
-    def _read_from_handle(handle: io.TextIOBase) -> List[Dict[str, str]]:
-        reader = csv.DictReader(handle)
-        matches: List[Dict[str, str]] = []
-        for record in _iter_records(reader):
-            if registration_filter and registration_filter not in record.registration.lower():
-                continue
-            if country_filter and country_filter not in record.country.lower():
-                continue
-            matches.append(record.as_dict())
-            if effective_limit is not None and len(matches) >= effective_limit:
-                break
-        return matches
+# Multi-source feeds --------------------------------------------------------
+#
+# The sync can combine several CSVs (OpenSky plus local registry extracts) into
+# one record per registration.  Each source is sorted by normalised
+# registration with an external merge sort -- runs of
+# AIRCRAFT_FEED_SORT_RUN_ROWS rows are sorted in memory and spilled to
+# temporary files -- and the sorted sources are then k-way merged, so memory
+# stays bounded however large the inputs are.
 
-    def _load_from_fallback() -> List[Dict[str, str]]:
-        if not FALLBACK_DATASET.exists():
-            raise AircraftFeedError("Aircraft feed is unavailable and no fallback dataset is bundled")
-        with FALLBACK_DATASET.open("r", encoding="utf-8") as handle:
-            return _read_from_handle(handle)
+RECORD_FIELDS: Tuple[str, ...] = tuple(field.name for field in fields(AircraftRecord))
+# Much cheaper than dataclasses.astuple(), which deep-copies every value.
+_record_values = attrgetter(*RECORD_FIELDS)
 
-    feed_url = url or settings.AIRCRAFT_FEED_URL
-    try:
-        with _open_feed(feed_url) as handle:
-            matches = _read_from_handle(handle)
-    except AircraftFeedError:
-        logger.warning("Falling back to bundled aircraft sample dataset", exc_info=True)
-        matches = _load_from_fallback()
 
-    if cache_key and not (registration_filter or country_filter):
-        cache.set(cache_key, matches, settings.AIRCRAFT_FEED_CACHE_SECONDS)
+def registration_key(registration: str) -> str:
+    """Registration normalised for matching across sources (``G-EZTH`` -> ``GEZTH``)."""
+
+    return "".join(char for char in registration.upper() if char.isalnum())
+
+
+def _column_name(name: Optional[str]) -> str:
+    # "Registered Country" and "registered_country" both read as OpenSky's
+    # "registeredcountry".
+    return "".join(char for char in (name or "").lower() if char.isalnum())
+
+
+@dataclass(frozen=True)
+class FeedSource:
+    """One CSV the aircraft table is synced from: a URL or a local file.
+
+    Columns are matched to the OpenSky names ignoring case, spaces and
+    punctuation, so a registry extract only needs recognisable headers.
+    """
+
+    name: str
+    location: str
+
+    @property
+    def remote(self) -> bool:
+        return urllib.parse.urlsplit(self.location).scheme in ("http", "https", "ftp", "file")
+
+    def open(self) -> io.TextIOBase:
+        if self.remote:
+            return _open_feed(self.location)
+        try:
+            return feed_compression.open_file(self.location)
+        except OSError as exc:
+            raise AircraftFeedError(f"Cannot read feed source {self.name}: {exc}") from exc
+
+    def records(self) -> Iterator[AircraftRecord]:
+        with self.open() as handle:
+            reader = csv.DictReader(handle)
+            try:
+                if reader.fieldnames:
+                    reader.fieldnames = [_column_name(name) for name in reader.fieldnames]
+                yield from _iter_records(reader)
+            except OSError as exc:
+                raise AircraftFeedError(f"Feed source {self.name} broke off: {exc}") from exc
+
+
+def feed_sources() -> List[FeedSource]:
+    """``AIRCRAFT_FEED_SOURCES`` in precedence order, or just ``AIRCRAFT_FEED_URL``."""
+
+    configured = [FeedSource(name, location) for name, location in settings.AIRCRAFT_FEED_SOURCES]
+    return configured or [FeedSource("opensky", settings.AIRCRAFT_FEED_URL)]
+
+
+_SortedRow = Tuple[str, int, Tuple[str, ...]]
+
+
+def _spill(run: List[_SortedRow]) -> IO[str]:
+    run.sort()
+    handle = tempfile.TemporaryFile("w+", encoding="utf-8", newline="", dir=settings.AIRCRAFT_FEED_SORT_DIR)
+    writer = csv.writer(handle)
+    writer.writerows((key, sequence, *values) for key, sequence, values in run)
+    handle.seek(0)
+    return handle
+
+
+def _read_run(handle: IO[str]) -> Iterator[_SortedRow]:
+    for key, sequence, *values in csv.reader(handle):
+        yield key, int(sequence), tuple(values)
 
-    return matches
+
+def sorted_records(source: FeedSource, run_rows: Optional[int] = None) -> Iterator[_SortedRow]:
+    """Yield ``(key, sequence, values)`` for ``source`` ordered by registration key.
+
+    Rows sharing a key keep their order in the source (``sequence``).  At most
+    ``run_rows`` rows are held in memory; longer sources spill sorted runs to
+    temporary files which are merged back as they are read.
+    """
+
+    run_rows = run_rows or settings.AIRCRAFT_FEED_SORT_RUN_ROWS
+    runs: List[IO[str]] = []
+    run: List[_SortedRow] = []
+    try:
+        for sequence, record in enumerate(source.records()):
+            key = registration_key(record.registration)
+            if not key:
+                continue
+            run.append((key, sequence, _record_values(record)))
+            if len(run) >= run_rows:
+                runs.append(_spill(run))
+                run = []
+        run.sort()
+        if runs:
+            logger.info("Feed source %s sorted in %d runs on disk", source.name, len(runs) + 1)
+        yield from heapq.merge(*(_read_run(handle) for handle in runs), run)
+    finally:
+        for handle in runs:
+            handle.close()
+
+
+def _tagged(index: int, rows: Iterator[_SortedRow]) -> Iterator[Tuple[str, int, int, Tuple[str, ...]]]:
+    for key, sequence, values in rows:
+        yield key, index, sequence, values
+
+
+def _field_orders(sources: List[FeedSource], precedence: Dict[str, Tuple[str, ...]]) -> List[List[int]]:
+    """Per field, the source indexes to take a value from, best first."""
+
+    positions = {source.name: index for index, source in enumerate(sources)}
+    default = list(range(len(sources)))
+    orders = []
+    for field_name in RECORD_FIELDS:
+        preferred = [positions[name] for name in precedence.get(field_name, ()) if name in positions]
+        orders.append(preferred + [index for index in default if index not in preferred])
+    return orders
+
+
+def merged_records(
+    sources: Optional[List[FeedSource]] = None,
+    *,
+    precedence: Optional[Dict[str, Tuple[str, ...]]] = None,
+    run_rows: Optional[int] = None,
+) -> Iterator[AircraftRecord]:
+    """Merge ``sources`` into one :class:`AircraftRecord` per registration.
+
+    Records come out ordered by :func:`registration_key`.  Each field takes the
+    first non-blank value from the sources in its precedence order
+    (``AIRCRAFT_FEED_FIELD_PRECEDENCE``, then source order); within one source
+    the first row for a registration wins.
+    """
+
+    sources = sources if sources is not None else feed_sources()
+    if precedence is None:
+        precedence = settings.AIRCRAFT_FEED_FIELD_PRECEDENCE
+    orders = _field_orders(sources, precedence)
+    streams = [_tagged(index, sorted_records(source, run_rows)) for index, source in enumerate(sources)]
+
+    for _, group in groupby(heapq.merge(*streams), key=itemgetter(0)):
+        by_source: Dict[int, Tuple[str, ...]] = {}
+        for _, index, _, values in group:
+            by_source.setdefault(index, values)
+        if len(by_source) == 1:
+            yield AircraftRecord(*next(iter(by_source.values())))
+            continue
+        merged = []
+        for position, order in enumerate(orders):
+            value = ""
+            for index in order:
+                if index in by_source and by_source[index][position]:
+                    value = by_source[index][position]
+                    break
+            merged.append(value)
+        yield AircraftRecord(*merged)
 
 
 def _trim(value: Optional[str], *, max_length: int) -> str:
     return (value or "").strip()[:max_length]
 
 
+class _InternMap:
+    """``name -> pk`` for a dimension table, loaded once per sync and extended in bulk.
+
+    A feed repeats a few thousand type and operator names across hundreds of
+    thousands of rows, so they are resolved from memory rather than the table.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.max_length: int = model._meta.get_field("name").max_length
+        self.ids: Dict[str, int] = dict(model.objects.values_list("name", "pk"))
+
+    def clean(self, value: Optional[str]) -> str:
+        return _trim(value, max_length=self.max_length)
+
+    def add(self, rows: Dict[str, Dict[str, str]]) -> None:
+        """Create the names in ``rows`` (with their extra fields) not stored yet."""
+
+        missing = {name: extra for name, extra in rows.items() if name and name not in self.ids}
+        if not missing:
+            return
+        self.model.objects.bulk_create(
+            [self.model(name=name, **extra) for name, extra in missing.items()], ignore_conflicts=True
+        )
+        self.ids.update(self.model.objects.filter(name__in=list(missing)).values_list("name", "pk"))
+
+    def get(self, name: str) -> Optional[int]:
+        return self.ids.get(name) if name else None
+
+
+def _sync_registration(entry: Dict[str, str]) -> str:
+    return _trim(entry.get("registration"), max_length=16).upper()
+
+
+def _sync_records(limit: Optional[int], use_cache: bool) -> Iterable[Dict[str, str]]:
+    """Feed rows with repeated registrations next to each other, first one first."""
+
+    sources = feed_sources()
+    if len(sources) == 1 and sources[0].location == settings.AIRCRAFT_FEED_URL:
+        # Already a list in memory; a stable sort keeps the first of repeats first.
+        return sorted(fetch_live_fleet(limit=limit, use_cache=use_cache), key=_sync_registration)
+    # Merged sources are streamed straight from disk rather than cached.
+    query = FeedQuery.build(limit=limit, use_cache=False)
+    return (record.as_dict() for record in islice(merged_records(sources), query.limit))
+
+
 def sync_aircraft_database(
     *,
     limit: Optional[int] = None,
     use_cache: bool = False,
     prune: bool = False,
 ) -> Dict[str, int]:
-    """Populate the local :class:`~core.models.Aircraft` table from the live feed."""
+    """Populate the local :class:`~core.models.Aircraft` table from the live feed.
+
+    Unless the only source is ``AIRCRAFT_FEED_URL`` the rows come from
+    :func:`merged_records`.  Rows are written ``AIRCRAFT_SYNC_BATCH_SIZE`` at a
+    time: each batch interns its new type and operator names in bulk, reads
+    the stored values of its registrations in one query and upserts them in
+    one more.  Every written aircraft is stamped with this sync's
+    ``sync_generation``, so pruning deletes the older stamps without holding
+    the registrations seen in memory.
+    """
 
-    records = fetch_live_fleet(limit=limit, use_cache=use_cache)
+    records = iter(_sync_records(limit, use_cache))
 
-    type_max = Aircraft._meta.get_field("type").max_length  # type: ignore[arg-type]
-    airline_max = Aircraft._meta.get_field("airline").max_length  # type: ignore[arg-type]
     country_max = Aircraft._meta.get_field("country").max_length  # type: ignore[arg-type]
 
+    processed = 0
     created = 0
     updated = 0
     skipped = 0
-    seen: Set[str] = set()
+    written = 0
+    previous = None
 
     with transaction.atomic():
-        for entry in records:
-            registration = _trim(entry.get("registration"), max_length=16).upper()
-            if not registration or registration in seen:
-                skipped += 1
-                continue
-
-            seen.add(registration)
-
-            type_value = _trim(
-                entry.get("model")
-                or entry.get("type_code")
-                or entry.get("icao_aircraft_type"),
-                max_length=type_max,
-            )
-            airline_value = _trim(entry.get("operator") or entry.get("owner"), max_length=airline_max)
-            country_value = _trim(entry.get("country"), max_length=country_max)
-
-            defaults = {
-                "type": type_value,
-                "airline": airline_value,
-                "country": country_value,
+        generation = (Aircraft.objects.aggregate(latest=Max("sync_generation"))["latest"] or 0) + 1
+        types = _InternMap(AircraftType)
+        operators = _InternMap(Operator)
+        while True:
+            batch = list(islice(records, settings.AIRCRAFT_SYNC_BATCH_SIZE))
+            if not batch:
+                break
+            processed += len(batch)
+
+            new_types: Dict[str, Dict[str, str]] = {}
+            new_operators: Dict[str, Dict[str, str]] = {}
+            rows = []
+            for entry in batch:
+                registration = _sync_registration(entry)
+                # Repeats arrive next to each other; the first one wins.
+                if not registration or registration == previous:
+                    skipped += 1
+                    continue
+                previous = registration
+
+                type_code = _trim(entry.get("type_code") or entry.get("icao_aircraft_type"), max_length=4).upper()
+                type_value = types.clean(
+                    entry.get("model")
+                    or entry.get("type_code")
+                    or entry.get("icao_aircraft_type")
+                )
+                airline_value = operators.clean(entry.get("operator") or entry.get("owner"))
+                country_value = _trim(entry.get("country"), max_length=country_max)
+
+                if type_value and type_value not in new_types:
+                    new_types[type_value] = {"type_code": type_code, "family": type_family(type_value, type_code)}
+                new_operators.setdefault(airline_value, {})
+                rows.append((registration, type_value, airline_value, country_value))
+
+            types.add(new_types)
+            operators.add(new_operators)
+
+            stored = {
+                registration: values
+                for registration, *values in Aircraft.objects.filter(
+                    registration__in=[row[0] for row in rows]
+                ).values_list("registration", "aircraft_type_id", "operator_id", "country")
             }
-
-            aircraft, created_flag = Aircraft.objects.get_or_create(
-                registration=registration, defaults=defaults
+            aircraft = []
+            for registration, type_value, airline_value, country_value in rows:
+                values = [types.get(type_value), operators.get(airline_value), country_value]
+                before = stored.get(registration)
+                if before is None:
+                    created += 1
+                elif before != values:
+                    updated += 1
+                aircraft.append(
+                    Aircraft(
+                        registration=registration,
+                        aircraft_type_id=values[0],
+                        operator_id=values[1],
+                        country=values[2],
+                        sync_generation=generation,
+                    )
+                )
+            Aircraft.objects.bulk_create(
+                aircraft,
+                update_conflicts=True,
+                unique_fields=["registration"],
+                update_fields=["aircraft_type", "operator", "country", "sync_generation"],
             )
+            written += len(aircraft)
 
-            if created_flag:
-                created += 1
-                continue
-
-            fields_to_update = []
-            for field, value in defaults.items():
-                if getattr(aircraft, field) != value:
-                    setattr(aircraft, field, value)
-                    fields_to_update.append(field)
-
-            if fields_to_update:
-                aircraft.save(update_fields=fields_to_update)
-                updated += 1
-
-    removed = 0
-    if prune and seen:
-        removed, _ = Aircraft.objects.exclude(registration__in=seen).delete()
+        removed = 0
+        if prune and written:
+            removed, _ = Aircraft.objects.filter(sync_generation__lt=generation).delete()
 
     summary = {
-        "processed": len(records),
+        "processed": processed,
         "created": created,
         "updated": updated,
         "skipped": skipped,
@@ -0,0 +1,352 @@
+"""Airport type-ahead served from a per-process prefix index.
+
+The index is a flattened trie: every word of an airport's ICAO and IATA
+codes, name and city goes into one sorted array, so the airports under a
+prefix are a contiguous slice found by two bisections.  Prefixes such as
+``e`` or ``inter`` cover thousands of airports, so their airports are kept
+ready-ranked and a lookup reads just the first few.  Narrower prefixes are
+ranked on demand.  An empty query browses every airport in rank order, and
+either kind of lookup can be narrowed to one country.
+
+Matches are ranked by popularity: logged sightings, spotting guides and an
+IATA code (which marks scheduled service).  A query that is exactly an
+airport's code puts that airport first.
+
+The signal handlers in :mod:`core.signals` patch this process's index as
+airports are saved or deleted.  They also bump a version stamp in the shared
+cache.  Other workers notice the new stamp within
+``AIRPORT_AUTOCOMPLETE_CHECK_SECONDS`` and rebuild from
+:func:`airports.airport_reference` in a background thread, answering from
+their old index until the new one is ready.  Popularity is recounted on each
+rebuild, which happens at least every ``AIRPORT_REFERENCE_CACHE_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Count
+
+from core.models import SpottingLocation, UserSeen
+
+from . import airports
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "airport-autocomplete-version"
+# Prefixes matching more (word, airport) pairs than this keep their airports
+# ready-ranked.
+DENSE_PREFIX = 256
+SPOT_WEIGHT = 10
+IATA_WEIGHT = 25
+MAX_LIMIT = 50
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_RANGE_END = "\uffff"
+
+
+def split_words(text: str) -> List[str]:
+    """Lower-cased, accent-free words of ``text``."""
+
+    folded = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return _WORD_RE.findall(folded.lower())
+
+
+def airport_words(row: Dict[str, Any]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(word for field in ("icao", "iata", "name", "city") for word in split_words(row[field])))
+
+
+def reference_row(instance) -> Dict[str, Any]:
+    """The :func:`airports.airport_reference` entry for an ``Airport`` instance."""
+
+    return {field: getattr(instance, field) for field in airports.REFERENCE_FIELDS}
+
+
+def popularity_counts() -> Dict[int, float]:
+    """Sightings plus weighted spotting guides, per airport id."""
+
+    scores: Dict[int, float] = {}
+    sightings = UserSeen.objects.filter(airport__isnull=False).values_list("airport").annotate(total=Count("id"))
+    for airport_id, total in sightings:
+        scores[airport_id] = scores.get(airport_id, 0) + total
+    for airport_id, total in SpottingLocation.objects.values_list("airport").annotate(total=Count("id")):
+        scores[airport_id] = scores.get(airport_id, 0) + SPOT_WEIGHT * total
+    return scores
+
+
+class AirportIndex:
+    """Prefix index over airport reference rows; see the module docstring."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]] = (), popularity: Optional[Dict[int, float]] = None):
+        self.popularity: Dict[int, float] = dict(popularity or {})
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.words: Dict[int, Tuple[str, ...]] = {}
+        self.ranks: Dict[int, Tuple[float, str]] = {}
+        self.codes: Dict[str, int] = {}
+        # Airports per country and per (city, country), for the directory summary.
+        self.countries: Counter = Counter()
+        self.cities: Counter = Counter()
+        entries = []
+        for row in rows:
+            self._remember(row)
+            entries.extend((word, row["id"]) for word in self.words[row["id"]])
+        # Sorted (word, airport id) pairs: the flattened trie.
+        self.entries: List[Tuple[str, int]] = sorted(entries)
+        # Every airport under each prefix covering more than DENSE_PREFIX
+        # entries, best first, so those prefixes are never scanned.  The empty
+        # prefix covers every airport.
+        self.ranked: Dict[str, List[int]] = {prefix: [] for prefix in self._find_dense()}
+        for airport_id in sorted(self.rows, key=self.ranks.__getitem__):
+            for prefix in self._dense_prefixes(self.words[airport_id]):
+                self.ranked[prefix].append(airport_id)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _find_dense(self) -> Iterator[str]:
+        # Walk down the trie from the root, splitting each wide slice by the
+        # next letter.
+        pending = [("", 0, len(self.entries))]
+        while pending:
+            prefix, start, stop = pending.pop()
+            if stop - start <= DENSE_PREFIX:
+                continue
+            yield prefix
+            position = start
+            while position < stop and len(self.entries[position][0]) == len(prefix):
+                position += 1
+            while position < stop:
+                child = self.entries[position][0][: len(prefix) + 1]
+                end = bisect_left(self.entries, (child + _RANGE_END,), position, stop)
+                pending.append((child, position, end))
+                position = end
+
+    def _remember(self, row: Dict[str, Any]) -> None:
+        airport_id = row["id"]
+        self.rows[airport_id] = row
+        self.words[airport_id] = airport_words(row)
+        score = self.popularity.get(airport_id, 0) + (IATA_WEIGHT if row["iata"] else 0)
+        self.ranks[airport_id] = (-score, row["icao"])
+        for code in (row["icao"], row["iata"]):
+            if code:
+                self.codes[code.lower()] = airport_id
+        self._count(row, 1)
+
+    def _count(self, row: Dict[str, Any], change: int) -> None:
+        country = row.get("country") or ""
+        keys = [(self.countries, country)] if country else []
+        if row["city"]:
+            keys.append((self.cities, (row["city"], country)))
+        for counter, key in keys:
+            counter[key] += change
+            if counter[key] <= 0:
+                del counter[key]
+
+    def _in_country(self, airport_id: int, country: str) -> bool:
+        return (self.rows[airport_id].get("country") or "").lower() == country
+
+    def _best(self, ids: Iterable[int], limit: int) -> List[int]:
+        return heapq.nsmallest(limit, ids, key=self.ranks.__getitem__)
+
+    def _span(self, prefix: str) -> Tuple[int, int]:
+        return (
+            bisect_left(self.entries, (prefix,)),
+            bisect_left(self.entries, (prefix + _RANGE_END,)),
+        )
+
+    def _ids(self, start: int, stop: int) -> Iterable[int]:
+        return dict.fromkeys(airport_id for _, airport_id in self.entries[start:stop])
+
+    def _dense_prefixes(self, words: Iterable[str]) -> List[str]:
+        prefixes = {word[:length] for word in words for length in range(len(word) + 1)}
+        return [prefix for prefix in prefixes if prefix in self.ranked]
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Index ``row``, replacing any earlier version of the same airport."""
+
+        self.remove(row["id"])
+        self._remember(row)
+        airport_id = row["id"]
+        for word in self.words[airport_id]:
+            insort(self.entries, (word, airport_id))
+        for prefix in self._dense_prefixes(self.words[airport_id]):
+            insort(self.ranked[prefix], airport_id, key=self.ranks.__getitem__)
+
+    def remove(self, airport_id: int) -> None:
+        row = self.rows.pop(airport_id, None)
+        if row is None:
+            return
+        stale = self.words.pop(airport_id)
+        self._count(row, -1)
+        for code in (row["icao"], row["iata"]):
+            if code and self.codes.get(code.lower()) == airport_id:
+                del self.codes[code.lower()]
+        for word in stale:
+            position = bisect_left(self.entries, (word, airport_id))
+            if position < len(self.entries) and self.entries[position] == (word, airport_id):
+                del self.entries[position]
+        for prefix in self._dense_prefixes(stale):
+            self.ranked[prefix].remove(airport_id)
+        self.ranks.pop(airport_id)
+
+    def search(self, query: str, limit: int = 10, country: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The ``limit`` best airports with a word starting with every query word.
+
+        An empty ``query`` matches every airport.  ``country`` (any case)
+        keeps only that country's airports.
+        """
+
+        if limit < 1:
+            return []
+        terms = split_words(query) or [""]
+        country = (country or "").strip().lower()
+        exact = self.codes.get("".join(terms))
+        if exact is not None and country and not self._in_country(exact, country):
+            exact = None
+        spans = {term: self._span(term) for term in terms}
+        # Start from the narrowest term and check the others word by word.
+        lead = min(spans, key=lambda term: spans[term][1] - spans[term][0])
+        rest = [term for term in spans if term != lead]
+        matches = (
+            airport_id
+            for airport_id in self.ranked.get(lead) or self._ids(*spans[lead])
+            if (not country or self._in_country(airport_id, country))
+            and all(any(word.startswith(term) for word in self.words[airport_id]) for term in rest)
+        )
+        if lead in self.ranked:
+            ids = list(islice(matches, limit))
+        else:
+            ids = self._best(matches, limit)
+        if exact is not None:
+            ids = [exact, *(airport_id for airport_id in ids if airport_id != exact)][:limit]
+        return [self.rows[airport_id] for airport_id in ids]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "airports": len(self.rows),
+            "countries": sorted(self.countries),
+            "cities": len(self.cities),
+        }
+
+
+_lock = threading.Lock()
+_index: Optional[AirportIndex] = None
+_version: Optional[str] = None
+_built_at = 0.0
+_checked_at = 0.0
+_rebuilding = False
+
+
+def build_index() -> AirportIndex:
+    return AirportIndex(airports.airport_reference(), popularity_counts())
+
+
+def _install(version: Optional[str], started: float) -> AirportIndex:
+    global _index, _version, _built_at
+    index = build_index()
+    with _lock:
+        _index, _version, _built_at = index, version, started
+    logger.info("Airport autocomplete index built with %d airports", len(index))
+    return index
+
+
+def _rebuild_in_background(version: Optional[str], started: float) -> None:
+    global _rebuilding
+    close_old_connections()
+    try:
+        _install(version, started)
+    except Exception:  # pragma: no cover - logged; the old index keeps serving
+        logger.exception("Airport autocomplete rebuild failed")
+    finally:
+        with _lock:
+            _rebuilding = False
+        close_old_connections()
+
+
+def get_index() -> AirportIndex:
+    """This process's index; a stale one is served while a thread rebuilds it.
+
+    It goes stale when another worker changed airports or it is older than
+    ``AIRPORT_REFERENCE_CACHE_SECONDS``.  Only the first call builds in line.
+    """
+
+    global _checked_at, _rebuilding
+    now = time.monotonic()
+    with _lock:
+        index = _index
+        if index is not None and now - _checked_at < settings.AIRPORT_AUTOCOMPLETE_CHECK_SECONDS:
+            return index
+        _checked_at = now
+        version = cache.get(VERSION_KEY)
+        if index is not None:
+            if _rebuilding or (
+                version == _version and now - _built_at < settings.AIRPORT_REFERENCE_CACHE_SECONDS
+            ):
+                return index
+            _rebuilding = True
+    if index is None:
+        return _install(version, now)
+    threading.Thread(
+        target=_rebuild_in_background, args=(version, now), name="airport-autocomplete", daemon=True
+    ).start()
+    return index
+
+
+def autocomplete(query: str, limit: int = 10, country: Optional[str] = None) -> List[Dict[str, Any]]:
+    index = get_index()
+    with _lock:
+        return index.search(query, min(limit, MAX_LIMIT), country)
+
+
+def directory_summary() -> Dict[str, Any]:
+    """Airport, country and city counts plus the country names, for browsing."""
+
+    index = get_index()
+    with _lock:
+        return index.summary()
+
+
+def _bump_version() -> str:
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def _apply(change) -> None:
+    global _version
+    with _lock:
+        if _index is not None:
+            change(_index)
+            # This process is already current; only the others need to rebuild.
+            _version = _bump_version()
+            return
+    _bump_version()
+
+
+def airport_saved(row: Dict[str, Any]) -> None:
+    _apply(lambda index: index.add(row))
+
+
+def airport_deleted(airport_id: int) -> None:
+    _apply(lambda index: index.remove(airport_id))
+
+
+def invalidate() -> None:
+    """Make every process rebuild, e.g. after a bulk import that sent no signals."""
+
+    global _index
+    with _lock:
+        _index = None
+    _bump_version()
@@ -0,0 +1,223 @@
+"""Bulk import of airports and frequencies from OurAirports-format CSVs.
+
+``airports.csv`` and ``airport-frequencies.csv`` from https://ourairports.com/data/
+(or any file with the same columns, optionally compressed) are streamed a
+chunk at a time.  Airports are upserted with a single ``INSERT ... ON
+CONFLICT (icao) DO UPDATE`` per chunk and each airport's frequencies are
+replaced wholesale, so a 70k-airport import takes seconds where per-row
+``save()`` calls took hours.  Grid squares for nearest-airport lookups
+(``Airport.spatial_cell``) are computed on the way in.
+
+``bulk_create`` skips model signals, so the search index, the cached
+airport reference and the autocomplete index are brought up to date once the
+import has committed.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import re
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from django.db import transaction
+
+from core.geo import spatial_cell
+from core.models import Airport, Frequency
+
+from . import airport_autocomplete, airports, feed_compression, search
+
+logger = logging.getLogger(__name__)
+
+ICAO_RE = re.compile(r"^[A-Z0-9]{4}$")
+# OurAirports types worth importing; "closed", "heliport" and "balloonport"
+# rows are left out unless asked for.
+DEFAULT_TYPES = frozenset({"large_airport", "medium_airport", "small_airport", "seaplane_base"})
+UPSERT_FIELDS = ["iata", "name", "city", "country", "lat", "lon", "spatial_cell"]
+SERVICE_NAMES = {
+    "TWR": "Tower",
+    "GND": "Ground",
+    "APP": "Approach",
+    "DEP": "Departure",
+    "ATIS": "ATIS",
+    "DEL": "Delivery",
+    "CLD": "Delivery",
+    "CNTR": "Centre",
+    "CTR": "Centre",
+    "AFIS": "AFIS",
+    "A/G": "Air/Ground",
+    "UNIC": "UNICOM",
+    "CTAF": "CTAF",
+    "RDR": "Radar",
+}
+MHZ_STEP = Decimal("0.001")
+MAX_MHZ = Decimal("999.999")
+
+
+class AirportImportError(ValueError):
+    """Raised when a file is not in the OurAirports format."""
+
+
+def _rows(path: Path, required: Iterable[str]) -> Iterator[Dict[str, str]]:
+    with feed_compression.open_file(path) as handle:
+        reader = csv.DictReader(handle)
+        missing = set(required) - set(reader.fieldnames or ())
+        if missing:
+            raise AirportImportError(f"{path} has no {', '.join(sorted(missing))} column")
+        yield from reader
+
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_countries(path: Optional[Path]) -> Dict[str, str]:
+    """ISO code -> name from OurAirports' ``countries.csv``; empty without a file."""
+
+    if path is None:
+        return {}
+    return {row["code"]: row["name"] for row in _rows(path, ("code", "name"))}
+
+
+def airport_icao(row: Dict[str, str]) -> str:
+    """The four-character code an OurAirports row is stored under, or ``""``."""
+
+    for column in ("icao_code", "ident", "gps_code"):
+        code = (row.get(column) or "").strip().upper()
+        if ICAO_RE.match(code):
+            return code
+    return ""
+
+
+class AirportImport:
+    """One import run; :attr:`summary` counts what happened to each row."""
+
+    def __init__(self, *, batch_size: int = 2000, types: Optional[Set[str]] = None, countries=None):
+        self.batch_size = batch_size
+        self.types = DEFAULT_TYPES if types is None else frozenset(types)
+        self.countries: Dict[str, str] = countries or {}
+        # OurAirports ident -> the icao the airport was stored under, so the
+        # frequency file (keyed on ident) can find it.
+        self.idents: Dict[str, str] = {}
+        self.summary = {
+            "airports": 0,
+            "skipped_airports": 0,
+            "frequencies": 0,
+            "skipped_frequencies": 0,
+        }
+
+    def _airport(self, row: Dict[str, str], seen: Set[str]) -> Optional[Airport]:
+        if row.get("type") not in self.types:
+            return None
+        icao = airport_icao(row)
+        if not icao or icao in seen:
+            return None
+        try:
+            lat = float(row["latitude_deg"])
+            lon = float(row["longitude_deg"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return None
+        seen.add(icao)
+        self.idents[row.get("ident") or icao] = icao
+        country = (row.get("iso_country") or "").strip()
+        return Airport(
+            icao=icao,
+            iata=(row.get("iata_code") or "").strip().upper()[:3],
+            name=(row.get("name") or icao).strip()[:200],
+            city=(row.get("municipality") or "").strip()[:120],
+            country=self.countries.get(country, country)[:120],
+            lat=lat,
+            lon=lon,
+            spatial_cell=spatial_cell(lat, lon),
+        )
+
+    def import_airports(self, path: Path) -> None:
+        seen: Set[str] = set()
+        rows = _rows(path, ("ident", "type", "name", "latitude_deg", "longitude_deg"))
+        for chunk in _chunks(rows, self.batch_size):
+            batch = []
+            for row in chunk:
+                airport = self._airport(row, seen)
+                if airport is None:
+                    self.summary["skipped_airports"] += 1
+                else:
+                    batch.append(airport)
+            Airport.objects.bulk_create(
+                batch, update_conflicts=True, unique_fields=["icao"], update_fields=UPSERT_FIELDS
+            )
+            self.summary["airports"] += len(batch)
+            logger.info("Airport import: %d airports written", self.summary["airports"])
+
+    def _frequency(self, row: Dict[str, str], airport_ids: Dict[str, int]) -> Optional[Frequency]:
+        ident = (row.get("airport_ident") or "").strip()
+        airport_id = airport_ids.get(self.idents.get(ident, ident.upper()))
+        if airport_id is None:
+            return None
+        try:
+            mhz = Decimal(row["frequency_mhz"]).quantize(MHZ_STEP)
+        except (KeyError, TypeError, InvalidOperation):
+            return None
+        if not 0 < mhz <= MAX_MHZ:
+            return None
+        code = (row.get("type") or "").strip().upper()
+        return Frequency(
+            airport_id=airport_id,
+            service=SERVICE_NAMES.get(code, code or "Unknown")[:100],
+            mhz=mhz,
+            description=(row.get("description") or "").strip(),
+        )
+
+    def import_frequencies(self, path: Path) -> None:
+        airport_ids = dict(Airport.objects.values_list("icao", "pk"))
+        # An airport's frequencies are replaced the first time any of them
+        # turns up, so rows for one airport may be spread across chunks.
+        replaced: Set[int] = set()
+        rows = _rows(path, ("airport_ident", "type", "frequency_mhz"))
+        for chunk in _chunks(rows, self.batch_size):
+            batch = []
+            for row in chunk:
+                frequency = self._frequency(row, airport_ids)
+                if frequency is None:
+                    self.summary["skipped_frequencies"] += 1
+                else:
+                    batch.append(frequency)
+            fresh = {frequency.airport_id for frequency in batch} - replaced
+            if fresh:
+                Frequency.objects.filter(airport_id__in=fresh).delete()
+                replaced |= fresh
+            Frequency.objects.bulk_create(batch)
+            self.summary["frequencies"] += len(batch)
+        logger.info("Airport import: %d frequencies written", self.summary["frequencies"])
+
+
+def import_ourairports(
+    airports_path: Path,
+    *,
+    frequencies_path: Optional[Path] = None,
+    countries_path: Optional[Path] = None,
+    types: Optional[Set[str]] = None,
+    batch_size: int = 2000,
+) -> Dict[str, int]:
+    """Upsert airports (and their frequencies) from OurAirports CSVs and summarise."""
+
+    job = AirportImport(batch_size=batch_size, types=types, countries=read_countries(countries_path))
+    with transaction.atomic():
+        job.import_airports(airports_path)
+        if frequencies_path is not None:
+            job.import_frequencies(frequencies_path)
+
+    # bulk_create() sent no post_save signals for any of this.
+    job.summary["indexed"] = search.rebuild_index(["airport"]).get("airport", 0)
+    airports.invalidate_airport_reference()
+    airport_autocomplete.invalidate()
+    return job.summary
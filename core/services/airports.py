@@ -0,0 +1,78 @@
+"""A cached, compact reference list of airports.
+
+Lookups that only need identifiers and coordinates (autocomplete, distance
+checks, the scheduler's warm-up) read this instead of querying the airport
+table with its related frequencies, spots and resources.
+"""
+
+from __future__ import annotations
+
+import heapq
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import geo
+from core.models import Airport
+
+from . import feed_cache
+
+AIRPORT_REFERENCE_KEY = "airport-reference"
+REFERENCE_FIELDS = ("id", "icao", "iata", "name", "city", "country", "lat", "lon")
+
+
+def build_airport_reference() -> List[Dict[str, Any]]:
+    return list(Airport.objects.order_by("icao").values(*REFERENCE_FIELDS))
+
+
+def _cache_options() -> Dict[str, float]:
+    return {
+        "ttl": settings.AIRPORT_REFERENCE_CACHE_SECONDS,
+        "stale_ttl": settings.AIRPORT_REFERENCE_CACHE_SECONDS,
+        "jitter": settings.AIRCRAFT_FEED_CACHE_JITTER,
+    }
+
+
+def airport_reference() -> List[Dict[str, Any]]:
+    return feed_cache.get_or_refresh(AIRPORT_REFERENCE_KEY, build_airport_reference, **_cache_options())
+
+
+def refresh_airport_reference() -> int:
+    reference = feed_cache.store(AIRPORT_REFERENCE_KEY, build_airport_reference(), **_cache_options())
+    return len(reference)
+
+
+def invalidate_airport_reference() -> None:
+    cache.delete(AIRPORT_REFERENCE_KEY)
+
+
+# Grid squares read either side of the point before falling back to the whole
+# table, so a lookup costs at most three queries however remote the point.
+NEAREST_RADII = (1, 8)
+
+
+def _closest(lat: float, lon: float, rows: Iterable[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    return heapq.nsmallest(
+        limit,
+        ({**row, "distance_km": round(geo.haversine_km(lat, lon, row["lat"], row["lon"]), 2)} for row in rows),
+        key=itemgetter("distance_km"),
+    )
+
+
+def nearest_airports(lat: float, lon: float, *, limit: int = 5) -> List[Dict[str, Any]]:
+    """The ``limit`` airports closest to ``(lat, lon)``, nearest first.
+
+    Reads the indexed grid squares around the point, widening the search while
+    the ``limit``-th match could still be beaten by one outside the squares
+    read, and finally reads the whole table.  Each result is a reference row
+    plus ``distance_km``.
+    """
+
+    rows = Airport.objects.values(*REFERENCE_FIELDS)
+    for radius in NEAREST_RADII:
+        found = _closest(lat, lon, rows.filter(spatial_cell__in=geo.cells_around(lat, lon, radius)), limit)
+        if len(found) >= limit and found[-1]["distance_km"] <= geo.covered_km(lat, lon, radius):
+            return found
+    return _closest(lat, lon, rows, limit)
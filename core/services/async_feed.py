@@ -0,0 +1,250 @@
+"""Async access to the aircraft feed for ASGI deployments.
+
+:func:`afetch_live_fleet` mirrors :func:`core.services.aircraft_feed.fetch_live_fleet`
+without tying up a thread while upstream is slow: the CSV is streamed through
+an ``httpx.AsyncClient`` and parsed incrementally, so reading stops as soon as
+enough rows have matched.  Without ``httpx`` installed the blocking reader runs
+chunk by chunk in worker threads.
+
+Clients are pooled per event loop only on loops registered with
+:func:`enable_pooling` by the ASGI lifespan, whose shutdown closes them again.
+Elsewhere (WSGI, where ``async_to_sync`` runs each request on a fresh loop)
+every request opens and closes its own client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Dict, Hashable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import aircraft_feed, feed_cache, feed_compression, metrics
+from .aircraft_feed import AircraftFeedError, AircraftRecord, FeedHedged, FeedQuery
+
+try:  # pragma: no cover - exercised only where httpx is installed
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_pooled_loops: "weakref.WeakSet[asyncio.AbstractEventLoop]" = weakref.WeakSet()
+
+
+def _new_client() -> "httpx.AsyncClient":
+    return httpx.AsyncClient(
+        headers=aircraft_feed.FEED_HEADERS,
+        timeout=httpx.Timeout(settings.AIRCRAFT_FEED_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.AIRCRAFT_FEED_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AIRCRAFT_FEED_MAX_CONNECTIONS,
+        ),
+        follow_redirects=True,
+    )
+
+
+def enable_pooling() -> None:
+    """Share one client on the running loop; call from ASGI lifespan startup."""
+
+    _pooled_loops.add(asyncio.get_running_loop())
+
+
+@asynccontextmanager
+async def _client() -> AsyncIterator["httpx.AsyncClient"]:
+    loop = asyncio.get_running_loop()
+    if loop not in _pooled_loops:
+        async with _new_client() as client:
+            yield client
+        return
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = _new_client()
+    yield client
+
+
+async def aclose_clients() -> None:
+    """Close the pooled clients; call on ASGI shutdown."""
+
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+    _pooled_loops.clear()
+
+
+async def _thread_chunks(handle) -> AsyncIterator[str]:
+    while True:
+        chunk = await asyncio.to_thread(handle.read, READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+@asynccontextmanager
+async def open_feed(url: str) -> AsyncIterator[AsyncIterator[str]]:
+    """Yield the feed at ``url`` as an async iterator of decoded text chunks."""
+
+    if httpx is None:
+        handle = await asyncio.to_thread(aircraft_feed._open_feed, url)
+        try:
+            yield _thread_chunks(handle)
+        finally:
+            await asyncio.to_thread(handle.close)
+        return
+
+    try:
+        async with _client() as client, client.stream("GET", url) as response:
+            response.raise_for_status()
+            # httpx has undone any Content-Encoding; the payload itself may
+            # still be a compressed file.
+            yield feed_compression.atext_chunks(feed_compression.adecoded_chunks(response.aiter_bytes(), name=url))
+    except httpx.HTTPError as exc:
+        raise AircraftFeedError(str(exc)) from exc
+
+
+async def aiter_csv_rows(chunks: AsyncIterator[str]) -> AsyncIterator[Dict[str, str]]:
+    """Parse CSV text arriving in arbitrary chunks into header-keyed rows.
+
+    A record is only handed to :mod:`csv` once its quotes balance, so quoted
+    fields containing newlines survive being split across chunks.
+    """
+
+    header: Optional[List[str]] = None
+    pending = ""
+    record = ""
+
+    def parse(text: str) -> Optional[Dict[str, str]]:
+        nonlocal header
+        values = next(csv.reader([text]), None)
+        if not values:
+            return None
+        if header is None:
+            header = values
+            return None
+        return dict(zip(header, values))
+
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            record = f"{record}\n{line}" if record else line
+            if record.count('"') % 2:
+                continue
+            row = parse(record.rstrip("\r"))
+            record = ""
+            if row is not None:
+                yield row
+
+    tail = f"{record}\n{pending}" if record else pending
+    if tail.strip():
+        row = parse(tail.rstrip("\r"))
+        if row is not None:
+            yield row
+
+
+async def _aread_records(chunks: AsyncIterator[str], query: FeedQuery) -> List[Dict[str, str]]:
+    matches: List[Dict[str, str]] = []
+    async for row in aiter_csv_rows(chunks):
+        record = AircraftRecord.from_row(row)
+        if not (record.registration or record.icao24) or not query.accepts(record):
+            continue
+        matches.append(record.as_dict())
+        if query.read_limit is not None and len(matches) >= query.read_limit:
+            break
+    return matches
+
+
+async def _aread_feed(url: str, query: FeedQuery) -> List[Dict[str, str]]:
+    try:
+        async with open_feed(url) as chunks:
+            return await _aread_records(chunks, query)
+    except OSError as exc:
+        raise AircraftFeedError(str(exc)) from exc
+
+
+_in_flight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _finish_flight(flights: Dict[Hashable, "asyncio.Task"], key: Hashable, query: FeedQuery, task: "asyncio.Task") -> None:
+    flights.pop(key, None)
+    if getattr(task, "hedged", False) and query.cache_key and not task.cancelled() and task.exception() is None:
+        # Runs on the loop; hand the blocking cache write to a thread.
+        asyncio.get_running_loop().run_in_executor(
+            None, partial(feed_cache.store, query.cache_key, task.result(), **aircraft_feed.cache_options())
+        )
+
+
+async def aload_feed(url: str, query: FeedQuery) -> List[Dict[str, str]]:
+    """Async :func:`~core.services.aircraft_feed.load_feed`: breaker plus hedging."""
+
+    breaker = aircraft_feed.feed_breaker
+    budget = settings.AIRCRAFT_FEED_HEDGE_SECONDS
+    if budget <= 0:
+        return await breaker.acall(partial(_aread_feed, url, query))
+
+    flights = _in_flight.setdefault(asyncio.get_running_loop(), {})
+    key = (url, query)
+    task = flights.get(key)
+    if task is None:
+        task = asyncio.ensure_future(breaker.acall(partial(_aread_feed, url, query)))
+        flights[key] = task
+        task.add_done_callback(partial(_finish_flight, flights, key, query))
+    # shield() keeps the download going for later requests when this one
+    # stops waiting for it.
+    done, _ = await asyncio.wait({asyncio.shield(task)}, timeout=budget)
+    if done:
+        return task.result()
+    task.hedged = True  # type: ignore[attr-defined]
+    metrics.increment("aircraft_feed_hedged_total")
+    raise FeedHedged(f"Aircraft feed did not answer within {budget}s")
+
+
+async def afetch_live_fleet(
+    *,
+    registration: Optional[str] = None,
+    country: Optional[str] = None,
+    limit: Optional[int] = None,
+    url: Optional[str] = None,
+    use_cache: bool = True,
+) -> List[Dict[str, str]]:
+    """Async :func:`~core.services.aircraft_feed.fetch_live_fleet` sharing its cache."""
+
+    query = FeedQuery.build(
+        registration=registration, country=country, limit=limit, url=url, use_cache=use_cache
+    )
+    feed_url = url or settings.AIRCRAFT_FEED_URL
+
+    async def _load_from_feed() -> List[Dict[str, str]]:
+        return await aload_feed(feed_url, query)
+
+    try:
+        if query.cache_key:
+            matches = await feed_cache.aget_or_refresh(
+                query.cache_key,
+                _load_from_feed,
+                lock_timeout=settings.AIRCRAFT_FEED_LOCK_SECONDS,
+                **aircraft_feed.cache_options(),
+            )
+        else:
+            matches = await _load_from_feed()
+    except AircraftFeedError as exc:
+        logger.warning("Falling back to bundled aircraft sample dataset", exc_info=True)
+        metrics.increment("aircraft_feed_fallback_total", {"reason": type(exc).__name__})
+        matches = await asyncio.to_thread(aircraft_feed.load_fallback, query)
+        if query.cache_key:
+            await sync_to_async(feed_cache.store, thread_sensitive=False)(
+                query.cache_key, matches, **aircraft_feed.cache_options()
+            )
+
+    return query.trim(matches)
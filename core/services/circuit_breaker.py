@@ -0,0 +1,139 @@
+"""A circuit breaker whose state is shared by every worker through the cache.
+
+``closed``: calls go through; consecutive failures are counted.
+``open``: after ``failure_threshold`` failures calls fail fast with
+:class:`CircuitOpenError` for ``reset_timeout`` seconds.
+``half_open``: once the timeout passes, exactly one caller (holding the probe
+lock) is let through.  Its success closes the circuit; its failure re-opens it.
+
+Every transition is logged and counted in ``circuit_breaker_transitions_total``.
+State updates are read-modify-write on the cache, so under heavy concurrency a
+failure count can be off by one; the open/close decisions stay sound.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from . import feed_cache, metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: Callable[[], int] | int,
+        reset_timeout: Callable[[], float] | float,
+        failure_types: Tuple[Type[BaseException], ...] = (Exception,),
+        open_error: Type[CircuitOpenError] = CircuitOpenError,
+    ):
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self.failure_types = failure_types
+        self.open_error = open_error
+
+    @property
+    def failure_threshold(self) -> int:
+        value = self._failure_threshold
+        return value() if callable(value) else value
+
+    @property
+    def reset_timeout(self) -> float:
+        value = self._reset_timeout
+        return value() if callable(value) else value
+
+    @property
+    def _key(self) -> str:
+        return f"circuit:{self.name}"
+
+    def state(self) -> Dict[str, Any]:
+        return cache.get(self._key) or {"state": CLOSED, "failures": 0, "opened_at": None}
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        # Outlive the open window comfortably; an expired key reads as closed.
+        cache.set(self._key, state, max(int(self.reset_timeout * 10), 3600))
+
+    def _transition(self, state: Dict[str, Any], to: str, **values: Any) -> Dict[str, Any]:
+        previous = state["state"]
+        state = {**state, **values, "state": to}
+        self._save(state)
+        if previous != to:
+            logger.warning("Circuit %s: %s -> %s", self.name, previous, to)
+            metrics.increment(
+                "circuit_breaker_transitions_total",
+                {"breaker": self.name, "from": previous, "to": to},
+            )
+        return state
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (taking the probe if half-open)."""
+
+        state = self.state()
+        if state["state"] == CLOSED:
+            return True
+        if time.time() - (state["opened_at"] or 0) < self.reset_timeout:
+            return False
+        # One probe per reset window; the lock lapses with the window, so a
+        # probe that never reports back does not wedge the circuit half-open.
+        if feed_cache.acquire_lock(self._key, self.reset_timeout) is None:
+            return False
+        self._transition(state, HALF_OPEN)
+        return True
+
+    def record_success(self) -> None:
+        state = self.state()
+        if state["state"] != CLOSED or state["failures"]:
+            self._transition(state, CLOSED, failures=0, opened_at=None)
+
+    def record_failure(self) -> None:
+        state = self.state()
+        failures = state["failures"] + 1
+        if state["state"] == HALF_OPEN or failures >= self.failure_threshold:
+            self._transition(state, OPEN, failures=failures, opened_at=time.time())
+        else:
+            self._save({**state, "failures": failures})
+
+    def _reject(self) -> CircuitOpenError:
+        metrics.increment("circuit_breaker_rejections_total", {"breaker": self.name})
+        return self.open_error(f"Circuit {self.name} is open; skipping the call.")
+
+    def call(self, func: Callable[[], T]) -> T:
+        if not self.allow():
+            raise self._reject()
+        try:
+            result = func()
+        except self.failure_types:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, func: Callable[[], Awaitable[T]]) -> T:
+        if not await sync_to_async(self.allow, thread_sensitive=False)():
+            raise self._reject()
+        try:
+            result = await func()
+        except self.failure_types:
+            await sync_to_async(self.record_failure, thread_sensitive=False)()
+            raise
+        await sync_to_async(self.record_success, thread_sensitive=False)()
+        return result
@@ -0,0 +1,236 @@
+"""Stampede-protected caching for expensive feed downloads.
+
+Entries are stored as ``{"value": ..., "fresh_until": <epoch>}`` and kept in the
+cache for a stale window beyond their freshness.  When an entry goes stale a
+single worker (across processes, as long as ``CACHES`` is shared) takes a
+refresh lock and reloads it while every other caller keeps serving the stale
+value.  Freshness is jittered so keys written together do not expire together.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+logger = logging.getLogger(__name__)
+
+# How often a caller that lost the refresh race re-checks for a cold entry.
+WAIT_INTERVAL = 0.1
+
+
+def jittered(seconds: float, jitter: float) -> float:
+    """Spread ``seconds`` uniformly by ``±jitter`` (a fraction of ``seconds``)."""
+
+    if seconds <= 0 or jitter <= 0:
+        return seconds
+    return seconds * random.uniform(1 - jitter, 1 + jitter)
+
+
+def _lock_key(key: str) -> str:
+    return f"{key}:refresh-lock"
+
+
+def _file_lock_path(key: str) -> Optional[Path]:
+    # FileBasedCache.add() checks and then writes, so two processes can both
+    # "win" it.  Use an O_EXCL lock file among the cache files instead; it
+    # carries the cache's file suffix so cache.clear() removes it too.
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if not isinstance(backend, FileBasedCache):
+        return None
+    return Path(backend._key_to_file(f"{_lock_key(key)}:file"))
+
+
+def acquire_lock(key: str, timeout: float) -> Optional[str]:
+    """Try to take the refresh lock for ``key``; return a token on success."""
+
+    token = uuid.uuid4().hex
+    path = _file_lock_path(key)
+    if path is None:
+        return token if cache.add(_lock_key(key), token, timeout) else None
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if time.time() - path.stat().st_mtime > timeout:
+            # The holder died without releasing it.
+            path.unlink(missing_ok=True)
+    except FileNotFoundError:
+        pass
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, "w") as handle:
+        handle.write(token)
+    return token
+
+
+def release_lock(key: str, token: str) -> None:
+    path = _file_lock_path(key)
+    if path is None:
+        if cache.get(_lock_key(key)) == token:
+            cache.delete(_lock_key(key))
+        return
+    try:
+        if path.read_text() == token:
+            path.unlink(missing_ok=True)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def single_flight(key: str, timeout: float) -> Iterator[bool]:
+    """Yield ``True`` to the one caller allowed to refresh ``key``."""
+
+    token = acquire_lock(key, timeout)
+    try:
+        yield token is not None
+    finally:
+        if token is not None:
+            release_lock(key, token)
+
+
+def peek(key: str) -> Optional[Dict[str, Any]]:
+    """Return the raw cache envelope for ``key`` (``value`` and ``fresh_until``)."""
+
+    entry = cache.get(key)
+    if isinstance(entry, dict) and "fresh_until" in entry:
+        return entry
+    return None
+
+
+def store(key: str, value: Any, *, ttl: float, stale_ttl: float, jitter: float = 0.0) -> Any:
+    fresh_for = jittered(ttl, jitter)
+    cache.set(key, {"value": value, "fresh_until": time.time() + fresh_for}, int(fresh_for + stale_ttl) or None)
+    return value
+
+
+def get_or_refresh(
+    key: str,
+    loader: Callable[[], Any],
+    *,
+    ttl: float,
+    stale_ttl: float,
+    jitter: float = 0.0,
+    lock_timeout: float = 60.0,
+    retry_after: float = 60.0,
+) -> Any:
+    """Return the cached value for ``key``, refreshing it at most once at a time.
+
+    - fresh: returned as is;
+    - stale: the lock holder reloads it, everyone else gets the stale value.  A
+      failed reload keeps serving the stale value and retries after
+      ``retry_after`` seconds;
+    - missing: the lock holder loads it while the others wait up to
+      ``lock_timeout`` for the result before loading it themselves.
+    """
+
+    entry = peek(key)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["value"]
+
+    with single_flight(key, lock_timeout) as leader:
+        if leader:
+            # Someone may have refreshed between our read and taking the lock.
+            current = peek(key)
+            if current is not None and current["fresh_until"] > time.time():
+                return current["value"]
+            try:
+                return store(key, loader(), ttl=ttl, stale_ttl=stale_ttl, jitter=jitter)
+            except Exception:
+                if entry is None:
+                    raise
+                logger.warning("Refreshing %s failed; serving the stale copy", key, exc_info=True)
+                store(key, entry["value"], ttl=retry_after, stale_ttl=stale_ttl)
+                return entry["value"]
+
+    if entry is not None:
+        return entry["value"]
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = peek(key)
+        if entry is not None:
+            return entry["value"]
+    logger.warning("Timed out waiting for %s to be refreshed; loading it directly", key)
+    return store(key, loader(), ttl=ttl, stale_ttl=stale_ttl, jitter=jitter)
+
+
+# Cache backends are synchronous; run them off the event loop without pinning
+# every call to the single thread ``thread_sensitive=True`` would use.
+_apeek = sync_to_async(peek, thread_sensitive=False)
+_astore = sync_to_async(store, thread_sensitive=False)
+_aacquire_lock = sync_to_async(acquire_lock, thread_sensitive=False)
+_arelease_lock = sync_to_async(release_lock, thread_sensitive=False)
+
+# Strong references to background refreshes so they are not garbage collected.
+_background: Set["asyncio.Task[Any]"] = set()
+
+
+async def aget_or_refresh(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    *,
+    ttl: float,
+    stale_ttl: float,
+    jitter: float = 0.0,
+    lock_timeout: float = 60.0,
+    retry_after: float = 60.0,
+) -> Any:
+    """Async :func:`get_or_refresh`; stale entries are refreshed in the background.
+
+    No caller waits for a stale entry to be reloaded: the value is returned at
+    once and the lock holder reloads it in a task on the running loop.
+    """
+
+    options = {"ttl": ttl, "stale_ttl": stale_ttl, "jitter": jitter}
+    entry = await _apeek(key)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["value"]
+
+    token = await _aacquire_lock(key, lock_timeout)
+
+    async def reload() -> Any:
+        try:
+            current = await _apeek(key)
+            if current is not None and current["fresh_until"] > time.time():
+                return current["value"]
+            return await _astore(key, await loader(), **options)
+        except Exception:
+            if entry is None:
+                raise
+            logger.warning("Refreshing %s failed; serving the stale copy", key, exc_info=True)
+            await _astore(key, entry["value"], ttl=retry_after, stale_ttl=stale_ttl)
+            return entry["value"]
+        finally:
+            await _arelease_lock(key, token)
+
+    if entry is not None:
+        if token is not None:
+            task = asyncio.get_running_loop().create_task(reload())
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        return entry["value"]
+
+    if token is not None:
+        return await reload()
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(WAIT_INTERVAL)
+        entry = await _apeek(key)
+        if entry is not None:
+            return entry["value"]
+    logger.warning("Timed out waiting for %s to be refreshed; loading it directly", key)
+    return await _astore(key, await loader(), **options)
@@ -0,0 +1,310 @@
+"""Streaming decompression for aircraft feed downloads and local snapshots.
+
+OpenSky and registry mirrors publish their CSVs compressed.  A download may be
+compressed in transit (``Content-Encoding``), be a compressed file in its own
+right (recognised by its magic bytes), or both; local snapshots are recognised
+the same way, with the file extension as a last resort.  Every layer is
+decoded chunk by chunk as the bytes arrive, so the CSV parser starts on the
+first rows straight away and the decompressed file never exists in full,
+in memory or on disk.
+
+gzip, deflate, bzip2, xz and legacy ``.lzma`` use the standard library; zstd
+needs the optional ``zstandard`` package.
+"""
+
+from __future__ import annotations
+
+import bz2
+import codecs
+import io
+import logging
+import lzma
+import zlib
+from pathlib import PurePosixPath
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:  # pragma: no cover - exercised only where zstandard is installed
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+SNIFF_BYTES = 6
+
+MAGIC: Tuple[Tuple[bytes, str], ...] = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bzip2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+EXTENSIONS: Dict[str, str] = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bzip2",
+    ".xz": "xz",
+    ".lzma": "lzma",  # no reliable magic bytes, so only known by name
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+CONTENT_ENCODINGS: Dict[str, str] = {
+    "gzip": "gzip",
+    "x-gzip": "gzip",
+    "deflate": "deflate",
+    "zstd": "zstd",
+}
+
+
+class CompressedFeedError(OSError):
+    """Raised when compressed feed data is corrupt or ends part-way through."""
+
+
+class UnsupportedCompression(CompressedFeedError):
+    """Raised for a format this installation cannot decode (zstd without ``zstandard``)."""
+
+
+def _zstd():
+    if zstandard is None:
+        raise UnsupportedCompression("zstd-compressed feeds need the zstandard package")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+_DECOMPRESSORS: Dict[str, Callable[[], object]] = {
+    "gzip": lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    "deflate": zlib.decompressobj,
+    "bzip2": bz2.BZ2Decompressor,
+    "xz": lzma.LZMADecompressor,
+    "lzma": lzma.LZMADecompressor,
+    "zstd": _zstd,
+}
+# Formats whose files may carry null padding between members.
+_PADDED = frozenset({"gzip", "xz"})
+_DECODE_ERRORS: Tuple[type, ...] = (zlib.error, lzma.LZMAError, OSError, EOFError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+def accept_encoding() -> str:
+    """``Accept-Encoding`` for feed downloads: every coding we can decode."""
+
+    codings = ["gzip", "deflate"]
+    if zstandard is not None:
+        codings.insert(0, "zstd")
+    return ", ".join(codings)
+
+
+def content_encodings(header: Optional[str]) -> List[str]:
+    """Formats to undo for ``Content-Encoding: header``, outermost first."""
+
+    codings = [coding.strip().lower() for coding in (header or "").split(",")]
+    formats = []
+    for coding in reversed(codings):
+        if coding in ("", "identity"):
+            continue
+        if coding not in CONTENT_ENCODINGS:
+            raise UnsupportedCompression(f"Unsupported Content-Encoding {coding!r}")
+        formats.append(CONTENT_ENCODINGS[coding])
+    return formats
+
+
+def detect(prefix: bytes, name: str = "") -> Optional[str]:
+    """The compression format of a stream starting with ``prefix``, if any.
+
+    Magic bytes decide; ``name`` (a path or URL) only counts when they say
+    nothing, since a server may already have decompressed a ``.gz`` URL.
+    """
+
+    for magic, fmt in MAGIC:
+        if prefix.startswith(magic):
+            return fmt
+    suffix = PurePosixPath(name.split("?", 1)[0]).suffix.lower()
+    if EXTENSIONS.get(suffix) == "lzma":
+        return "lzma"
+    return None
+
+
+class _Decoder:
+    """Feed bytes through a decompressor, restarting at each member boundary."""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.decoder = _DECOMPRESSORS[fmt]()
+        self.between_members = True
+
+    def feed(self, chunk: bytes) -> bytes:
+        output = []
+        try:
+            while chunk:
+                if self.between_members and self.fmt in _PADDED:
+                    # gzip writers may pad the file with zeros after the last
+                    # member, and xz allows stream padding between streams.
+                    chunk = chunk.lstrip(b"\x00")
+                    if not chunk:
+                        break
+                output.append(self.decoder.decompress(chunk))
+                self.between_members = False
+                if getattr(self.decoder, "eof", False):
+                    # Concatenated members (``cat a.gz b.gz``) each start afresh.
+                    chunk = self.decoder.unused_data
+                    self.decoder = _DECOMPRESSORS[self.fmt]()
+                    self.between_members = True
+                else:
+                    chunk = b""
+        except _DECODE_ERRORS as exc:
+            raise CompressedFeedError(f"Corrupt {self.fmt} data: {exc}") from exc
+        return b"".join(output)
+
+    def finish(self) -> None:
+        if not self.between_members and hasattr(self.decoder, "eof"):
+            raise CompressedFeedError(f"{self.fmt} data ended before the end of the stream")
+
+
+def decompress_chunks(chunks: Iterable[bytes], fmt: str) -> Iterator[bytes]:
+    """Decode ``chunks`` of ``fmt`` incrementally, including multi-member files."""
+
+    decoder = _Decoder(fmt)
+    for chunk in chunks:
+        data = decoder.feed(chunk)
+        if data:
+            yield data
+    decoder.finish()
+
+
+async def adecompress_chunks(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[bytes]:
+    """Async :func:`decompress_chunks`."""
+
+    decoder = _Decoder(fmt)
+    async for chunk in chunks:
+        data = decoder.feed(chunk)
+        if data:
+            yield data
+    decoder.finish()
+
+
+def _sniff(chunks: Iterator[bytes]) -> Tuple[bytes, Iterator[bytes]]:
+    """Read the first bytes of ``chunks`` and return them with the stream intact."""
+
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= SNIFF_BYTES:
+            break
+
+    def rejoined() -> Iterator[bytes]:
+        if head:
+            yield head
+        yield from chunks
+
+    return head[:SNIFF_BYTES], rejoined()
+
+
+async def _asniff(chunks: AsyncIterator[bytes]) -> Tuple[bytes, AsyncIterator[bytes]]:
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= SNIFF_BYTES:
+            break
+
+    async def rejoined() -> AsyncIterator[bytes]:
+        if head:
+            yield head
+        async for chunk in chunks:
+            yield chunk
+
+    return head[:SNIFF_BYTES], rejoined()
+
+
+def decoded_chunks(chunks: Iterable[bytes], *, name: str = "", content_encoding: str = "") -> Iterator[bytes]:
+    """Undo ``Content-Encoding`` and then any compression the payload itself has."""
+
+    stream: Iterator[bytes] = iter(chunks)
+    for fmt in content_encodings(content_encoding):
+        stream = decompress_chunks(stream, fmt)
+    prefix, stream = _sniff(stream)
+    fmt = detect(prefix, name)
+    if fmt:
+        logger.debug("Decoding %s as %s", name or "feed", fmt)
+        stream = decompress_chunks(stream, fmt)
+    return stream
+
+
+async def adecoded_chunks(
+    chunks: AsyncIterator[bytes], *, name: str = "", content_encoding: str = ""
+) -> AsyncIterator[bytes]:
+    """Async :func:`decoded_chunks`."""
+
+    for fmt in content_encodings(content_encoding):
+        chunks = adecompress_chunks(chunks, fmt)
+    prefix, chunks = await _asniff(chunks)
+    fmt = detect(prefix, name)
+    if fmt:
+        chunks = adecompress_chunks(chunks, fmt)
+    async for chunk in chunks:
+        yield chunk
+
+
+async def atext_chunks(chunks: AsyncIterator[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Decode byte chunks to text without splitting multi-byte characters."""
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class _ChunkReader(io.RawIOBase):
+    """A readable binary file over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterator[bytes], source: io.IOBase):
+        self._chunks = chunks
+        self._source = source
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, b"")
+            if not self._pending:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self._source.close()
+        super().close()
+
+
+def open_text(raw, *, name: str = "", content_encoding: str = "") -> io.TextIOBase:
+    """Wrap the binary stream ``raw`` as UTF-8 text, decompressing as it is read.
+
+    The first bytes are read straight away to recognise the format; ``raw`` is
+    closed if that fails, and otherwise with the returned stream.
+    """
+
+    try:
+        chunks = iter(lambda: raw.read(READ_SIZE), b"")
+        decoded = decoded_chunks(chunks, name=name, content_encoding=content_encoding)
+    except BaseException:
+        raw.close()
+        raise
+    # newline="" leaves line endings to the csv module, which keeps \r\n
+    # inside quoted fields as it is.
+    return io.TextIOWrapper(
+        io.BufferedReader(_ChunkReader(decoded, raw)), encoding="utf-8", errors="replace", newline=""
+    )
+
+
+def open_file(path) -> io.TextIOBase:
+    """Open a local CSV snapshot, compressed or not, as text."""
+
+    return open_text(open(path, "rb"), name=str(path))
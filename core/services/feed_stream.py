@@ -0,0 +1,235 @@
+"""Stream the aircraft feed to clients without holding it in memory.
+
+An unlimited ``/fleet/live/`` request (``limit=0``) used to build the whole
+feed as a list and render it as one document.  Here rows are parsed from the
+CSV as it downloads and written straight into a ``StreamingHttpResponse``:
+either NDJSON (one record per line, ``Accept: application/x-ndjson``) or the
+usual JSON object with ``results`` streamed as an array and ``count`` last.
+The server only pulls the next rows from upstream once the client has taken
+the previous chunk, so memory stays flat whatever the fleet size.  These
+streams bypass the feed cache.  :func:`open_records` and
+:func:`aopen_records` open the feed (or its fallback) before the response is
+built, so a feed that cannot be opened still gets a 503.  Filtering happens
+inside the stream, so the first byte never waits for a matching row.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import logging
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional
+
+from django.http import StreamingHttpResponse
+
+from backend.renderers import render_json
+
+from . import aircraft_feed, async_feed, metrics
+from .aircraft_feed import AircraftFeedError, FeedQuery, feed_breaker
+
+logger = logging.getLogger(__name__)
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+# Records are batched into chunks of about this size once the first is out.
+CHUNK_BYTES = 32 * 1024
+
+
+def stream_format(request, query: FeedQuery) -> Optional[str]:
+    """The media type to stream ``query`` as, or ``None`` to answer normally."""
+
+    preferred = request.get_preferred_type([JSON, NDJSON])
+    if preferred == NDJSON:
+        return NDJSON
+    if preferred == JSON and query.limit is None:
+        return JSON
+    return None
+
+
+def _note_fallback(exc: AircraftFeedError) -> None:
+    logger.warning("Streaming the bundled aircraft sample dataset", exc_info=True)
+    metrics.increment("aircraft_feed_fallback_total", {"reason": type(exc).__name__})
+
+
+def _broke_off(exc: Exception) -> AircraftFeedError:
+    # Headers are long gone; all that is left is to abort the response.
+    feed_breaker.record_failure()
+    logger.warning("Aircraft feed stream broke off: %s", exc)
+    return AircraftFeedError(str(exc))
+
+
+def _select(rows: Iterable[Dict[str, str]], query: FeedQuery) -> Iterator[Dict[str, str]]:
+    sent = 0
+    for record in aircraft_feed._iter_records(rows):
+        if not query.accepts(record):
+            continue
+        yield record.as_dict()
+        sent += 1
+        if query.limit is not None and sent >= query.limit:
+            return
+
+
+def _open(url: str) -> io.TextIOBase:
+    try:
+        return feed_breaker.call(partial(aircraft_feed._open_feed, url))
+    except AircraftFeedError as exc:
+        _note_fallback(exc)
+        return aircraft_feed.open_fallback()
+
+
+def _read(handle: io.TextIOBase, query: FeedQuery) -> Iterator[Optional[Dict[str, str]]]:
+    with handle:
+        # Primed by open_records, so closing the generator closes the handle
+        # even if the stream is never read.
+        yield None
+        try:
+            yield from _select(csv.DictReader(handle), query)
+        except OSError as exc:
+            raise _broke_off(exc) from exc
+
+
+def open_records(query: FeedQuery, url: str) -> Iterator[Dict[str, str]]:
+    """Open the CSV at ``url`` (or the fallback) and stream the rows matching ``query``.
+
+    The feed is opened before this returns, so a feed that cannot be reached,
+    nor its fallback, raises :class:`AircraftFeedError` while there is still
+    time to answer with an error.  Rows are only read as the response is.
+    """
+
+    records = _read(_open(url), query)
+    next(records)
+    return records  # type: ignore[return-value]
+
+
+def iter_records(query: FeedQuery, url: str) -> Iterator[Dict[str, str]]:
+    """:func:`open_records`, opening the feed on first iteration."""
+
+    yield from open_records(query, url)
+
+
+async def _aopen(stack: AsyncExitStack, url: str) -> AsyncIterator[str]:
+    try:
+        return await feed_breaker.acall(partial(stack.enter_async_context, async_feed.open_feed(url)))
+    except AircraftFeedError as exc:
+        _note_fallback(exc)
+        handle = await asyncio.to_thread(aircraft_feed.open_fallback)
+        stack.callback(handle.close)
+        return async_feed._thread_chunks(handle)
+
+
+async def _aread(
+    stack: AsyncExitStack, chunks: AsyncIterator[str], query: FeedQuery
+) -> AsyncIterator[Optional[Dict[str, str]]]:
+    async with stack:
+        yield None
+        try:
+            sent = 0
+            async for row in async_feed.aiter_csv_rows(chunks):
+                record = aircraft_feed.AircraftRecord.from_row(row)
+                if not (record.registration or record.icao24) or not query.accepts(record):
+                    continue
+                yield record.as_dict()
+                sent += 1
+                if query.limit is not None and sent >= query.limit:
+                    return
+        except (AircraftFeedError, OSError) as exc:
+            # open_feed() turns httpx errors into AircraftFeedError on the way out.
+            raise _broke_off(exc) from exc
+
+
+async def aopen_records(query: FeedQuery, url: str) -> AsyncIterator[Dict[str, str]]:
+    """Async :func:`open_records` reading through :mod:`.async_feed`."""
+
+    stack = AsyncExitStack()
+    try:
+        chunks = await _aopen(stack, url)
+    except BaseException:
+        await stack.aclose()
+        raise
+    records = _aread(stack, chunks, query)
+    await records.__anext__()
+    return records  # type: ignore[return-value]
+
+
+async def aiter_records(query: FeedQuery, url: str) -> AsyncIterator[Dict[str, str]]:
+    """:func:`aopen_records`, opening the feed on first iteration."""
+
+    async for record in await aopen_records(query, url):
+        yield record
+
+
+class _Framer:
+    """Turn records into response chunks for one stream format."""
+
+    def __init__(self, media_type: str, filters: Dict[str, Optional[str]]):
+        self.ndjson = media_type == NDJSON
+        self.filters = filters
+        self.count = 0
+        self.buffer = bytearray()
+
+    def opening(self) -> bytes:
+        return b"" if self.ndjson else b'{"filters":' + render_json(self.filters) + b',"results":['
+
+    def add(self, record: Dict[str, str]) -> Optional[bytes]:
+        if self.ndjson:
+            self.buffer += render_json(record) + b"\n"
+        else:
+            if self.count:
+                self.buffer += b","
+            self.buffer += render_json(record)
+        self.count += 1
+        # The first record goes out at once; later ones in CHUNK_BYTES batches.
+        if self.count == 1 or len(self.buffer) >= CHUNK_BYTES:
+            chunk = bytes(self.buffer)
+            self.buffer.clear()
+            return chunk
+        return None
+
+    def closing(self) -> bytes:
+        tail = bytes(self.buffer)
+        if not self.ndjson:
+            tail += b'],"count":' + str(self.count).encode() + b"}"
+        return tail
+
+
+def _chunks(framer: _Framer, records: Iterator[Dict[str, str]]) -> Iterator[bytes]:
+    opening = framer.opening()
+    if opening:
+        yield opening
+    for record in records:
+        chunk = framer.add(record)
+        if chunk:
+            yield chunk
+    tail = framer.closing()
+    if tail:
+        yield tail
+
+
+async def _achunks(framer: _Framer, records: AsyncIterator[Dict[str, str]]) -> AsyncIterator[bytes]:
+    opening = framer.opening()
+    if opening:
+        yield opening
+    async for record in records:
+        chunk = framer.add(record)
+        if chunk:
+            yield chunk
+    tail = framer.closing()
+    if tail:
+        yield tail
+
+
+def streaming_response(media_type: str, records, filters: Dict[str, Optional[str]]) -> StreamingHttpResponse:
+    """Stream ``records`` (a sync or async iterator) in ``media_type``."""
+
+    framer = _Framer(media_type, filters)
+    if hasattr(records, "__aiter__"):
+        content = _achunks(framer, records)
+    else:
+        content = _chunks(framer, records)
+    response = StreamingHttpResponse(content, content_type=media_type)
+    # Ask proxies such as nginx to pass chunks on instead of buffering them.
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,321 @@
+"""Bulk logbook export and import.
+
+Exports walk a spotter's :class:`~core.models.UserSeen` rows with a server-side
+cursor (``.iterator()``) and are streamed as CSV or NDJSON, so a logbook of any
+size never sits in memory.  Under ASGI the chunks are handed over by
+:func:`aiter_chunks`, because the server would otherwise read a synchronous
+stream to the end before sending any of it.  Imports read an uploaded CSV or NDJSON file line by
+line, resolve registrations and airports against the database a batch at a
+time and insert each batch with ``bulk_create``, skipping sightings already in
+the logbook.  Progress is kept in the cache while an import runs so clients can
+poll it.
+"""
+
+from __future__ import annotations
+
+import csv
+import datetime
+import io
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.models import Aircraft, Airport, UserSeen
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ["registration", "type", "airline", "country", "airport", "seen_at"]
+# Column names other logging apps use for the fields an import needs.
+COLUMN_ALIASES = {
+    "registration": ("registration", "reg", "tail", "tail_number"),
+    "airport": ("airport", "airport_icao", "icao", "location"),
+    "seen_at": ("seen_at", "date", "seen", "timestamp", "datetime"),
+}
+# Export chunks are flushed at about this size.
+CHUNK_BYTES = 32 * 1024
+# Problems listed in the import summary; the rest are only counted.
+MAX_REPORTED_ERRORS = 20
+PROGRESS_TTL = 24 * 3600
+
+
+class LogbookImportError(ValueError):
+    """Raised when an uploaded logbook cannot be read at all."""
+
+
+# Export -------------------------------------------------------------------
+
+
+def export_rows(user) -> Iterator[Dict[str, str]]:
+    sightings = (
+        UserSeen.objects.filter(user=user)
+        .select_related("aircraft__aircraft_type", "aircraft__operator", "airport")
+        .order_by("seen_at", "pk")
+        .iterator(chunk_size=settings.LOGBOOK_EXPORT_CHUNK_SIZE)
+    )
+    for seen in sightings:
+        yield {
+            "registration": seen.aircraft.registration,
+            "type": seen.aircraft.type,
+            "airline": seen.aircraft.airline,
+            "country": seen.aircraft.country,
+            "airport": seen.airport.icao if seen.airport else "",
+            "seen_at": seen.seen_at.isoformat(),
+        }
+
+
+def _take(buffer: io.StringIO) -> str:
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
+
+
+def _batched(pieces: Iterable[str]) -> Iterator[bytes]:
+    # The first piece goes out at once so the download starts immediately.
+    buffer = io.StringIO()
+    first = True
+    for piece in pieces:
+        buffer.write(piece)
+        if first or buffer.tell() >= CHUNK_BYTES:
+            yield _take(buffer).encode("utf-8")
+            first = False
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def csv_chunks(rows: Iterable[Dict[str, str]]) -> Iterator[bytes]:
+    line = io.StringIO()
+    writer = csv.DictWriter(line, fieldnames=EXPORT_FIELDS)
+
+    def lines() -> Iterator[str]:
+        writer.writeheader()
+        yield _take(line)
+        for row in rows:
+            writer.writerow(row)
+            yield _take(line)
+
+    return _batched(lines())
+
+
+def ndjson_chunks(rows: Iterable[Dict[str, str]]) -> Iterator[bytes]:
+    return _batched(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+async def aiter_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Serve export ``chunks`` to an ASGI server one at a time.
+
+    Each chunk is produced in the request's sync thread, which also holds the
+    export's database cursor.
+    """
+
+    pull = sync_to_async(next)
+    try:
+        while True:
+            chunk = await pull(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # Release the cursor if the client disconnects part way.
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+# Import -------------------------------------------------------------------
+
+
+def progress_key(user_id: int) -> str:
+    return f"logbook-import:{user_id}"
+
+
+def import_progress(user) -> Optional[Dict[str, Any]]:
+    return cache.get(progress_key(user.pk))
+
+
+def _column(row: Dict[str, Any], field: str) -> str:
+    for name in COLUMN_ALIASES[field]:
+        value = row.get(name)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+def _parse_seen_at(value: str) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Unrecognised date {value!r}.")
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _text_stream(upload) -> io.TextIOBase:
+    handle = getattr(upload, "file", upload)
+    handle.seek(0)
+    return io.TextIOWrapper(handle, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def read_rows(upload) -> Iterator[Tuple[int, Optional[Dict[str, Any]], str]]:
+    """Yield ``(line number, row, error)`` from an uploaded CSV or NDJSON file.
+
+    The format is taken from the first non-blank character: ``{`` means NDJSON.
+    Rows that cannot be parsed come back as ``None`` with the reason.
+    """
+
+    text = _text_stream(upload)
+    first = text.read(1)
+    while first and first.isspace():
+        first = text.read(1)
+    text.seek(0)
+
+    if first == "{":
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, None, "Line is not valid JSON."
+                continue
+            if not isinstance(row, dict):
+                yield number, None, "Line is not a JSON object."
+                continue
+            yield number, {str(key).lower(): value for key, value in row.items()}, ""
+        return
+
+    reader = csv.DictReader(text)
+    if not reader.fieldnames:
+        raise LogbookImportError("The file is empty.")
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    if not any(name in reader.fieldnames for name in COLUMN_ALIASES["registration"]):
+        raise LogbookImportError("The CSV header has no registration column.")
+    for row in reader:
+        yield reader.line_num, row, ""
+
+
+class _Import:
+    def __init__(self, user):
+        self.user = user
+        self.summary: Dict[str, Any] = {
+            "state": "running",
+            "started": time.time(),
+            "processed": 0,
+            "created": 0,
+            "duplicates": 0,
+            "unknown_registrations": 0,
+            "invalid": 0,
+            "errors": [],
+        }
+
+    def problem(self, line: int, message: str, counter: str = "invalid") -> None:
+        self.summary[counter] += 1
+        if len(self.summary["errors"]) < MAX_REPORTED_ERRORS:
+            self.summary["errors"].append({"line": line, "error": message})
+
+    def save_progress(self) -> None:
+        cache.set(progress_key(self.user.pk), self.summary, PROGRESS_TTL)
+
+    def insert(self, pending: List[UserSeen]) -> None:
+        try:
+            with transaction.atomic():
+                UserSeen.objects.bulk_create(pending)
+            self.summary["created"] += len(pending)
+            return
+        except IntegrityError:
+            pass
+        # A concurrent import or POST /seen/ logged some of these first; insert
+        # one at a time so only those count as duplicates.
+        for sighting in pending:
+            try:
+                with transaction.atomic():
+                    UserSeen.objects.bulk_create([sighting])
+            except IntegrityError:
+                self.summary["duplicates"] += 1
+            else:
+                self.summary["created"] += 1
+
+    def flush(self, batch: List[Tuple[int, str, str, Optional[datetime.datetime]]]) -> None:
+        registrations = {registration for _, registration, _, _ in batch}
+        icaos = {icao for _, _, icao, _ in batch if icao}
+        aircraft = dict(
+            Aircraft.objects.filter(registration__in=registrations).values_list("registration", "pk")
+        )
+        airports = dict(Airport.objects.filter(icao__in=icaos).values_list("icao", "pk")) if icaos else {}
+        logged = set(
+            UserSeen.objects.filter(user=self.user, aircraft_id__in=aircraft.values()).values_list(
+                "aircraft_id", flat=True
+            )
+        )
+
+        pending = []
+        for line, registration, icao, seen_at in batch:
+            aircraft_id = aircraft.get(registration)
+            if aircraft_id is None:
+                self.problem(line, f"Unknown aircraft registration {registration}.", "unknown_registrations")
+                continue
+            if aircraft_id in logged:
+                self.summary["duplicates"] += 1
+                continue
+            logged.add(aircraft_id)
+            sighting = UserSeen(user=self.user, aircraft_id=aircraft_id, airport_id=airports.get(icao))
+            if seen_at is not None:
+                sighting.seen_at = seen_at
+            pending.append(sighting)
+        self.insert(pending)
+        self.summary["processed"] += len(batch)
+        self.save_progress()
+
+    def run(self, rows: Iterable[Tuple[int, Optional[Dict[str, Any]], str]]) -> Dict[str, Any]:
+        batch_size = settings.LOGBOOK_IMPORT_BATCH_SIZE
+        batch: List[Tuple[int, str, str, Optional[datetime.datetime]]] = []
+        self.save_progress()
+        for line, row, error in rows:
+            try:
+                if row is None:
+                    raise ValueError(error)
+                registration = _column(row, "registration").upper()
+                if not registration:
+                    raise ValueError("Missing registration.")
+                seen_at = _parse_seen_at(_column(row, "seen_at"))
+            except ValueError as exc:
+                self.problem(line, str(exc))
+                self.summary["processed"] += 1
+                continue
+            batch.append((line, registration, _column(row, "airport").upper(), seen_at))
+            if len(batch) >= batch_size:
+                self.flush(batch)
+                batch = []
+                logger.info("Logbook import for user %s: %d lines processed", self.user.pk, self.summary["processed"])
+        if batch:
+            self.flush(batch)
+        self.summary["state"] = "finished"
+        self.summary["finished"] = time.time()
+        self.save_progress()
+        return self.summary
+
+
+def import_logbook(user, upload) -> Dict[str, Any]:
+    """Import sightings from ``upload`` into ``user``'s logbook and summarise."""
+
+    job = _Import(user)
+    try:
+        return job.run(read_rows(upload))
+    except Exception as exc:
+        job.summary["state"] = "failed"
+        job.summary["error"] = str(exc)
+        job.save_progress()
+        raise
@@ -0,0 +1,141 @@
+"""In-process counters and histograms for operational events.
+
+Services call :func:`increment` when something worth graphing happens (a
+circuit breaker trips, a request is served from a fallback) and
+:func:`observe` for distributions such as request latency.  Series are per
+process and keyed by name plus a sorted tuple of label pairs;
+:func:`render_prometheus` formats them for the ``/metrics`` endpoint.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Seconds; also used for DB and serialization time.
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_counters: "Counter[Tuple[str, Labels]]" = Counter()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+_histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+
+def increment(name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1) -> None:
+    with _lock:
+        _counters[(name, _labels(labels))] += amount
+    logger.debug("metric %s%s += %s", name, labels or "", amount)
+
+
+def observe(
+    name: str,
+    value: float,
+    labels: Optional[Dict[str, str]] = None,
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+
+def value(name: str, labels: Optional[Dict[str, str]] = None) -> float:
+    with _lock:
+        return _counters.get((name, _labels(labels)), 0)
+
+
+def histogram(name: str, labels: Optional[Dict[str, str]] = None) -> Optional[Dict[str, float]]:
+    """``{"count": ..., "sum": ...}`` for one histogram series, if observed."""
+
+    with _lock:
+        series = _histograms.get((name, _labels(labels)))
+        return {"count": series.count, "sum": series.sum} if series else None
+
+
+def snapshot() -> Dict[Tuple[str, Labels], float]:
+    with _lock:
+        return dict(_counters)
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_number(number: float) -> str:
+    return repr(float(number)) if isinstance(number, float) and not number.is_integer() else str(int(number))
+
+
+def render_prometheus() -> str:
+    """Render every series in the Prometheus text exposition format."""
+
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            ((key, (series.buckets, list(series.counts), series.sum, series.count)) for key, series in _histograms.items()),
+            key=lambda item: item[0],
+        )
+
+    lines: List[str] = []
+    typed = set()
+    for (name, labels), amount in counters:
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {_format_number(amount)}")
+
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', _format_number(bound)),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,213 @@
+"""Generate resized, metadata-free copies of uploaded spotting photos.
+
+Full-resolution uploads are never served to galleries.  Once a photo is saved
+the signal handler in :mod:`core.signals` schedules :func:`process_photo` on a
+small thread pool (Pillow releases the GIL while decoding, resizing and
+encoding, so threads scale across cores).  Derivatives are written next to the
+original under ``spot_photos/derivatives/`` in every configured format and
+width, and their storage names are recorded on ``Photo.derivatives``.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+
+from core.models import Photo
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = "spot_photos/derivatives"
+
+_PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class PhotoDerivativeError(RuntimeError):
+    """Raised when an uploaded photo cannot be decoded or resized."""
+
+
+def derivative_name(image_name: str, width: int, fmt: str) -> str:
+    """Return the storage name for the ``fmt`` copy of ``image_name`` at ``width``."""
+
+    stem = posixpath.splitext(posixpath.basename(image_name))[0]
+    return f"{DERIVATIVES_DIR}/{stem}/{stem}-w{width}.{_EXTENSIONS[fmt]}"
+
+
+def render_derivatives(image_name: str, *, storage=None) -> Dict[str, object]:
+    """Decode ``image_name`` once and write every configured derivative.
+
+    Only touches storage, never the database, so it is safe to run in worker
+    processes.  Widths wider than the original are skipped rather than
+    upscaled; the smallest configured width is always produced.
+    """
+
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    widths = sorted(set(settings.PHOTO_DERIVATIVE_WIDTHS))
+    formats = [fmt for fmt in settings.PHOTO_DERIVATIVE_FORMATS if fmt in _PIL_FORMATS]
+    quality = settings.PHOTO_DERIVATIVE_QUALITY
+
+    try:
+        with storage.open(image_name, "rb") as handle, Image.open(handle) as image:
+            # Let the JPEG decoder downscale by a power of two while decoding;
+            # a 40MB DSLR frame then never has to be fully materialised.
+            image.draft("RGB", (widths[-1], widths[-1]))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.load()
+    except Exception as exc:
+        raise PhotoDerivativeError(f"Cannot decode {image_name}: {exc}") from exc
+
+    files: Dict[str, Dict[str, str]] = {fmt: {} for fmt in formats}
+    targets = [width for width in widths if width < image.width] or widths[:1]
+    for width in targets:
+        if width >= image.width:
+            resized = image
+        else:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            buffer = io.BytesIO()
+            # Saving without ``exif=`` drops camera metadata, including GPS.
+            resized.save(buffer, _PIL_FORMATS[fmt], quality=quality, optimize=True)
+            name = derivative_name(image_name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            files[fmt][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+
+    return {"source": image_name, "files": files}
+
+
+def needs_derivatives(photo: Photo) -> bool:
+    return bool(photo.image) and photo.derivatives.get("source") != photo.image.name
+
+
+def process_photo(photo_id: int) -> bool:
+    """Render derivatives for ``photo_id`` and record them; return whether work was done."""
+
+    try:
+        photo = Photo.objects.filter(pk=photo_id).first()
+        if photo is None or not needs_derivatives(photo):
+            return False
+        derivatives = _shared_derivatives(photo) or render_derivatives(photo.image.name)
+        record_derivatives(photo, derivatives)
+        return True
+    except PhotoDerivativeError:
+        logger.warning("Could not generate derivatives for photo %s", photo_id, exc_info=True)
+        return False
+
+
+def _shared_derivatives(photo: Photo) -> Optional[Dict[str, object]]:
+    """Reuse the derivatives of another photo stored under the same image, if ready."""
+
+    siblings = Photo.objects.filter(image=photo.image.name).exclude(pk=photo.pk)
+    for derivatives in siblings.values_list("derivatives", flat=True):
+        if derivatives.get("source") == photo.image.name:
+            return derivatives
+    return None
+
+
+def record_derivatives(photo: Photo, derivatives: Dict[str, object]) -> None:
+    """Store freshly rendered ``derivatives`` and delete any the photo no longer uses."""
+
+    # ``update()`` bypasses post_save so recording the result does not re-queue it.
+    Photo.objects.filter(pk=photo.pk, image=photo.image.name).update(derivatives=derivatives)
+    previous_source = photo.derivatives.get("source")
+    if not previous_source or Photo.objects.filter(image=previous_source).exists():
+        # Nothing to clean up, or the old copies still belong to another photo.
+        return
+    current = {
+        name
+        for by_width in derivatives["files"].values()
+        for name in by_width.values()
+    }
+    stale = {
+        fmt: {width: name for width, name in by_width.items() if name not in current}
+        for fmt, by_width in (photo.derivatives.get("files") or {}).items()
+    }
+    delete_derivatives({"files": stale})
+
+
+def _run_in_worker(photo_id: int) -> bool:
+    close_old_connections()
+    try:
+        return process_photo(photo_id)
+    except Exception:  # pragma: no cover - logged so the pool thread survives
+        logger.exception("Derivative worker crashed for photo %s", photo_id)
+        return False
+    finally:
+        close_old_connections()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.PHOTO_DERIVATIVE_WORKERS),
+                thread_name_prefix="photo-derivatives",
+            )
+        return _executor
+
+
+def schedule_photo(photo_id: int) -> Optional[Future]:
+    """Queue derivative generation, or run it inline when async processing is off."""
+
+    if not settings.PHOTO_DERIVATIVES_ASYNC:
+        process_photo(photo_id)
+        return None
+    return _get_executor().submit(_run_in_worker, photo_id)
+
+
+def delete_derivatives(derivatives: Dict[str, object], *, storage=None) -> None:
+    storage = storage or default_storage
+    for by_width in (derivatives.get("files") or {}).values():
+        for name in by_width.values():
+            storage.delete(name)
+
+
+def delete_derivatives_for(image_name: str, *, storage=None) -> None:
+    """Delete every configured derivative of ``image_name``, recorded or not."""
+
+    storage = storage or default_storage
+    for width in settings.PHOTO_DERIVATIVE_WIDTHS:
+        for fmt in settings.PHOTO_DERIVATIVE_FORMATS:
+            if fmt in _EXTENSIONS:
+                storage.delete(derivative_name(image_name, width, fmt))
+
+
+def derivative_urls(photo: Photo, build_uri=None) -> Dict[str, Dict[str, str]]:
+    """Map ``format -> width -> URL`` for the ready derivatives of ``photo``."""
+
+    if photo.derivatives.get("source") != photo.image.name:
+        return {}
+    urls: Dict[str, Dict[str, str]] = {}
+    for fmt, by_width in (photo.derivatives.get("files") or {}).items():
+        urls[fmt] = {}
+        for width, name in by_width.items():
+            url = default_storage.url(name)
+            urls[fmt][width] = build_uri(url) if build_uri else url
+    return urls
+
+
+def pending_photo_ids() -> Iterable[int]:
+    """Primary keys of photos whose derivatives are missing or stale."""
+
+    for photo in Photo.objects.only("pk", "image", "derivatives").iterator(chunk_size=500):
+        if needs_derivatives(photo):
+            yield photo.pk
@@ -0,0 +1,172 @@
+"""Reference counting and near-duplicate detection for stored photos.
+
+``Photo.image`` is content addressed (see :class:`core.fields.ContentAddressedImageField`),
+so several photos can share one file.  :class:`~core.models.PhotoBlob` counts
+the photos pointing at each file; the file and its derivatives are deleted
+when the last reference goes away.
+
+Each stored file also gets a 64-bit difference hash (dHash).  The hash is split
+into four 16-bit bands held in indexed columns: two hashes within Hamming
+distance 3 must agree on at least one band, so candidate near-duplicates come
+from four index lookups instead of comparing every photo pairwise.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+
+from core.models import Photo, PhotoBlob
+
+from .photo_derivatives import delete_derivatives, delete_derivatives_for
+
+logger = logging.getLogger(__name__)
+
+PHASH_BANDS = 4
+_BAND_BITS = 16
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def dhash(file, *, size: int = 8) -> int:
+    """Return the unsigned 64-bit difference hash of the image in ``file``."""
+
+    from PIL import Image
+
+    file.seek(0)
+    with Image.open(file) as image:
+        image.draft("L", (size * 32, size * 32))
+        pixels = list(
+            image.convert("L").resize((size + 1, size), Image.Resampling.BILINEAR).getdata()
+        )
+    file.seek(0)
+
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for column in range(size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+
+def phash_fields(value: int) -> Dict[str, int]:
+    """Column values for an unsigned 64-bit hash: the signed hash and its bands."""
+
+    fields = {"phash": _to_signed(value)}
+    for band in range(PHASH_BANDS):
+        fields[f"phash_band{band}"] = (value >> (band * _BAND_BITS)) & _BAND_MASK
+    return fields
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(_to_unsigned(a) ^ _to_unsigned(b)).count("1")
+
+
+def find_near_duplicates(value: int, *, exclude_pk: Optional[int] = None) -> List[Photo]:
+    """Photos whose dHash is within ``PHOTO_NEAR_DUPLICATE_DISTANCE`` of ``value``, closest first."""
+
+    fields = phash_fields(value)
+    band_match = Q()
+    for band in range(PHASH_BANDS):
+        band_match |= Q(**{f"phash_band{band}": fields[f"phash_band{band}"]})
+    candidates = Photo.objects.filter(band_match).only("pk", "phash", "duplicate_of")
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+
+    threshold = settings.PHOTO_NEAR_DUPLICATE_DISTANCE
+    scored = [
+        (hamming(photo.phash, fields["phash"]), photo.pk, photo)
+        for photo in candidates
+        if photo.phash is not None
+    ]
+    return [photo for distance, _, photo in sorted(scored) if distance <= threshold]
+
+
+def register_content(photo: Photo, previous_sha256: str = "") -> None:
+    """Account for ``photo`` now referencing its current file.
+
+    Increments the blob reference count, releases ``previous_sha256`` if the
+    image was replaced, fills in the perceptual hash and links the photo to the
+    earliest near-duplicate already stored.
+    """
+
+    if not photo.sha256:
+        return
+
+    blob, _ = PhotoBlob.objects.get_or_create(
+        sha256=photo.sha256, defaults={"name": photo.image.name}
+    )
+    PhotoBlob.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+    if previous_sha256 and previous_sha256 != photo.sha256:
+        release_content(previous_sha256, photo.derivatives)
+
+    sibling = (
+        Photo.objects.filter(sha256=photo.sha256, phash__isnull=False)
+        .exclude(pk=photo.pk)
+        .values("phash")
+        .first()
+    )
+    if sibling:
+        value = _to_unsigned(sibling["phash"])
+    else:
+        try:
+            with photo.image.open("rb") as handle:
+                value = dhash(handle)
+        except Exception:
+            logger.warning("Could not compute a perceptual hash for photo %s", photo.pk, exc_info=True)
+            return
+
+    updates: Dict[str, object] = phash_fields(value)
+    matches = find_near_duplicates(value, exclude_pk=photo.pk)
+    if matches:
+        earliest = min(matches, key=lambda match: match.pk)
+        updates["duplicate_of_id"] = earliest.duplicate_of_id or earliest.pk
+    else:
+        updates["duplicate_of_id"] = None
+
+    Photo.objects.filter(pk=photo.pk).update(**updates)
+    for field, value in updates.items():
+        setattr(photo, field, value)
+
+
+def release_content(sha256: str, derivatives: Optional[Dict[str, object]] = None) -> bool:
+    """Drop one reference to ``sha256``; delete the file once nothing uses it.
+
+    Returns ``True`` when the stored file was scheduled for deletion.
+    """
+
+    if not sha256:
+        return False
+
+    PhotoBlob.objects.filter(pk=sha256, refcount__gt=0).update(refcount=F("refcount") - 1)
+    blob = PhotoBlob.objects.filter(pk=sha256, refcount=0).first()
+    if blob is None:
+        return False
+
+    name = blob.name
+    blob.delete()
+    derivatives = derivatives or {}
+
+    def _delete_files():
+        default_storage.delete(name)
+        # The in-memory instance may predate its derivatives, so also remove the
+        # deterministic names in case the worker finished after it was loaded.
+        delete_derivatives_for(name)
+        if derivatives.get("source") == name:
+            delete_derivatives(derivatives)
+
+    # Files are not transactional; only remove them once the deletion sticks.
+    transaction.on_commit(_delete_files)
+    return True
@@ -0,0 +1,159 @@
+"""Resumable, chunked photo uploads.
+
+A client creates a :class:`~core.models.PhotoUpload`, streams the file in
+chunks at explicit byte offsets and then finalises it.  Chunks are copied from
+the request stream straight into a staging file, so no chunk is ever held in
+memory in full, and an interrupted upload resumes from ``received``.  On
+finalise the staged file is hashed and checked against the declared digest;
+``Photo.image`` is content addressed, so a file that is already stored is
+referenced rather than saved a second time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import posixpath
+from datetime import timedelta
+from pathlib import Path
+from typing import BinaryIO, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Photo, PhotoBlob, PhotoUpload
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 64 * 1024
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+class PhotoUploadError(ValueError):
+    """Raised when a chunk or finalise request cannot be applied to an upload."""
+
+
+class UploadOffsetMismatch(PhotoUploadError):
+    """Raised when a chunk does not start where the staged file currently ends."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected a chunk starting at offset {expected}.")
+        self.expected = expected
+
+
+def staging_path(upload: PhotoUpload) -> Path:
+    return Path(settings.PHOTO_UPLOAD_TEMP_DIR) / f"{upload.pk}.part"
+
+
+def write_chunk(upload: PhotoUpload, offset: int, stream: BinaryIO, length: int) -> int:
+    """Append ``length`` bytes from ``stream`` at ``offset`` and return the new offset."""
+
+    if offset != upload.received:
+        raise UploadOffsetMismatch(upload.received)
+    if length <= 0:
+        raise PhotoUploadError("Chunk is empty.")
+    if offset + length > upload.size:
+        raise PhotoUploadError("Chunk extends past the declared upload size.")
+
+    path = staging_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(path, "r+b" if path.exists() else "wb") as handle:
+        handle.seek(offset)
+        while written < length:
+            block = stream.read(min(COPY_BUFFER_SIZE, length - written))
+            if not block:
+                break
+            handle.write(block)
+            written += len(block)
+        # Drop anything a previous, interrupted attempt left past this chunk.
+        handle.truncate()
+
+    # Only advance if nobody else advanced the upload while this chunk streamed.
+    moved = PhotoUpload.objects.filter(pk=upload.pk, received=offset).update(
+        received=offset + written, updated=timezone.now()
+    )
+    if not moved:
+        upload.refresh_from_db(fields=["received"])
+        raise UploadOffsetMismatch(upload.received)
+    upload.received = offset + written
+    if written < length:
+        raise PhotoUploadError(f"Chunk ended after {written} of {length} bytes.")
+    return upload.received
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _verify_image(path: Path) -> None:
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception as exc:
+        raise PhotoUploadError("Uploaded file is not a valid image.") from exc
+
+
+def finalise_upload(upload: PhotoUpload) -> Tuple[Photo, bool]:
+    """Turn a complete upload into a :class:`Photo`.
+
+    Returns ``(photo, deduplicated)`` where ``deduplicated`` is ``True`` when the
+    content was already stored and no new file was written.
+    """
+
+    if upload.received != upload.size:
+        raise PhotoUploadError(f"Upload incomplete: {upload.received} of {upload.size} bytes received.")
+
+    path = staging_path(upload)
+    digest = _hash_file(path)
+    if upload.sha256 and upload.sha256.lower() != digest:
+        raise PhotoUploadError("Content hash does not match the declared sha256.")
+
+    deduplicated = PhotoBlob.objects.filter(sha256=digest, refcount__gt=0).exists()
+    if not deduplicated:
+        _verify_image(path)
+
+    name = posixpath.basename(upload.filename) or f"{upload.pk}.jpg"
+    with transaction.atomic(), open(path, "rb") as handle:
+        photo = Photo(spot=upload.spot, user=upload.user, caption=upload.caption)
+        # The content-addressed image field streams the staged file into storage,
+        # or just points at the existing copy when the digest is already stored.
+        photo.image = File(handle, name=name)
+        photo.save()
+        upload.delete()
+
+    _discard_staging_file(path)
+    return photo, deduplicated
+
+
+def abort_upload(upload: PhotoUpload) -> None:
+    path = staging_path(upload)
+    upload.delete()
+    _discard_staging_file(path)
+
+
+def purge_stale_uploads(max_age: timedelta | None = None) -> int:
+    """Delete uploads untouched for ``max_age`` (``PHOTO_UPLOAD_EXPIRY_HOURS`` by default)."""
+
+    max_age = max_age or timedelta(hours=settings.PHOTO_UPLOAD_EXPIRY_HOURS)
+    removed = 0
+    for upload in PhotoUpload.objects.filter(updated__lt=timezone.now() - max_age):
+        abort_upload(upload)
+        removed += 1
+    return removed
+
+
+def _discard_staging_file(path: Path) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,175 @@
+"""Proactive refresh of cached feeds and reference data.
+
+Each :class:`RefreshJob` rewrites a cache entry shortly before it would go
+stale, so request paths read warm data instead of paying for upstream I/O.  Run
+the scheduler with ``python manage.py run_refresh_scheduler`` or in-process via
+the ASGI lifespan (``REFRESH_SCHEDULER_IN_PROCESS=1``).  Several schedulers may
+run at once: a job only executes under its single-flight lock.  Job status is
+kept in the shared cache so any worker can report it.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from . import airports, feed_cache, spot_traffic
+from .aircraft_feed import AircraftFeedError, feed_cache_key, refresh_live_fleet
+
+logger = logging.getLogger(__name__)
+
+STATUS_KEY = "refresh-scheduler:status"
+STATUS_TTL = 7 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class RefreshJob:
+    name: str
+    refresh: Callable[[], Any]
+    interval: float
+    # Cache entry the job keeps warm, reported by the status endpoint.
+    cache_key: Optional[str] = None
+
+
+def default_jobs() -> List[RefreshJob]:
+    lead = settings.REFRESH_SCHEDULER_LEAD
+    return [
+        RefreshJob(
+            name="aircraft-feed",
+            refresh=refresh_live_fleet,
+            interval=settings.AIRCRAFT_FEED_CACHE_SECONDS * lead,
+            cache_key=feed_cache_key(settings.AIRCRAFT_FEED_MAX_RESULTS or None),
+        ),
+        RefreshJob(
+            name="airport-reference",
+            refresh=airports.refresh_airport_reference,
+            interval=settings.AIRPORT_REFERENCE_CACHE_SECONDS * lead,
+            cache_key=airports.AIRPORT_REFERENCE_KEY,
+        ),
+        RefreshJob(
+            name="spot-traffic",
+            refresh=spot_traffic.store_spot_traffic,
+            interval=settings.LIVE_TRAFFIC_POLL_SECONDS * lead,
+            cache_key=spot_traffic.SPOT_TRAFFIC_KEY,
+        ),
+    ]
+
+
+def backoff_delay(failures: int) -> float:
+    """Exponential retry delay after ``failures`` consecutive failures."""
+
+    base = settings.REFRESH_SCHEDULER_BACKOFF_SECONDS
+    return min(base * 2 ** max(failures - 1, 0), settings.REFRESH_SCHEDULER_MAX_BACKOFF_SECONDS)
+
+
+def _load_status() -> Dict[str, Dict[str, Any]]:
+    return cache.get(STATUS_KEY) or {}
+
+
+def _save_job_status(name: str, **values: Any) -> Dict[str, Any]:
+    status = _load_status()
+    entry = {**status.get(name, {}), **values}
+    status[name] = entry
+    cache.set(STATUS_KEY, status, STATUS_TTL)
+    return entry
+
+
+class RefreshScheduler:
+    def __init__(self, jobs: Optional[List[RefreshJob]] = None, *, clock: Callable[[], float] = time.time):
+        self.jobs = {job.name: job for job in (jobs if jobs is not None else default_jobs())}
+        self.clock = clock
+        self.failures: Dict[str, int] = {}
+        # Everything runs on the first pass so a fresh deploy warms its caches.
+        self.next_run = {name: clock() for name in self.jobs}
+
+    def run_job(self, job: RefreshJob) -> Tuple[bool, float]:
+        """Run ``job`` once and return ``(succeeded, delay_until_next_run)``."""
+
+        jitter = settings.REFRESH_SCHEDULER_JITTER
+        started = self.clock()
+        with feed_cache.single_flight(f"refresh-job:{job.name}", settings.AIRCRAFT_FEED_LOCK_SECONDS) as leader:
+            if not leader:
+                # Another scheduler is on it; check back on the normal cadence.
+                return True, feed_cache.jittered(job.interval, jitter)
+            try:
+                result = job.refresh()
+            except Exception as exc:
+                failures = self.failures.get(job.name, 0) + 1
+                self.failures[job.name] = failures
+                delay = feed_cache.jittered(backoff_delay(failures), jitter)
+                expected = (AircraftFeedError, spot_traffic.LiveTrafficError)
+                log = logger.warning if isinstance(exc, expected) else logger.exception
+                log("Refresh job %s failed (%d in a row); retrying in %.0fs", job.name, failures, delay)
+                _save_job_status(
+                    job.name,
+                    last_started=started,
+                    last_error=str(exc),
+                    failures=failures,
+                    next_run=started + delay,
+                )
+                return False, delay
+            finally:
+                close_old_connections()
+
+        self.failures[job.name] = 0
+        delay = feed_cache.jittered(job.interval, jitter)
+        _save_job_status(
+            job.name,
+            last_started=started,
+            last_success=self.clock(),
+            duration_ms=round((self.clock() - started) * 1000, 1),
+            result=result,
+            failures=0,
+            last_error=None,
+            next_run=started + delay,
+        )
+        return True, delay
+
+    def run_pending(self) -> float:
+        """Run every due job and return the seconds until the next one is due."""
+
+        for name, job in self.jobs.items():
+            if self.next_run[name] <= self.clock():
+                _, delay = self.run_job(job)
+                self.next_run[name] = self.clock() + delay
+        return max(min(self.next_run.values(), default=self.clock() + 60) - self.clock(), 0.0)
+
+    def run_forever(self, stop: threading.Event) -> None:
+        logger.info("Refresh scheduler started with jobs: %s", ", ".join(self.jobs))
+        while not stop.is_set():
+            stop.wait(self.run_pending())
+
+
+def start_in_background(scheduler: Optional[RefreshScheduler] = None) -> Tuple[threading.Thread, threading.Event]:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=(scheduler or RefreshScheduler()).run_forever,
+        args=(stop,),
+        name="refresh-scheduler",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop
+
+
+def status(jobs: Optional[List[RefreshJob]] = None) -> Dict[str, Dict[str, Any]]:
+    """Last outcome of each job plus how fresh the entry it maintains is."""
+
+    recorded = _load_status()
+    now = time.time()
+    report: Dict[str, Dict[str, Any]] = {}
+    for job in jobs if jobs is not None else default_jobs():
+        entry = dict(recorded.get(job.name, {}))
+        envelope = feed_cache.peek(job.cache_key) if job.cache_key else None
+        entry["interval"] = job.interval
+        entry["cached"] = envelope is not None
+        entry["fresh_for"] = round(envelope["fresh_until"] - now, 1) if envelope else None
+        report[job.name] = entry
+    return report
@@ -0,0 +1,214 @@
+"""Full-text search over forum posts, comments, spotting locations and airports.
+
+On SQLite the documents live in an FTS5 virtual table (created by migration
+``0006_search_index``) which is kept current by the signal handlers in
+:mod:`core.signals`.  Each indexed object owns exactly one row whose ``rowid``
+is derived from its primary key and kind, so incremental updates are a single
+``DELETE``/``INSERT`` pair rather than a rebuild.  Other database backends fall
+back to case-insensitive substring matching through the ORM.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Model, Q
+
+from core.models import Airport, Comment, Post, SpottingLocation
+
+SEARCH_TABLE = "core_search_index"
+
+# Kind name -> (model, numeric code folded into the FTS rowid).
+_KIND_CODES: Dict[str, int] = {
+    "airport": 1,
+    "spot": 2,
+    "post": 3,
+    "comment": 4,
+}
+_KIND_MODELS: Dict[str, type] = {
+    "airport": Airport,
+    "spot": SpottingLocation,
+    "post": Post,
+    "comment": Comment,
+}
+_MODEL_KINDS = {model: kind for kind, model in _KIND_MODELS.items()}
+_CODE_KINDS = {code: kind for kind, code in _KIND_CODES.items()}
+_ROWID_STRIDE = 8
+
+SEARCH_KINDS: Tuple[str, ...] = tuple(_KIND_CODES)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_backend_available() -> bool:
+    """Return ``True`` when the FTS5 index can be used on the default database."""
+
+    return connection.vendor == "sqlite"
+
+
+def kind_for_model(model: type) -> Optional[str]:
+    return _MODEL_KINDS.get(model)
+
+
+def _rowid(kind: str, pk: int) -> int:
+    return int(pk) * _ROWID_STRIDE + _KIND_CODES[kind]
+
+
+def _document(kind: str, instance: Model) -> Tuple[str, str]:
+    """Return the ``(title, body)`` pair indexed for ``instance``."""
+
+    if kind == "airport":
+        title = instance.name
+        body = " ".join(filter(None, [instance.icao, instance.iata, instance.city]))
+    elif kind == "spot":
+        title = instance.title
+        body = "\n".join(filter(None, [instance.description, instance.tips]))
+    elif kind == "post":
+        title = instance.title
+        body = instance.body
+    else:
+        title = ""
+        body = instance.body
+    return title or "", body or ""
+
+
+def index_instance(instance: Model) -> None:
+    """Insert or replace the search document for ``instance``."""
+
+    kind = kind_for_model(type(instance))
+    if kind is None or not search_backend_available():
+        return
+    title, body = _document(kind, instance)
+    rowid = _rowid(kind, instance.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [rowid])
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+            [rowid, title, body],
+        )
+
+
+def remove_instance(instance: Model) -> None:
+    """Drop the search document for ``instance`` if it was indexed."""
+
+    kind = kind_for_model(type(instance))
+    if kind is None or instance.pk is None or not search_backend_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [_rowid(kind, instance.pk)]
+        )
+
+
+def rebuild_index(kinds: Optional[Iterable[str]] = None, *, chunk_size: int = 2000) -> Dict[str, int]:
+    """Re-index every object of ``kinds`` (all kinds by default).
+
+    Returns the number of documents written per kind.
+    """
+
+    if not search_backend_available():
+        return {}
+
+    summary: Dict[str, int] = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        for kind in kinds or SEARCH_KINDS:
+            code = _KIND_CODES[kind]
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid %% {_ROWID_STRIDE} = %s", [code]
+            )
+            batch: List[Tuple[int, str, str]] = []
+            written = 0
+            for instance in _KIND_MODELS[kind].objects.order_by("pk").iterator(chunk_size=chunk_size):
+                title, body = _document(kind, instance)
+                batch.append((_rowid(kind, instance.pk), title, body))
+                if len(batch) >= chunk_size:
+                    _insert_batch(cursor, batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                _insert_batch(cursor, batch)
+                written += len(batch)
+            summary[kind] = written
+    return summary
+
+
+def _insert_batch(cursor, batch: Sequence[Tuple[int, str, str]]) -> None:
+    cursor.executemany(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, body) VALUES (%s, %s, %s)", batch
+    )
+
+
+def _match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query where every term must prefix-match."""
+
+    tokens = _TOKEN_RE.findall(query)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search(
+    query: str,
+    *,
+    kinds: Optional[Iterable[str]] = None,
+    limit: int = 20,
+) -> List[Dict[str, object]]:
+    """Return ranked hits for ``query`` as ``{"kind", "id", "title", "snippet", "score"}``."""
+
+    wanted = [kind for kind in (kinds or SEARCH_KINDS) if kind in _KIND_CODES]
+    if not wanted or not _TOKEN_RE.search(query or ""):
+        return []
+    if not search_backend_available():
+        return _search_fallback(query, wanted, limit)
+
+    codes = ", ".join(str(_KIND_CODES[kind]) for kind in wanted)
+    sql = (
+        f"SELECT rowid, title, snippet({SEARCH_TABLE}, 1, '[', ']', '…', 12), "
+        f"bm25({SEARCH_TABLE}, 10.0, 1.0) AS score "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+        f"AND rowid %% {_ROWID_STRIDE} IN ({codes}) "
+        "ORDER BY score LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_match_expression(query), limit])
+        rows = cursor.fetchall()
+
+    results = []
+    for rowid, title, snippet, score in rows:
+        results.append(
+            {
+                "kind": _CODE_KINDS[rowid % _ROWID_STRIDE],
+                "id": rowid // _ROWID_STRIDE,
+                "title": title,
+                "snippet": snippet,
+                # bm25() is lower-is-better; flip it so clients can sort descending.
+                "score": round(-score, 4),
+            }
+        )
+    return results
+
+
+def _search_fallback(query: str, kinds: Sequence[str], limit: int) -> List[Dict[str, object]]:
+    """Substring search for databases without FTS5; every term must match."""
+
+    fields = {
+        "airport": ("name", "city", "icao", "iata"),
+        "spot": ("title", "description", "tips"),
+        "post": ("title", "body"),
+        "comment": ("body",),
+    }
+    tokens = _TOKEN_RE.findall(query)
+    results: List[Dict[str, object]] = []
+    for kind in kinds:
+        condition = Q()
+        for token in tokens:
+            token_q = Q()
+            for field in fields[kind]:
+                token_q |= Q(**{f"{field}__icontains": token})
+            condition &= token_q
+        for instance in _KIND_MODELS[kind].objects.filter(condition).order_by("-pk")[:limit]:
+            title, body = _document(kind, instance)
+            results.append(
+                {"kind": kind, "id": instance.pk, "title": title, "snippet": body[:160], "score": 0.0}
+            )
+    return results[:limit]
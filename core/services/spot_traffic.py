@@ -0,0 +1,293 @@
+"""Which live aircraft will pass each spotting location in the next few minutes.
+
+Once per poll the OpenSky ``states/all`` snapshot (``LIVE_TRAFFIC_URL``) is
+loaded into NumPy arrays.  Every aircraft is then projected along its current
+track against every :class:`~core.models.SpottingLocation` at once.  The
+result for each spot is every aircraft whose closest approach within
+``LIVE_TRAFFIC_HORIZON_SECONDS`` comes inside ``LIVE_TRAFFIC_RADIUS_KM``,
+with the time until that moment.  It is cached for the whole spot set for
+``LIVE_TRAFFIC_POLL_SECONDS``, so ``/spots/{id}/incoming/`` only reads the
+cache.  Without NumPy installed the endpoint answers 503 and the scheduler
+job fails like an unreachable feed.
+
+Positions are projected onto a flat plane centred on each spot.  Over the
+couple of hundred kilometres an airliner covers in ten minutes this is off by
+well under one per cent.  Spots and aircraft are both sorted by latitude, so
+each block of spots is only compared with the band of aircraft that could
+reach it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from core.geo import KM_PER_DEGREE
+from core.models import SpottingLocation
+
+from . import feed_cache
+
+try:  # pragma: no cover - exercised only where numpy is installed
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SPOT_TRAFFIC_KEY = "spot-traffic"
+MS_TO_KNOTS = 1.94384
+M_TO_FEET = 3.28084
+# Spots compared per block: few enough that a block spans a narrow band of
+# latitude, and no more than BLOCK_PAIRS spot x aircraft pairs at once.
+SPOT_BLOCK = 64
+BLOCK_PAIRS = 1 << 20
+
+# Positions of the fields used from each OpenSky state vector.
+ICAO24, CALLSIGN, LON, LAT, BARO_ALTITUDE, ON_GROUND, VELOCITY, TRUE_TRACK, GEO_ALTITUDE = (
+    0, 1, 5, 6, 7, 8, 9, 10, 13,
+)
+
+
+class LiveTrafficError(RuntimeError):
+    """Raised when the live state vectors cannot be retrieved."""
+
+
+@dataclass(frozen=True)
+class StateVectors:
+    """Airborne aircraft as parallel arrays, sorted by latitude."""
+
+    icao24: np.ndarray
+    callsign: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    altitude_m: np.ndarray
+    speed_ms: np.ndarray
+    heading: np.ndarray
+    time: float
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @classmethod
+    def from_opensky(cls, payload: Dict[str, Any]) -> "StateVectors":
+        """Keep airborne states with a position, speed and track."""
+
+        states = [
+            state
+            for state in payload.get("states") or ()
+            if not state[ON_GROUND]
+            and all(state[index] is not None for index in (LAT, LON, VELOCITY, TRUE_TRACK))
+        ]
+
+        def column(index: int) -> np.ndarray:
+            return np.fromiter((state[index] for state in states), dtype=float, count=len(states))
+
+        altitude = np.fromiter(
+            (
+                state[GEO_ALTITUDE] if state[GEO_ALTITUDE] is not None else state[BARO_ALTITUDE]
+                for state in states
+            ),
+            dtype=float,
+            count=len(states),
+        )
+        lat = column(LAT)
+        order = np.argsort(lat, kind="stable")
+        return cls(
+            icao24=np.array([(state[ICAO24] or "").upper() for state in states], dtype=object)[order],
+            callsign=np.array([(state[CALLSIGN] or "").strip() for state in states], dtype=object)[order],
+            lat=lat[order],
+            lon=column(LON)[order],
+            altitude_m=altitude[order],
+            speed_ms=column(VELOCITY)[order],
+            heading=column(TRUE_TRACK)[order],
+            time=float(payload.get("time") or time.time()),
+        )
+
+
+def fetch_state_vectors(url: Optional[str] = None) -> StateVectors:
+    try:
+        request = urllib.request.Request(url or settings.LIVE_TRAFFIC_URL, headers={"Accept": "application/json"})
+        with urllib.request.urlopen(request, timeout=settings.LIVE_TRAFFIC_TIMEOUT) as response:
+            payload = json.load(response)
+    except Exception as exc:  # pragma: no cover - network errors mocked in tests
+        raise LiveTrafficError(str(exc)) from exc
+    return StateVectors.from_opensky(payload)
+
+
+@dataclass(frozen=True)
+class Approaches:
+    """Spot/aircraft pairs that pass within the radius, as parallel arrays."""
+
+    spot: np.ndarray
+    aircraft: np.ndarray
+    distance_km: np.ndarray
+    closest_km: np.ndarray
+    eta_seconds: np.ndarray
+
+
+def closest_approaches(
+    states: StateVectors,
+    spot_lat: np.ndarray,
+    spot_lon: np.ndarray,
+    *,
+    horizon: float,
+    radius_km: float,
+) -> Approaches:
+    """Every (spot index, aircraft index) pair coming within ``radius_km`` in ``horizon`` seconds.
+
+    Each aircraft is assumed to hold its speed and track.  ``eta_seconds`` is
+    the time of closest approach; it is 0 for aircraft already moving away.
+    """
+
+    found: List[tuple] = []
+    if len(states) and len(spot_lat):
+        speed_kms = states.speed_ms / 1000
+        track = np.radians(states.heading)
+        east_kms = speed_kms * np.sin(track)
+        north_kms = speed_kms * np.cos(track)
+        with np.errstate(divide="ignore"):
+            inverse_speed2 = np.where(speed_kms > 0, 1 / (speed_kms * speed_kms), 0.0)
+        reach_deg = (float(speed_kms.max()) * horizon + radius_km) / KM_PER_DEGREE
+
+        spot_order = np.argsort(spot_lat, kind="stable")
+        block = max(1, min(SPOT_BLOCK, BLOCK_PAIRS // len(states)))
+        for start in range(0, len(spot_order), block):
+            spots = spot_order[start : start + block]
+            lat = spot_lat[spots][:, None]
+            # Only aircraft in the latitude band these spots can be reached from.
+            low, high = np.searchsorted(states.lat, [lat.min() - reach_deg, lat.max() + reach_deg])
+            if low == high:
+                continue
+            band = slice(low, high)
+            # Offsets in km on a plane centred on each spot (rows) per aircraft
+            # (columns).  Arithmetic is in place to keep temporaries down.
+            east = states.lon[band] - spot_lon[spots][:, None]
+            east[east > 180] -= 360
+            east[east < -180] += 360
+            east *= KM_PER_DEGREE * np.cos(np.radians(lat))
+            north = states.lat[band] - lat
+            north *= KM_PER_DEGREE
+            ve, vn = east_kms[band], north_kms[band]
+            # Closest approach is at t = -(offset . velocity) / |velocity|^2.
+            eta = east * ve
+            eta += north * vn
+            eta *= -inverse_speed2[band]
+            np.clip(eta, 0.0, horizon, out=eta)
+            miss_east = ve * eta
+            miss_east += east
+            miss_north = vn * eta
+            miss_north += north
+            miss_east *= miss_east
+            miss_north *= miss_north
+            miss_east += miss_north
+            rows, columns = np.nonzero(miss_east <= radius_km * radius_km)
+            if len(rows):
+                found.append(
+                    (
+                        spots[rows],
+                        columns + low,
+                        np.hypot(east[rows, columns], north[rows, columns]),
+                        np.sqrt(miss_east[rows, columns]),
+                        eta[rows, columns],
+                    )
+                )
+
+    if not found:
+        empty = np.empty(0)
+        return Approaches(empty.astype(int), empty.astype(int), empty, empty, empty)
+    return Approaches(*(np.concatenate(parts) for parts in zip(*found)))
+
+
+def compute_spot_traffic(states: StateVectors) -> Dict[str, Any]:
+    """Incoming aircraft per spot id, soonest first, for one poll."""
+
+    horizon = settings.LIVE_TRAFFIC_HORIZON_SECONDS
+    radius_km = settings.LIVE_TRAFFIC_RADIUS_KM
+    spots = list(SpottingLocation.objects.values_list("id", "lat", "lon"))
+    spot_ids = np.array([spot[0] for spot in spots], dtype=int)
+    spot_lat = np.array([spot[1] for spot in spots], dtype=float)
+    spot_lon = np.array([spot[2] for spot in spots], dtype=float)
+    approaches = closest_approaches(states, spot_lat, spot_lon, horizon=horizon, radius_km=radius_km)
+
+    incoming: Dict[int, List[Dict[str, Any]]] = {}
+    order = np.lexsort((approaches.closest_km, approaches.eta_seconds))
+    for index in order.tolist():
+        aircraft = int(approaches.aircraft[index])
+        altitude = states.altitude_m[aircraft]
+        incoming.setdefault(int(spot_ids[approaches.spot[index]]), []).append(
+            {
+                "id": states.icao24[aircraft],
+                "callsign": states.callsign[aircraft],
+                "lat": float(states.lat[aircraft]),
+                "lon": float(states.lon[aircraft]),
+                "alt": None if np.isnan(altitude) else max(0, round(altitude * M_TO_FEET)),
+                "speed": round(float(states.speed_ms[aircraft]) * MS_TO_KNOTS),
+                "heading": float(states.heading[aircraft]),
+                "distance_km": round(float(approaches.distance_km[index]), 2),
+                "closest_km": round(float(approaches.closest_km[index]), 2),
+                "eta_seconds": round(float(approaches.eta_seconds[index])),
+            }
+        )
+    return {
+        "generated_at": states.time,
+        "horizon_seconds": horizon,
+        "radius_km": radius_km,
+        "aircraft": len(states),
+        "spots": incoming,
+    }
+
+
+def refresh_spot_traffic() -> Dict[str, Any]:
+    if np is None:
+        raise LiveTrafficError("Spot traffic needs NumPy, which is not installed")
+    started = time.monotonic()
+    traffic = compute_spot_traffic(fetch_state_vectors())
+    logger.info(
+        "Spot traffic: %d aircraft against %d spots with arrivals in %.0f ms",
+        traffic["aircraft"],
+        len(traffic["spots"]),
+        (time.monotonic() - started) * 1000,
+    )
+    return traffic
+
+
+def _cache_options() -> Dict[str, float]:
+    return {
+        "ttl": settings.LIVE_TRAFFIC_POLL_SECONDS,
+        "stale_ttl": settings.LIVE_TRAFFIC_STALE_SECONDS,
+        "lock_timeout": settings.LIVE_TRAFFIC_TIMEOUT + 5,
+        "retry_after": settings.LIVE_TRAFFIC_POLL_SECONDS,
+    }
+
+
+def spot_traffic() -> Dict[str, Any]:
+    """The latest poll's results, recomputed by one worker when they expire."""
+
+    return feed_cache.get_or_refresh(SPOT_TRAFFIC_KEY, refresh_spot_traffic, **_cache_options())
+
+
+def store_spot_traffic() -> int:
+    """Scheduler job: recompute every spot's arrivals ahead of requests."""
+
+    options = _cache_options()
+    traffic = feed_cache.store(
+        SPOT_TRAFFIC_KEY, refresh_spot_traffic(), ttl=options["ttl"], stale_ttl=options["stale_ttl"]
+    )
+    return len(traffic["spots"])
+
+
+def incoming(spot_id: int) -> Dict[str, Any]:
+    traffic = spot_traffic()
+    return {
+        "spot": spot_id,
+        "generated_at": traffic["generated_at"],
+        "horizon_seconds": traffic["horizon_seconds"],
+        "radius_km": traffic["radius_km"],
+        "results": traffic["spots"].get(spot_id, []),
+    }
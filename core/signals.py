@@ -0,0 +1,93 @@
+"""Signal handlers that keep derived data in step with the core models."""
+
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import Airport, Comment, Photo, Post, SpottingLocation
+from .services import airport_autocomplete, airports, photo_derivatives, photo_store, search
+
+
+def _update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_instance(instance)
+
+
+def _remove_from_search_index(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+for _model in (Airport, SpottingLocation, Post, Comment):
+    post_save.connect(
+        _update_search_index, sender=_model, dispatch_uid=f"search-index-{_model.__name__}"
+    )
+    post_delete.connect(
+        _remove_from_search_index, sender=_model, dispatch_uid=f"search-remove-{_model.__name__}"
+    )
+
+
+def _invalidate_airport_reference(sender, instance, raw=False, **kwargs):
+    transaction.on_commit(airports.invalidate_airport_reference)
+
+
+post_save.connect(_invalidate_airport_reference, sender=Airport, dispatch_uid="airport-reference-save")
+post_delete.connect(_invalidate_airport_reference, sender=Airport, dispatch_uid="airport-reference-delete")
+
+
+def _update_airport_autocomplete(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    row = airport_autocomplete.reference_row(instance)
+    transaction.on_commit(lambda: airport_autocomplete.airport_saved(row))
+
+
+def _remove_from_airport_autocomplete(sender, instance, **kwargs):
+    airport_id = instance.pk
+    transaction.on_commit(lambda: airport_autocomplete.airport_deleted(airport_id))
+
+
+# Connected after the reference invalidation so that other workers rebuilding
+# on the new version stamp read a fresh reference list.
+post_save.connect(_update_airport_autocomplete, sender=Airport, dispatch_uid="airport-autocomplete-save")
+post_delete.connect(
+    _remove_from_airport_autocomplete, sender=Airport, dispatch_uid="airport-autocomplete-delete"
+)
+
+
+def _queue_photo_derivatives(sender, instance, raw=False, **kwargs):
+    if raw or not photo_derivatives.needs_derivatives(instance):
+        return
+    # Wait for the commit so the worker thread can see the row and the file.
+    transaction.on_commit(lambda: photo_derivatives.schedule_photo(instance.pk))
+
+
+def _remember_photo_content(sender, instance, **kwargs):
+    # Read from __dict__ so instances loaded with .only() do not query for it;
+    # ``None`` then means "unknown" and the instance is not re-registered.
+    instance._stored_sha256 = instance.__dict__.get("sha256")
+
+
+def _register_photo_content(sender, instance, created, raw=False, **kwargs):
+    previous = "" if created else instance._stored_sha256
+    if raw or previous is None or (instance.sha256 == previous and not created):
+        return
+    photo_store.register_content(instance, previous)
+    instance._stored_sha256 = instance.sha256
+
+
+def _release_photo_content(sender, instance, **kwargs):
+    if instance.sha256:
+        photo_store.release_content(instance.sha256, instance.derivatives)
+        return
+    # Photos stored before content addressing are not reference counted; only
+    # drop their derivatives once no other row shares the image.
+    if not Photo.objects.filter(image=instance.image.name).exists():
+        photo_derivatives.delete_derivatives(instance.derivatives)
+
+
+post_init.connect(_remember_photo_content, sender=Photo, dispatch_uid="photo-content-remember")
+post_save.connect(_register_photo_content, sender=Photo, dispatch_uid="photo-content-register")
+post_save.connect(_queue_photo_derivatives, sender=Photo, dispatch_uid="photo-derivatives-queue")
+post_delete.connect(_release_photo_content, sender=Photo, dispatch_uid="photo-content-release")
@@ -1,15 +1,56 @@
+import bz2
+import csv
+import gzip
+import hashlib
 import io
+import json
+import lzma
+import math
+import shutil
+import tempfile
+import time
+import zlib
+from decimal import Decimal
 from unittest import mock
 
+import numpy as np
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.management import call_command
+from django.db import connection
 from django.test import SimpleTestCase, TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient, APIRequestFactory
 
-from .models import Aircraft, UserSeen
-from .services import aircraft_feed
+from .aircraft_types import type_family
+from . import geo
+from .geo import spatial_cell
+from .models import (
+    Aircraft,
+    AircraftType,
+    Airport,
+    Comment,
+    Frequency,
+    Operator,
+    Photo,
+    PhotoBlob,
+    PhotoUpload,
+    Post,
+    SpottingLocation,
+    UserSeen,
+)
+from .services import (
+    aircraft_feed,
+    airport_autocomplete,
+    airport_import,
+    airports,
+    feed_compression,
+    logbook,
+    search,
+    spot_traffic,
+)
 
 
 SAMPLE_CSV = """icao24,registration,manufacturername,manufacturericao,model,typecode,icaoaircrafttype,operator,operatorcallsign,owner,serialnumber,built,registeredcountry,operatorcountry
@@ -81,6 +122,160 @@ class FetchLiveFleetTests(SimpleTestCase):
         self.assertIn("G-EZTH", registrations)
 
 
+class FeedCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        from .services import feed_cache
+
+        self.feed_cache = feed_cache
+
+    def _stale(self, key, value):
+        self.feed_cache.store(key, value, ttl=-1, stale_ttl=60)
+
+    def test_stale_entry_is_served_while_another_worker_refreshes(self):
+        self._stale("feed-test", ["old"])
+        loader = mock.Mock(return_value=["new"])
+
+        with self.feed_cache.single_flight("feed-test", 30) as leader:
+            self.assertTrue(leader)
+            value = self.feed_cache.get_or_refresh("feed-test", loader, ttl=60, stale_ttl=60)
+
+        self.assertEqual(value, ["old"])
+        loader.assert_not_called()
+        self.assertEqual(self.feed_cache.get_or_refresh("feed-test", loader, ttl=60, stale_ttl=60), ["new"])
+
+    def test_failed_refresh_keeps_serving_stale_copy(self):
+        self._stale("feed-test", ["old"])
+        loader = mock.Mock(side_effect=aircraft_feed.AircraftFeedError("down"))
+
+        value = self.feed_cache.get_or_refresh("feed-test", loader, ttl=60, stale_ttl=60, retry_after=30)
+
+        self.assertEqual(value, ["old"])
+        self.assertGreater(self.feed_cache.peek("feed-test")["fresh_until"], time.time())
+
+    def test_concurrent_cold_misses_load_once(self):
+        import threading
+
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.3)
+            return ["fresh"]
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.feed_cache.get_or_refresh("feed-cold", loader, ttl=60, stale_ttl=60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["fresh"]] * 5)
+
+    def test_file_cache_lock_is_exclusive(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        caches = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}}
+        with override_settings(CACHES=caches):
+            token = self.feed_cache.acquire_lock("feed-file", 30)
+            self.assertIsNotNone(token)
+            self.assertIsNone(self.feed_cache.acquire_lock("feed-file", 30))
+            self.feed_cache.release_lock("feed-file", token)
+            self.assertIsNotNone(self.feed_cache.acquire_lock("feed-file", 30))
+
+    def test_jitter_spreads_ttl(self):
+        values = {round(self.feed_cache.jittered(900, 0.1)) for _ in range(20)}
+        self.assertTrue(all(810 <= value <= 990 for value in values))
+        self.assertGreater(len(values), 1)
+        self.assertEqual(self.feed_cache.jittered(900, 0), 900)
+
+
+@override_settings(AIRCRAFT_FEED_BREAKER_FAILURES=2, AIRCRAFT_FEED_BREAKER_RESET_SECONDS=60)
+class FeedCircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        from .services import metrics
+
+        self.metrics = metrics
+        metrics.reset()
+        self.breaker = aircraft_feed.feed_breaker
+
+    def _fail(self):
+        raise aircraft_feed.AircraftFeedError("down")
+
+    def _expire_open_window(self):
+        state = self.breaker.state()
+        self.breaker._save({**state, "opened_at": state["opened_at"] - 61})
+
+    def test_breaker_opens_probes_and_closes(self):
+        for _ in range(2):
+            with self.assertRaises(aircraft_feed.AircraftFeedError):
+                self.breaker.call(self._fail)
+        self.assertEqual(self.breaker.state()["state"], "open")
+
+        probe = mock.Mock(return_value="ok")
+        with self.assertRaises(aircraft_feed.FeedCircuitOpen):
+            self.breaker.call(probe)
+        probe.assert_not_called()
+
+        self._expire_open_window()
+        self.assertEqual(self.breaker.call(probe), "ok")
+        self.assertEqual(self.breaker.state()["state"], "closed")
+        transitions = {
+            (dict(labels)["from"], dict(labels)["to"])
+            for (name, labels) in self.metrics.snapshot()
+            if name == "circuit_breaker_transitions_total"
+        }
+        self.assertEqual(transitions, {("closed", "open"), ("open", "half_open"), ("half_open", "closed")})
+
+    def test_failed_probe_reopens_and_only_one_probe_runs(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self._expire_open_window()
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state()["state"], "open")
+
+    def test_open_circuit_skips_the_feed(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        opener = mock.Mock()
+        with mock.patch.object(aircraft_feed, "_open_feed", opener):
+            results = aircraft_feed.fetch_live_fleet(limit=5, use_cache=False)
+
+        opener.assert_not_called()
+        self.assertIn("G-EZTH", {row["registration"] for row in results})
+        self.assertEqual(self.metrics.value("aircraft_feed_fallback_total", {"reason": "FeedCircuitOpen"}), 1)
+
+    @override_settings(AIRCRAFT_FEED_HEDGE_SECONDS=0.05)
+    def test_slow_feed_is_hedged_and_cached_when_it_arrives(self):
+        def slow_feed(url):
+            time.sleep(0.3)
+            return io.StringIO(SAMPLE_CSV.replace("G-EZTH", "G-SLOW"))
+
+        with mock.patch.object(aircraft_feed, "_open_feed", side_effect=slow_feed):
+            started = time.monotonic()
+            hedged = aircraft_feed.fetch_live_fleet(limit=1)
+            self.assertLess(time.monotonic() - started, 0.25)
+            deadline = time.monotonic() + 2
+            while aircraft_feed._in_flight and time.monotonic() < deadline:
+                time.sleep(0.02)
+
+        self.assertNotEqual(hedged[0]["registration"], "G-SLOW")
+        self.assertEqual(self.metrics.value("aircraft_feed_hedged_total"), 1)
+        with mock.patch.object(aircraft_feed, "_open_feed", side_effect=AssertionError("not cached")):
+            self.assertEqual(aircraft_feed.fetch_live_fleet(limit=1)[0]["registration"], "G-SLOW")
+
+
 class LiveFleetViewTests(SimpleTestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
@@ -130,6 +325,128 @@ class LiveFleetViewTests(SimpleTestCase):
         self.assertEqual(response.data["detail"], "network down")
 
 
+class AsyncLiveFleetTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        from .services import async_feed
+
+        self.async_feed = async_feed
+        # Exercise the threaded reader so the tests never reach the network.
+        patcher = mock.patch.object(async_feed, "httpx", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_csv_rows_survive_arbitrary_chunking(self):
+        import asyncio
+
+        text = 'icao24,registration,owner\r\nabc,G-ABCD,"Line one\nline, two"\r\ndef,G-EFGH,Plain\r\n'
+
+        async def chunks():
+            for start in range(0, len(text), 5):
+                yield text[start:start + 5]
+
+        async def collect():
+            return [row async for row in self.async_feed.aiter_csv_rows(chunks())]
+
+        rows = asyncio.run(collect())
+
+        self.assertEqual([row["registration"] for row in rows], ["G-ABCD", "G-EFGH"])
+        self.assertEqual(rows[0]["owner"], "Line one\nline, two")
+
+    async def test_async_view_serves_filtered_feed(self):
+        with mock.patch.object(aircraft_feed, "_open_feed", side_effect=lambda url: io.StringIO(SAMPLE_CSV)):
+            response = await self.async_client.get("/api/fleet/live/?registration=c-f")
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload["count"], 1)
+        self.assertEqual(payload["results"][0]["registration"], "C-FGHI")
+        self.assertEqual(payload["filters"], {"registration": "c-f", "country": None})
+
+    async def test_async_view_caches_and_falls_back(self):
+        opener = mock.Mock(side_effect=aircraft_feed.AircraftFeedError("down"))
+        with mock.patch.object(aircraft_feed, "_open_feed", opener):
+            first = await self.async_client.get("/api/fleet/live/?limit=5")
+            second = await self.async_client.get("/api/fleet/live/?limit=2")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("G-EZTH", {row["registration"] for row in first.json()["results"]})
+        self.assertEqual(second.json()["count"], 2)
+        self.assertEqual(opener.call_count, 1)
+
+    async def test_async_view_rejects_bad_limit(self):
+        response = await self.async_client.get("/api/fleet/live/?limit=lots")
+        self.assertEqual(response.status_code, 400)
+
+
+class CompressedFeedTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+
+    def _snapshot(self, name, data):
+        path = f"{self.workdir}/{name}"
+        with open(path, "wb") as handle:
+            handle.write(data)
+        return path
+
+    def test_snapshots_are_decoded_by_magic_bytes_and_extension(self):
+        payload = SAMPLE_CSV.encode()
+        snapshots = {
+            "fleet.csv.gz": gzip.compress(payload[:150]) + gzip.compress(payload[150:]) + b"\x00" * 8,
+            "fleet.csv.bz2": bz2.compress(payload),
+            "fleet.csv.xz": lzma.compress(payload[:150]) + lzma.compress(payload[150:]) + b"\x00" * 4,
+            "fleet.csv.lzma": lzma.compress(payload, format=lzma.FORMAT_ALONE),
+            "fleet-xz-without-extension": lzma.compress(payload),
+            "fleet.csv": payload,
+        }
+        for name, data in snapshots.items():
+            with self.subTest(name=name), feed_compression.open_file(self._snapshot(name, data)) as handle:
+                self.assertEqual(handle.read(), SAMPLE_CSV)
+
+    def test_content_encoding_is_undone_before_the_payload(self):
+        raw = io.BytesIO(zlib.compress(gzip.compress(SAMPLE_CSV.encode())))
+
+        with feed_compression.open_text(raw, name="feed", content_encoding="deflate") as handle:
+            self.assertEqual(handle.read(), SAMPLE_CSV)
+
+    def test_crlf_inside_quoted_fields_survives_decoding(self):
+        text = 'registration,operator\r\nZQ-CRLF,"Line one\r\nLine two"\r\n'
+        raw = io.BytesIO(gzip.compress(text.encode()))
+
+        with feed_compression.open_text(raw, name="feed.csv.gz") as handle:
+            rows = list(csv.DictReader(handle))
+
+        self.assertEqual(rows, [{"registration": "ZQ-CRLF", "operator": "Line one\r\nLine two"}])
+
+    def test_truncated_or_unknown_data_raises(self):
+        truncated = io.BytesIO(gzip.compress(SAMPLE_CSV.encode())[:-20])
+        with self.assertRaises(feed_compression.CompressedFeedError):
+            feed_compression.open_text(truncated).read()
+        with self.assertRaises(feed_compression.UnsupportedCompression):
+            feed_compression.open_text(io.BytesIO(b"abc"), content_encoding="compress")
+
+    def test_live_fleet_reads_a_compressed_feed(self):
+        url = "file://" + self._snapshot("feed.csv.bz2", bz2.compress(SAMPLE_CSV.encode()))
+
+        with override_settings(AIRCRAFT_FEED_URL=url):
+            fleet = aircraft_feed.fetch_live_fleet(country="canada", use_cache=False)
+
+        self.assertEqual([row["registration"] for row in fleet], ["C-FGHI"])
+
+    async def test_async_chunks_are_decoded_incrementally(self):
+        text = SAMPLE_CSV.replace("Bombardier CRJ900", "Bombardier CRJ900 – Zürich")
+        data = gzip.compress(text.encode())
+
+        async def chunks():
+            for start in range(0, len(data), 7):
+                yield data[start:start + 7]
+
+        decoded = feed_compression.atext_chunks(feed_compression.adecoded_chunks(chunks(), name="feed.csv.gz"))
+        self.assertEqual("".join([chunk async for chunk in decoded]), text)
+
+
 class SyncAircraftDatabaseTests(TestCase):
     def setUp(self):
         cache.clear()
@@ -208,6 +525,131 @@ class SyncAircraftDatabaseTests(TestCase):
         self.assertTrue(Aircraft.objects.filter(registration="NEW999").exists())
 
 
+    def test_sync_interns_types_and_operators(self):
+        payload = [
+            {"registration": "ZQ-NEO1", "model": "A320-251N", "type_code": "A20N", "operator": "ZQ Air"},
+            {"registration": "ZQ-NEO2", "model": "A321-271NX", "type_code": "A21N", "operator": "ZQ Air"},
+            {"registration": "ZQ-NEO3", "model": "A320-251N", "type_code": "A20N", "operator": "ZQ Air"},
+        ]
+
+        with mock.patch.object(aircraft_feed, "fetch_live_fleet", return_value=payload):
+            aircraft_feed.sync_aircraft_database(use_cache=False)
+
+        self.assertEqual(Operator.objects.filter(name="ZQ Air").count(), 1)
+        self.assertEqual(Aircraft.objects.filter(operator__name="ZQ Air").count(), 3)
+        self.assertEqual(
+            set(AircraftType.objects.filter(aircraft__operator__name="ZQ Air").values_list("name", "family")),
+            {("A320-251N", "A320neo"), ("A321-271NX", "A320neo")},
+        )
+        self.assertEqual(Aircraft.objects.get(registration="ZQ-NEO2").type, "A321-271NX")
+
+
+class FeedSourceMergeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.opensky = self._source(
+            "opensky",
+            "icao24,registration,model,typecode,operator,registeredcountry\n"
+            "1,ZQ-MRGB,A320-251N,A20N,Feed Air,United Kingdom\n"
+            "2,ZQ-MRGA,A321-251NX,A21N,,United Kingdom\n"
+            "3,ZQ-MRGC,737-8H4,B738,Feed Air,United Kingdom\n"
+            "4,ZQ-MRGA,duplicate,,Duplicate Air,Nowhere\n",
+        )
+        self.registry = self._source(
+            "registry",
+            "Registration,Model,Operator\n"
+            "ZQMRGA,Airbus A321neo,Registry Air\n"
+            "ZQ-MRGD,Cessna 172,Flying Club\n"
+            "ZQ-MRGB,,Registry Air\n",
+        )
+
+    def _source(self, name, text):
+        path = f"{self.workdir}/{name}.csv"
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+        return aircraft_feed.FeedSource(name, path)
+
+    def test_sources_are_sorted_on_disk_and_merged_by_registration(self):
+        records = list(
+            aircraft_feed.merged_records(
+                [self.opensky, self.registry], precedence={"operator": ("registry",)}, run_rows=1
+            )
+        )
+
+        self.assertEqual(
+            [(record.registration, record.model, record.operator) for record in records],
+            [
+                ("ZQ-MRGA", "A321-251NX", "Registry Air"),
+                ("ZQ-MRGB", "A320-251N", "Registry Air"),
+                ("ZQ-MRGC", "737-8H4", "Feed Air"),
+                ("ZQ-MRGD", "Cessna 172", "Flying Club"),
+            ],
+        )
+        self.assertEqual(records[0].country, "United Kingdom")
+
+    def test_sync_reads_merged_sources(self):
+        sources = (("opensky", self.opensky.location), ("registry", self.registry.location))
+        with override_settings(
+            AIRCRAFT_FEED_SOURCES=sources,
+            AIRCRAFT_FEED_FIELD_PRECEDENCE={"model": ("registry",)},
+            AIRCRAFT_FEED_SORT_RUN_ROWS=2,
+            AIRCRAFT_SYNC_BATCH_SIZE=3,
+        ):
+            summary = aircraft_feed.sync_aircraft_database(limit=0)
+
+        self.assertEqual(summary["processed"], 4)
+        self.assertEqual(summary["created"], 4)
+        merged = Aircraft.objects.select_related("aircraft_type", "operator").get(registration="ZQ-MRGA")
+        self.assertEqual((merged.type, merged.airline), ("Airbus A321neo", "Registry Air"))
+        self.assertEqual(merged.aircraft_type.family, "A320neo")
+
+    def test_sync_batches_writes_and_prunes_by_generation(self):
+        Aircraft.objects.create(registration="ZQ-GONE")
+        sources = (("opensky", self.opensky.location), ("registry", self.registry.location))
+        with override_settings(AIRCRAFT_FEED_SOURCES=sources, AIRCRAFT_SYNC_BATCH_SIZE=2):
+            first = aircraft_feed.sync_aircraft_database(limit=0, prune=True)
+            again = aircraft_feed.sync_aircraft_database(limit=0)
+
+        self.assertEqual((first["created"], first["skipped"]), (4, 0))
+        self.assertFalse(Aircraft.objects.filter(registration="ZQ-GONE").exists())
+        self.assertEqual(Aircraft.objects.count(), 4)
+        self.assertEqual((again["created"], again["updated"]), (0, 0))
+        self.assertEqual(set(Aircraft.objects.values_list("sync_generation", flat=True)), {2})
+
+    def test_sync_skips_repeats_from_the_live_feed(self):
+        payload = [
+            {"registration": "ZQ-RPTB", "operator": "First Air"},
+            {"registration": "zq-rpta"},
+            {"registration": "ZQ-RPTB", "operator": "Second Air"},
+        ]
+        with mock.patch.object(aircraft_feed, "fetch_live_fleet", return_value=payload):
+            summary = aircraft_feed.sync_aircraft_database()
+
+        self.assertEqual((summary["created"], summary["skipped"]), (2, 1))
+        self.assertEqual(Aircraft.objects.get(registration="ZQ-RPTB").airline, "First Air")
+
+    def test_single_source_keeps_first_row_per_registration(self):
+        records = list(aircraft_feed.merged_records([self.opensky], run_rows=1))
+
+        self.assertEqual([record.registration for record in records], ["ZQ-MRGA", "ZQ-MRGB", "ZQ-MRGC"])
+        self.assertEqual((records[0].model, records[0].operator), ("A321-251NX", ""))
+
+    def test_sync_reads_single_configured_source(self):
+        with override_settings(AIRCRAFT_FEED_SOURCES=(("registry", self.registry.location),)):
+            with mock.patch.object(aircraft_feed, "fetch_live_fleet") as fetch:
+                summary = aircraft_feed.sync_aircraft_database(limit=0)
+
+        fetch.assert_not_called()
+        self.assertEqual(summary["created"], 3)
+        self.assertEqual(Aircraft.objects.get(registration="ZQ-MRGD").airline, "Flying Club")
+
+    def test_missing_local_source_raises_feed_error(self):
+        with self.assertRaises(aircraft_feed.AircraftFeedError):
+            list(aircraft_feed.merged_records([self.opensky, aircraft_feed.FeedSource("gone", "/nonexistent.csv")]))
+
+
 class SyncAircraftCommandTests(TestCase):
     def setUp(self):
         cache.clear()
@@ -356,3 +798,1398 @@ class UserSeenAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]["id"], mine.id)
+
+
+class ForumAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            username="forum-spotter",
+            password="supersecret",
+        )
+        self.airport = Airport.objects.get(icao="EGLL")
+        self.post = Post.objects.create(
+            user=self.user,
+            airport=self.airport,
+            title="27L arrivals",
+            body="Who is out at the mound today?",
+        )
+        other = Post.objects.create(user=self.user, title="General chat", body="Hello")
+        for index in range(5):
+            Comment.objects.create(user=self.user, post=self.post, body=f"Reply {index}")
+        Comment.objects.create(user=self.user, post=other, body="Unrelated")
+
+    def test_post_list_annotates_comment_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/posts/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {item["title"]: item["comment_count"] for item in response.data["results"]}
+        self.assertEqual(counts, {"27L arrivals": 5, "General chat": 1})
+        self.assertIn("next", response.data)
+
+    def test_post_list_filters_by_airport_icao(self):
+        response = self.client.get("/api/posts/", {"airport": "egll"})
+
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.post.id])
+
+    def test_post_detail_prefetches_comments_in_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/posts/{self.post.id}/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["comment_count"], 5)
+        self.assertEqual(
+            [comment["body"] for comment in response.data["comments"]],
+            [f"Reply {index}" for index in range(5)],
+        )
+        self.assertEqual(response.data["comments"][0]["username"], "forum-spotter")
+
+    def test_comment_list_uses_keyset_pages(self):
+        response = self.client.get("/api/comments/", {"post": self.post.id, "page_size": 2})
+
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+        self.assertNotIn("count", response.data)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [comment["body"] for comment in response.data["results"]],
+            ["Reply 2", "Reply 3"],
+        )
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username="searcher", password="secret")
+        self.airport = Airport.objects.get(icao="EGLL")
+
+    def test_migrated_airports_are_searchable(self):
+        response = self.client.get("/api/search/", {"q": "heathrow", "type": "airport"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["id"], self.airport.id)
+
+    def test_index_follows_saves_and_deletes(self):
+        spot = SpottingLocation.objects.create(
+            airport=self.airport,
+            title="Zephyr Lane",
+            description="Classic approach spot for 27L arrivals",
+            lat=51.46,
+            lon=-0.42,
+            tips="Bring a quokka",
+        )
+        post = Post.objects.create(user=self.user, title="Zephyr Lane crowds", body="Busy today")
+
+        hits = search.search("zephyr")
+        self.assertEqual({(hit["kind"], hit["id"]) for hit in hits}, {("spot", spot.id), ("post", post.id)})
+        self.assertEqual([hit["id"] for hit in search.search("zeph 27l", kinds=["spot"])], [spot.id])
+
+        spot.tips = "Wombat recommended"
+        spot.save()
+        self.assertEqual(search.search("quokka", kinds=["spot"]), [])
+        self.assertEqual(len(search.search("wombat", kinds=["spot"])), 1)
+
+        post.delete()
+        self.assertEqual([hit["kind"] for hit in search.search("zephyr")], ["spot"])
+
+    def test_title_matches_rank_above_body_matches(self):
+        body_hit = Post.objects.create(user=self.user, title="Weekend", body="Saw a supersonic replica")
+        title_hit = Post.objects.create(user=self.user, title="Supersonic at Brooklands", body="Museum trip")
+
+        hits = search.search("supersonic", kinds=["post"])
+
+        self.assertEqual([hit["id"] for hit in hits], [title_hit.id, body_hit.id])
+
+    def test_rebuild_restores_documents(self):
+        comment_post = Post.objects.create(user=self.user, title="Thread", body="Body")
+        Comment.objects.create(user=self.user, post=comment_post, body="Freighter 747 inbound")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.SEARCH_TABLE}")
+
+        summary = search.rebuild_index()
+
+        self.assertEqual(summary["comment"], 1)
+        self.assertEqual(len(search.search("freighter", kinds=["comment"])), 1)
+
+    def test_search_requires_query_and_known_types(self):
+        self.assertEqual(self.client.get("/api/search/").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get("/api/search/", {"q": "x", "type": "aircraft"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def _jpeg_upload(name="spot.jpg", size=(1000, 500)):
+    from PIL import Image
+
+    image = Image.new("RGB", size, (30, 90, 160))
+    exif = Image.Exif()
+    exif[0x010F] = "Canon"  # Make
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(
+    PHOTO_DERIVATIVE_WIDTHS=(320, 800, 1600),
+    PHOTO_DERIVATIVES_ASYNC=False,
+)
+class PhotoDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.spot = SpottingLocation.objects.filter(airport__icao="EGLL").first()
+
+    def _create_photo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = Photo.objects.create(spot=self.spot, image=_jpeg_upload())
+        photo.refresh_from_db()
+        return photo
+
+    def test_upload_generates_resized_copies_without_exif(self):
+        from PIL import Image
+
+        photo = self._create_photo()
+
+        files = photo.derivatives["files"]
+        self.assertEqual(photo.derivatives["source"], photo.image.name)
+        self.assertEqual(set(files), {"webp", "jpeg"})
+        # 1600 is wider than the original so it is skipped rather than upscaled.
+        self.assertEqual(set(files["jpeg"]), {"320", "800"})
+        with default_storage.open(files["jpeg"]["320"]) as handle, Image.open(handle) as thumb:
+            self.assertEqual(thumb.size, (320, 160))
+            self.assertEqual(len(thumb.getexif()), 0)
+
+    def test_serializer_exposes_derivative_urls(self):
+        photo = self._create_photo()
+
+        response = APIClient().get(f"/api/photos/{photo.id}/")
+
+        urls = response.data["derivatives"]
+        self.assertTrue(urls["webp"]["800"].startswith("http://testserver/media/"))
+        self.assertTrue(urls["webp"]["800"].endswith("-w800.webp"))
+
+    def test_deleting_photo_removes_derivatives(self):
+        photo = self._create_photo()
+        name = photo.derivatives["files"]["webp"]["320"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Photo.objects.get(pk=photo.pk).delete()
+
+        self.assertFalse(default_storage.exists(name))
+
+    def test_backfill_command_processes_pending_photos(self):
+        photo = Photo.objects.create(spot=self.spot, image=_jpeg_upload())
+        self.assertEqual(photo.derivatives, {})
+
+        out = io.StringIO()
+        call_command("generate_photo_derivatives", "--workers", "2", stdout=out)
+
+        photo.refresh_from_db()
+        self.assertIn("320", photo.derivatives["files"]["webp"])
+        self.assertIn("Generated derivatives for 1 photos", out.getvalue())
+
+
+@override_settings(PHOTO_DERIVATIVES_ASYNC=False)
+class PhotoUploadAPITests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        paths = override_settings(
+            MEDIA_ROOT=self.media_root,
+            PHOTO_UPLOAD_TEMP_DIR=f"{self.media_root}/staging",
+        )
+        paths.enable()
+        self.addCleanup(paths.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username="uploader", password="secret")
+        self.client.force_authenticate(self.user)
+        self.spot = SpottingLocation.objects.filter(airport__icao="EGLL").first()
+        self.content = _jpeg_upload().read()
+
+    def _start(self, **extra):
+        payload = {"spot": self.spot.id, "filename": "fence.jpg", "size": len(self.content)}
+        payload.update(extra)
+        response = self.client.post("/api/photo-uploads/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def _put(self, upload_id, offset, data):
+        return self.client.generic(
+            "PUT",
+            f"/api/photo-uploads/{upload_id}/chunk/",
+            data,
+            content_type="application/octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def _upload_all(self, upload_id):
+        half = len(self.content) // 2
+        self._put(upload_id, 0, self.content[:half])
+        self._put(upload_id, half, self.content[half:])
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/photo-uploads/{upload_id}/complete/")
+
+    def test_chunks_resume_from_reported_offset(self):
+        upload_id = self._start()
+        half = len(self.content) // 2
+
+        response = self._put(upload_id, 0, self.content[:half])
+        self.assertEqual(response.data["offset"], half)
+
+        # A retried chunk at a stale offset is rejected with the offset to resume from.
+        response = self._put(upload_id, 0, self.content[:half])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["offset"], half)
+        self.assertEqual(self.client.get(f"/api/photo-uploads/{upload_id}/").data["offset"], half)
+
+        self._put(upload_id, half, self.content[half:])
+        response = self.client.post(f"/api/photo-uploads/{upload_id}/complete/")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.data["deduplicated"])
+        photo = Photo.objects.get(pk=response.data["id"])
+        self.assertEqual(photo.sha256, hashlib.sha256(self.content).hexdigest())
+        with photo.image.open("rb") as handle:
+            self.assertEqual(handle.read(), self.content)
+        self.assertFalse(PhotoUpload.objects.filter(pk=upload_id).exists())
+
+    def test_duplicate_content_reuses_stored_file(self):
+        first = Photo.objects.get(pk=self._upload_all(self._start()).data["id"])
+
+        response = self._upload_all(self._start(filename="again.jpg"))
+
+        self.assertTrue(response.data["deduplicated"])
+        second = Photo.objects.get(pk=response.data["id"])
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.derivatives, first.derivatives)
+
+    def test_declared_hash_must_match(self):
+        upload_id = self._start(sha256="0" * 64)
+
+        response = self._upload_all(upload_id)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Photo.objects.exists())
+
+    def test_incomplete_upload_cannot_be_finalised(self):
+        upload_id = self._start()
+        self._put(upload_id, 0, self.content[:10])
+
+        response = self.client.post(f"/api/photo-uploads/{upload_id}/complete/")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def _pattern_upload(name, *, seed, quality=90):
+    """A JPEG with enough structure for a meaningful perceptual hash."""
+
+    import random
+
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.new("L", (9, 8))
+    image.putdata([rng.randrange(256) for _ in range(72)])
+    image = image.resize((360, 320), Image.Resampling.NEAREST).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(PHOTO_DERIVATIVES_ASYNC=False)
+class ContentAddressedPhotoTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.spot = SpottingLocation.objects.filter(airport__icao="EGLL").first()
+
+    def _create(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = Photo.objects.create(spot=self.spot, image=upload)
+        photo.refresh_from_db()
+        return photo
+
+    def test_identical_uploads_share_one_reference_counted_file(self):
+        content = _pattern_upload("a.jpg", seed=1).read()
+        first = self._create(SimpleUploadedFile("a.jpg", content))
+        second = self._create(SimpleUploadedFile("b.JPEG", content))
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.image.name, f"spot_photos/sha256/{digest[:2]}/{digest}.jpg")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(PhotoBlob.objects.get(pk=digest).refcount, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(second.image.name))
+        self.assertEqual(PhotoBlob.objects.get(pk=digest).refcount, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(second.image.name))
+        self.assertFalse(PhotoBlob.objects.filter(pk=digest).exists())
+
+    def test_near_duplicates_are_linked_and_collapsed(self):
+        original = self._create(_pattern_upload("original.jpg", seed=7))
+        reencoded = self._create(_pattern_upload("reencoded.jpg", seed=7, quality=40))
+        different = self._create(_pattern_upload("other.jpg", seed=8))
+
+        self.assertNotEqual(original.sha256, reencoded.sha256)
+        self.assertIsNone(original.duplicate_of_id)
+        self.assertEqual(reencoded.duplicate_of_id, original.id)
+        self.assertIsNone(different.duplicate_of_id)
+
+        response = APIClient().get("/api/photos/", {"collapse": "1"})
+        self.assertEqual(
+            sorted(item["id"] for item in response.data), [original.id, different.id]
+        )
+        self.assertNotIn("phash_band0", response.data[0])
+
+    def test_replacing_an_image_releases_the_old_file(self):
+        photo = self._create(_pattern_upload("first.jpg", seed=3))
+        old_name = photo.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.image = _pattern_upload("second.jpg", seed=4)
+            photo.save()
+
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertEqual(PhotoBlob.objects.get(pk=photo.sha256).refcount, 1)
+
+
+class SQLiteProfileTests(TestCase):
+    databases = {"default", "replica"}
+
+    def test_production_profile_builds_pragmas_and_read_only_replica(self):
+        from backend.db import sqlite_database
+
+        primary = sqlite_database("/tmp/app.sqlite3")
+        replica = sqlite_database("/tmp/app.sqlite3", read_only=True)
+
+        self.assertIn("PRAGMA journal_mode=WAL", primary["OPTIONS"]["init_command"])
+        self.assertEqual(primary["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertEqual(replica["NAME"], "file:/tmp/app.sqlite3?mode=ro")
+        self.assertNotIn("journal_mode", replica["OPTIONS"]["init_command"])
+        self.assertIn("PRAGMA query_only=ON", replica["OPTIONS"]["init_command"])
+        self.assertNotIn("OPTIONS", sqlite_database("/tmp/app.sqlite3", profile="default"))
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+    def test_tests_use_their_own_cache_directory(self):
+        from django.conf import settings
+
+        self.assertIn("planespotter-test-cache-", settings.CACHES["default"]["LOCATION"])
+        self.assertEqual(cache._dir, settings.CACHES["default"]["LOCATION"])
+
+    def test_test_mirror_is_not_used_as_a_replica(self):
+        from backend.routers import replica_alias
+
+        self.assertIsNone(replica_alias())
+
+    def test_replica_on_another_host_with_the_same_name_is_used(self):
+        from django.db import connections
+
+        from backend.routers import replica_alias
+
+        replica = {**connections["default"].settings_dict, "HOST": "replica.internal"}
+        with mock.patch.object(connections["replica"], "settings_dict", replica):
+            self.assertEqual(replica_alias(), "replica")
+
+
+class ReadReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        from backend import routers
+
+        self.routers = routers
+        self.router = routers.ReadReplicaRouter()
+        patcher = mock.patch.object(routers, "replica_alias", return_value="replica")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _state(self, method="GET", **kwargs):
+        request = APIRequestFactory().generic(method, "/api/airports/")
+        return self.routers.RoutingState(request=request, safe_method=method == "GET", **kwargs)
+
+    def test_safe_requests_read_core_models_from_replica(self):
+        with self.routers.routing_state(self._state()):
+            self.assertEqual(self.router.db_for_read(Airport), "replica")
+            self.assertIsNone(self.router.db_for_read(get_user_model()))
+        self.assertIsNone(self.router.db_for_read(Airport))
+
+    def test_writes_pin_the_rest_of_the_request_to_primary(self):
+        with self.routers.routing_state(self._state()):
+            self.assertEqual(self.router.db_for_write(UserSeen), "default")
+            self.assertEqual(self.router.db_for_read(Airport), "default")
+        with self.routers.routing_state(self._state("POST")):
+            self.assertEqual(self.router.db_for_read(Airport), "default")
+
+    def test_sticky_cookie_keeps_reads_on_primary(self):
+        with self.routers.routing_state(self._state(sticky_cookie=True)):
+            self.assertEqual(self.router.db_for_read(Airport), "default")
+
+    def test_logging_a_sighting_makes_the_user_sticky(self):
+        user = get_user_model().objects.create_user(username="sticky", password="secret")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post("/api/seen/", {"registration": "G-EZTH"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(self.routers.STICKY_COOKIE, response.cookies)
+        self.assertTrue(cache.get(self.routers.sticky_cache_key(user.pk)))
+        state = self._state()
+        state.request.user = user
+        with self.routers.routing_state(state):
+            self.assertEqual(self.router.db_for_read(UserSeen), "default")
+
+
+class ConnectionLifecycleTests(TestCase):
+    databases = {"default", "replica"}
+
+    def test_persistent_connections_enable_health_checks(self):
+        from backend.db import postgres_database, sqlite_database
+
+        persistent = sqlite_database("/tmp/app.sqlite3", conn_max_age=300)
+        self.assertEqual(persistent["CONN_MAX_AGE"], 300)
+        self.assertTrue(persistent["CONN_HEALTH_CHECKS"])
+        self.assertFalse(sqlite_database("/tmp/app.sqlite3")["CONN_HEALTH_CHECKS"])
+
+        pooled = postgres_database(name="db", user="u", password="", host="h", conn_max_age=300)
+        self.assertEqual(pooled["CONN_MAX_AGE"], 0)
+        self.assertEqual(pooled["OPTIONS"]["pool"]["max_size"], 10)
+        direct = postgres_database(name="db", user="u", password="", host="h", pool=False, conn_max_age=60)
+        self.assertEqual(direct["CONN_MAX_AGE"], 60)
+        self.assertNotIn("pool", direct["OPTIONS"])
+
+    def test_health_endpoint_reports_checks_and_churn(self):
+        from backend import connections as db_connections
+
+        db_connections.reset_stats()
+        response = self.client.get("/api/health/db/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payload = response.json()
+        self.assertTrue(payload["healthy"])
+        self.assertTrue(payload["checks"]["default"]["ok"])
+        self.assertIn("opened", payload["aliases"]["default"])
+        self.assertEqual(payload["aliases"]["default"]["conn_max_age"], 300)
+
+
+@override_settings(REFRESH_SCHEDULER_JITTER=0, AIRCRAFT_FEED_CACHE_JITTER=0)
+class RefreshSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        from .services import scheduler
+
+        self.scheduler = scheduler
+
+    def test_feed_refresh_warms_the_entry_requests_read(self):
+        with mock.patch.object(aircraft_feed, "_open_feed", side_effect=lambda url: io.StringIO(SAMPLE_CSV)):
+            self.assertEqual(aircraft_feed.refresh_live_fleet(), 3)
+        with mock.patch.object(aircraft_feed, "_open_feed", side_effect=AssertionError("request hit the feed")):
+            results = aircraft_feed.fetch_live_fleet(limit=2)
+
+        self.assertEqual([row["registration"] for row in results], ["G-EZTH", "N12345"])
+
+    @override_settings(REFRESH_SCHEDULER_BACKOFF_SECONDS=30, REFRESH_SCHEDULER_MAX_BACKOFF_SECONDS=100)
+    def test_feed_errors_back_off_exponentially(self):
+        job = self.scheduler.RefreshJob(
+            name="flaky",
+            refresh=mock.Mock(side_effect=aircraft_feed.AircraftFeedError("down")),
+            interval=600,
+        )
+        runner = self.scheduler.RefreshScheduler([job])
+
+        delays = [runner.run_job(job) for _ in range(4)]
+
+        self.assertEqual(delays, [(False, 30), (False, 60), (False, 100), (False, 100)])
+        status_report = self.scheduler.status([job])["flaky"]
+        self.assertEqual(status_report["failures"], 4)
+        self.assertEqual(status_report["last_error"], "down")
+
+        job.refresh.side_effect = None
+        job.refresh.return_value = 3
+        self.assertEqual(runner.run_job(job), (True, 600))
+        self.assertEqual(self.scheduler.status([job])["flaky"]["failures"], 0)
+
+    def test_status_endpoint_reports_warm_airport_reference(self):
+        Airport.objects.create(icao="ZZQX", name="Quixote Field", lat=1.0, lon=2.0)
+        jobs = [job for job in self.scheduler.default_jobs() if job.name == "airport-reference"]
+        self.scheduler.RefreshScheduler(jobs).run_pending()
+
+        response = self.client.get("/api/refresh/status/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.json()["jobs"]["airport-reference"]
+        self.assertTrue(report["cached"])
+        self.assertGreater(report["result"], 0)
+        self.assertFalse(response.json()["jobs"]["aircraft-feed"]["cached"])
+
+    def test_airport_changes_invalidate_the_reference(self):
+        from .services import airports
+
+        airports.refresh_airport_reference()
+        with self.captureOnCommitCallbacks(execute=True):
+            Airport.objects.create(icao="ZZQY", name="Quillon Field", lat=1.0, lon=2.0)
+
+        self.assertIsNone(cache.get(airports.AIRPORT_REFERENCE_KEY))
+        self.assertIn("ZZQY", {row["icao"] for row in airports.airport_reference()})
+
+    def test_lifespan_startup_and_shutdown(self):
+        import asyncio
+
+        from backend.lifespan import LifespanApplication
+
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(LifespanApplication(None)({"type": "lifespan"}, receive, send))
+
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+
+
+class RequestInstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        from .services import metrics
+
+        self.metrics = metrics
+        metrics.reset()
+
+    def test_requests_are_measured_per_view(self):
+        response = self.client.get("/api/airports/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        labels = {"view": "airport-list", "method": "GET"}
+        self.assertEqual(self.metrics.value("http_requests_total", {**labels, "status": "200"}), 1)
+        self.assertGreater(self.metrics.histogram("http_request_db_queries", labels)["sum"], 0)
+        self.assertEqual(self.metrics.histogram("http_request_serialization_seconds", labels)["count"], 1)
+        self.assertEqual(self.metrics.histogram("http_response_bytes", labels)["sum"], len(response.content))
+
+    async def test_queries_in_sync_views_are_counted_under_asgi(self):
+        response = await self.async_client.get("/api/airports/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        labels = {"view": "airport-list", "method": "GET"}
+        self.assertGreater(self.metrics.histogram("http_request_db_queries", labels)["sum"], 0)
+
+    def test_cache_hits_and_misses_are_counted_by_prefix(self):
+        cache.get("aircraft-feed:200:")
+        cache.set("aircraft-feed:200:", [])
+        cache.get("aircraft-feed:200:")
+
+        for result in ("hit", "miss"):
+            self.assertEqual(
+                self.metrics.value("cache_requests_total", {"prefix": "aircraft-feed", "result": result}), 1
+            )
+
+    @override_settings(SLOW_REQUEST_SECONDS=0, SLOW_REQUEST_SAMPLE_RATE=1.0)
+    def test_slow_requests_log_their_sql(self):
+        with self.assertLogs("backend.slow_requests", level="WARNING") as logs:
+            self.client.get("/api/airports/")
+
+        self.assertIn("airport-list", logs.output[0])
+        self.assertIn("core_airport", logs.output[0])
+
+    def test_metrics_endpoint_renders_prometheus_text(self):
+        self.client.get("/api/airports/")
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="airport-list"} 1', body)
+        self.assertIn("db_connections_opened_total", body)
+
+    def test_metrics_are_only_served_to_allowed_addresses(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="203.0.113.9").status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=("203.0.113.9",)):
+            self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="203.0.113.9").status_code, 200)
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(6):
+            airport = Airport.objects.create(icao=f"ZQ{index:02d}", name=f"Budget Field {index}", lat=0, lon=0)
+            SpottingLocation.objects.create(airport=airport, title="Fence", lat=0, lon=0)
+        cls.user = get_user_model().objects.create_user(username="budget", password="secret")
+        for aircraft in Aircraft.objects.all()[:6]:
+            UserSeen.objects.create(user=cls.user, aircraft=aircraft)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_endpoints_stay_within_budget(self):
+        # The test runner raises on violations, so these would error if over.
+        for path in ("/api/airports/", "/api/seen/", "/api/posts/", "/api/spots/"):
+            self.assertEqual(self.client.get(path).status_code, status.HTTP_200_OK, path)
+
+    def test_dropped_prefetch_is_caught(self):
+        from backend.query_budget import QueryBudgetExceeded
+
+        from .views import AirportViewSet
+
+        with mock.patch.object(AirportViewSet, "queryset", Airport.objects.order_by("icao")):
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                self.client.get("/api/airports/")
+
+        self.assertIn("AirportViewSet.list ran", str(raised.exception))
+        self.assertIn("Repeated", str(raised.exception))
+
+    async def test_budgets_are_enforced_under_asgi(self):
+        from backend.query_budget import QueryBudgetExceeded
+
+        from .views import AirportViewSet
+
+        with mock.patch.object(AirportViewSet, "queryset", Airport.objects.order_by("icao")):
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                await self.async_client.get("/api/airports/")
+
+        self.assertIn("AirportViewSet.list ran", str(raised.exception))
+
+    def test_log_mode_reports_violations_with_a_stack_sample(self):
+        from .views import AirportViewSet
+
+        with override_settings(QUERY_BUDGET_MODE="log"), mock.patch.object(
+            AirportViewSet, "queryset", Airport.objects.order_by("icao")
+        ):
+            with self.assertLogs("backend.query_budget", level="WARNING") as logs:
+                response = self.client.get("/api/airports/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("rest_framework/serializers.py", logs.output[0])
+
+
+class RenderingAndCompressionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_fast_renderer_matches_drf_output(self):
+        import datetime
+        import decimal
+
+        from rest_framework.renderers import JSONRenderer
+
+        from backend.renderers import FastJSONRenderer
+
+        payload = {
+            "name": "Zürich Kloten",
+            "seen_at": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            "price": decimal.Decimal("1.50"),
+            1: [51.4775, None, True],
+            "huge": 2 ** 70,
+        }
+
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        self.assertEqual(
+            FastJSONRenderer().render(payload, "application/json; indent=2"),
+            JSONRenderer().render(payload, "application/json; indent=2"),
+        )
+
+    def test_fast_renderer_writes_non_finite_floats_as_null(self):
+        from backend.renderers import FastJSONRenderer, orjson
+
+        if orjson is None:
+            self.skipTest("orjson is not installed")
+        self.assertEqual(
+            FastJSONRenderer().render({"alt": float("nan"), "eta": float("inf")}), b'{"alt":null,"eta":null}'
+        )
+
+    def test_accept_encoding_negotiation(self):
+        from backend import compression
+
+        self.assertEqual(compression.negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(compression.negotiate("*;q=0.5"), "gzip")
+        self.assertIsNone(compression.negotiate("gzip;q=0, identity"))
+        self.assertIsNone(compression.negotiate(""))
+        with mock.patch.object(compression, "brotli", mock.Mock()):
+            self.assertEqual(compression.negotiate("gzip, br"), "br")
+            self.assertEqual(compression.negotiate("gzip, br;q=0.5"), "gzip")
+
+    @override_settings(COMPRESSION_MIN_BYTES=200)
+    def test_large_responses_are_gzipped_and_cached(self):
+        import gzip
+
+        from backend import compression
+
+        for index in range(10):
+            Airport.objects.create(icao=f"ZQ{index:02d}", name=f"Compression Field {index}", lat=51.0, lon=-1.0)
+
+        plain = self.client.get("/api/airports/")
+        with mock.patch("backend.compression.compress", wraps=compression.compress) as compress:
+            first = self.client.get("/api/airports/", HTTP_ACCEPT_ENCODING="gzip")
+            second = self.client.get("/api/airports/", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        self.assertEqual(first["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(first.content), plain.content)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(compress.call_count, 1)
+
+    @override_settings(COMPRESSION_MIN_BYTES=10_000_000)
+    def test_small_responses_are_left_alone(self):
+        response = self.client.get("/api/airports/", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+
+class MessagePackRenderingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_packb_uses_the_smallest_encodings(self):
+        from backend.renderers import packb
+
+        self.assertEqual(packb({"a": 1}), b"\x81\xa1a\x01")
+        self.assertEqual(packb([None, True, -1, 200, 1.5]), b"\x95\xc0\xc3\xff\xcc\xc8\xcb?\xf8\x00\x00\x00\x00\x00\x00")
+        self.assertEqual(packb("x" * 40)[:2], b"\xd9\x28")
+        self.assertEqual(packb(list(range(20)))[:3], b"\xdc\x00\x14")
+
+    def test_viewsets_negotiate_msgpack(self):
+        from backend.renderers import packb
+
+        Airport.objects.create(icao="ZQMP", name="Msgpack Field", lat=51.0, lon=-1.0)
+
+        json_response = self.client.get("/api/airports/")
+        binary = self.client.get("/api/airports/", HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(binary["Content-Type"], "application/msgpack")
+        self.assertEqual(binary.content, packb(json_response.json()))
+        self.assertLess(len(binary.content), len(json_response.content))
+
+    async def test_async_live_fleet_negotiates_msgpack(self):
+        from backend.renderers import packb
+
+        with mock.patch.object(aircraft_feed, "_open_feed", side_effect=lambda url: io.StringIO(SAMPLE_CSV)):
+            plain = await self.async_client.get("/api/fleet/live/?registration=c-f", headers={"Accept": "*/*"})
+            binary = await self.async_client.get(
+                "/api/fleet/live/?registration=c-f", headers={"Accept": "application/msgpack"}
+            )
+
+        self.assertEqual(plain["Content-Type"], "application/json")
+        self.assertEqual(binary["Content-Type"], "application/msgpack")
+        self.assertEqual(binary.content, packb(plain.json()))
+        with mock.patch.object(aircraft_feed, "_open_feed", side_effect=lambda url: io.StringIO(SAMPLE_CSV)):
+            override = await self.async_client.get("/api/fleet/live/?registration=c-f&format=msgpack")
+        self.assertEqual(override["Content-Type"], "application/msgpack")
+
+    def test_feed_clients_are_only_pooled_on_lifespan_loops(self):
+        import asyncio
+
+        from .services import async_feed
+
+        class FakeClient:
+            opened = []
+
+            def __init__(self):
+                self.closed = False
+                FakeClient.opened.append(self)
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                await self.aclose()
+
+            async def aclose(self):
+                self.closed = True
+
+        async def use_client():
+            async with async_feed._client() as client:
+                return client
+
+        async def pooled():
+            async_feed.enable_pooling()
+            first, second = await use_client(), await use_client()
+            await async_feed.aclose_clients()
+            return first, second
+
+        with mock.patch.object(async_feed, "_new_client", FakeClient):
+            # WSGI: async_to_sync runs every request on a loop of its own.
+            per_request = [asyncio.run(use_client()) for _ in range(2)]
+            first, second = asyncio.run(pooled())
+
+        self.assertIsNot(per_request[0], per_request[1])
+        self.assertTrue(all(client.closed for client in per_request))
+        self.assertIs(first, second)
+        self.assertTrue(first.closed)
+
+
+class LiveFleetStreamingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        from .services import async_feed
+
+        patcher = mock.patch.object(async_feed, "httpx", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _opener(self):
+        return mock.patch.object(aircraft_feed, "_open_feed", side_effect=lambda url: io.StringIO(SAMPLE_CSV))
+
+    def test_unlimited_request_streams_the_json_document(self):
+        with self._opener() as opener:
+            response = self.client.get("/api/fleet/live/sync/?limit=0")
+            body = b"".join(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+        payload = json.loads(body)
+        self.assertEqual(payload["count"], len(payload["results"]))
+        self.assertEqual(payload["filters"], {"registration": None, "country": None})
+        self.assertIn("C-FGHI", {row["registration"] for row in payload["results"]})
+        self.assertEqual(opener.call_count, 1)
+
+    def test_ndjson_is_streamed_one_record_per_line(self):
+        with self._opener():
+            response = self.client.get(
+                "/api/fleet/live/sync/?country=canada", HTTP_ACCEPT="application/x-ndjson"
+            )
+            lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([json.loads(line)["registration"] for line in lines], ["C-FGHI"])
+
+    def test_capped_json_requests_are_not_streamed(self):
+        with self._opener():
+            response = self.client.get("/api/fleet/live/sync/?limit=1")
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_chunks_are_bounded_and_the_first_record_is_sent_at_once(self):
+        from .services import feed_stream
+
+        records = ({"registration": f"G-{index:04d}", "padding": "x" * 100} for index in range(2000))
+        with mock.patch.object(feed_stream, "CHUNK_BYTES", 4096):
+            response = feed_stream.streaming_response(
+                feed_stream.JSON, records, {"registration": None, "country": None}
+            )
+            chunks = list(response.streaming_content)
+
+        self.assertLess(len(chunks[1]), 200)
+        self.assertLess(max(len(chunk) for chunk in chunks), 4096 + 200)
+        self.assertEqual(json.loads(b"".join(chunks))["count"], 2000)
+
+    async def test_async_view_streams_and_falls_back(self):
+        opener = mock.Mock(side_effect=aircraft_feed.AircraftFeedError("down"))
+        with mock.patch.object(aircraft_feed, "_open_feed", opener):
+            response = await self.async_client.get("/api/fleet/live/?limit=0")
+            body = b"".join([chunk async for chunk in response.streaming_content])
+
+        payload = json.loads(body)
+        self.assertIn("G-EZTH", {row["registration"] for row in payload["results"]})
+        self.assertEqual(payload["count"], len(payload["results"]))
+
+
+    def _unavailable(self):
+        down = aircraft_feed.AircraftFeedError("down")
+        return (
+            mock.patch.object(aircraft_feed, "_open_feed", side_effect=down),
+            mock.patch.object(aircraft_feed, "open_fallback", side_effect=down),
+        )
+
+    def test_unreachable_feed_and_fallback_answer_503(self):
+        upstream, fallback = self._unavailable()
+        with upstream, fallback:
+            response = self.client.get("/api/fleet/live/sync/?limit=0")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.streaming)
+
+    async def test_async_unreachable_feed_and_fallback_answer_503(self):
+        upstream, fallback = self._unavailable()
+        with upstream, fallback:
+            response = await self.async_client.get("/api/fleet/live/?limit=0")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["detail"], "down")
+
+    def test_filtered_streams_open_the_feed_without_reading_rows(self):
+        from .services import feed_stream
+
+        handle = io.StringIO(SAMPLE_CSV)
+        with mock.patch.object(aircraft_feed, "_open_feed", return_value=handle):
+            records = feed_stream.open_records(aircraft_feed.FeedQuery.build(country="nowhere", limit=0), "http://feed")
+            self.assertEqual(handle.tell(), 0)
+            self.assertEqual(list(records), [])
+
+        self.assertTrue(handle.closed)
+
+class LogbookTransferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username="logbook-mover", password="supersecret")
+        self.client.force_authenticate(self.user)
+        self.fleet = [Aircraft.objects.create(registration=f"ZQ-LB{index}") for index in range(5)]
+        self.airport = Airport.objects.create(icao="ZQLB", name="Logbook Field", lat=51.0, lon=-1.0)
+
+    def _upload(self, name, text):
+        return SimpleUploadedFile(name, text.encode("utf-8"))
+
+    def test_export_streams_csv_and_ndjson(self):
+        UserSeen.objects.create(user=self.user, aircraft=self.fleet[0], airport=self.airport)
+        UserSeen.objects.create(user=self.user, aircraft=self.fleet[1])
+
+        csv_response = self.client.get("/api/seen/export/")
+        ndjson_response = self.client.get("/api/seen/export/", HTTP_ACCEPT="application/x-ndjson")
+
+        self.assertTrue(csv_response.streaming)
+        self.assertEqual(csv_response["Content-Type"], "text/csv")
+        self.assertIn("logbook.csv", csv_response["Content-Disposition"])
+        lines = b"".join(csv_response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "registration,type,airline,country,airport,seen_at")
+        self.assertTrue(lines[1].startswith("ZQ-LB0,,,,ZQLB,"))
+        records = [json.loads(line) for line in b"".join(ndjson_response.streaming_content).splitlines()]
+        self.assertEqual([record["registration"] for record in records], ["ZQ-LB0", "ZQ-LB1"])
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        from asgiref.sync import sync_to_async
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        for aircraft in self.fleet[:3]:
+            await UserSeen.objects.acreate(user=self.user, aircraft=aircraft)
+        token = await sync_to_async(AccessToken.for_user)(self.user)
+
+        response = await self.async_client.get(
+            "/api/seen/export/", headers={"Authorization": f"Bearer {token}", "Accept": "application/x-ndjson"}
+        )
+
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 3)
+
+    @override_settings(LOGBOOK_IMPORT_BATCH_SIZE=2)
+    def test_csv_import_resolves_batches_and_skips_duplicates(self):
+        UserSeen.objects.create(user=self.user, aircraft=self.fleet[0])
+        text = (
+            "Reg,Airport,Date\n"
+            "zq-lb0,ZQLB,2023-04-01\n"
+            "ZQ-LB1,ZQLB,2023-04-02T10:15:00Z\n"
+            "ZQ-LB2,,\n"
+            "ZQ-NOPE,,\n"
+            "ZQ-LB3,,not a date\n"
+            "ZQ-LB2,,\n"
+        )
+
+        response = self.client.post("/api/seen/import/", {"file": self._upload("old.csv", text)}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["processed"], 6)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["duplicates"], 2)
+        self.assertEqual(response.data["unknown_registrations"], 1)
+        self.assertEqual(response.data["invalid"], 1)
+        self.assertEqual({error["line"] for error in response.data["errors"]}, {5, 6})
+        imported = UserSeen.objects.get(user=self.user, aircraft=self.fleet[1])
+        self.assertEqual(imported.airport, self.airport)
+        self.assertEqual(imported.seen_at.year, 2023)
+        progress = self.client.get("/api/seen/import/")
+        self.assertEqual(progress.data["state"], "finished")
+
+    def test_sightings_logged_during_an_import_count_as_duplicates(self):
+        insert = logbook._Import.insert
+
+        def racing_insert(job, pending):
+            # Another request logs ZQ-LB1 after the batch checked the logbook.
+            UserSeen.objects.create(user=self.user, aircraft=self.fleet[1])
+            insert(job, pending)
+
+        with mock.patch.object(logbook._Import, "insert", racing_insert):
+            summary = logbook.import_logbook(self.user, self._upload("race.csv", "Reg\nZQ-LB0\nZQ-LB1\nZQ-LB2\n"))
+
+        self.assertEqual((summary["created"], summary["duplicates"]), (2, 1))
+        self.assertEqual(UserSeen.objects.filter(user=self.user).count(), 3)
+
+    def test_ndjson_import_round_trips_an_export(self):
+        UserSeen.objects.create(user=self.user, aircraft=self.fleet[3], airport=self.airport)
+        exported = b"".join(
+            self.client.get("/api/seen/export/", HTTP_ACCEPT="application/x-ndjson").streaming_content
+        )
+        other = get_user_model().objects.create_user(username="logbook-receiver", password="supersecret")
+        self.client.force_authenticate(other)
+
+        response = self.client.post(
+            "/api/seen/import/", {"file": self._upload("logbook.ndjson", exported.decode())}, format="multipart"
+        )
+
+        self.assertEqual(response.data["created"], 1)
+        copied = UserSeen.objects.get(user=other)
+        original = UserSeen.objects.get(user=self.user)
+        self.assertEqual((copied.aircraft_id, copied.airport_id), (original.aircraft_id, original.airport_id))
+        self.assertEqual(copied.seen_at, original.seen_at)
+
+    def test_import_rejects_files_without_registrations(self):
+        response = self.client.post(
+            "/api/seen/import/", {"file": self._upload("bad.csv", "name,date\nx,y\n")}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AircraftDimensionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Aircraft.objects.create(registration="ZQ-DA1", type="Airbus A320-251N", airline="ZQ Dimensions", country="UK")
+        Aircraft.objects.create(registration="ZQ-DA2", type="Airbus A320-214", airline="ZQ Dimensions", country="UK")
+        Aircraft.objects.create(registration="ZQ-DA3", type="Airbus A321neo", airline="ZQ Other", country="UK")
+
+    def test_type_family_groups_variants(self):
+        self.assertEqual(type_family("", "A21N"), "A320neo")
+        self.assertEqual(type_family("Airbus A321-251NX"), "A320neo")
+        self.assertEqual(type_family("Airbus A320-214"), "A320")
+        self.assertEqual(type_family("737-8H4", "B738"), "737NG")
+        self.assertEqual(type_family("Boeing 737 MAX 8"), "737 MAX")
+        self.assertEqual(type_family("Cessna 172", "C172"), "C172")
+
+    def test_api_keeps_string_fields(self):
+        response = self.client.get("/api/aircraft/?operator=ZQ+Dimensions")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.json()
+        rows = rows.get("results", rows) if isinstance(rows, dict) else rows
+        self.assertEqual(
+            rows[0],
+            {
+                "id": rows[0]["id"],
+                "registration": "ZQ-DA1",
+                "type": "Airbus A320-251N",
+                "airline": "ZQ Dimensions",
+                "country": "UK",
+            },
+        )
+        self.assertEqual([row["registration"] for row in rows], ["ZQ-DA1", "ZQ-DA2"])
+
+    def test_filter_by_family(self):
+        response = self.client.get("/api/aircraft/?family=A320neo")
+
+        rows = response.json()
+        rows = rows.get("results", rows) if isinstance(rows, dict) else rows
+        registrations = [row["registration"] for row in rows]
+        self.assertEqual([reg for reg in registrations if reg.startswith("ZQ-")], ["ZQ-DA1", "ZQ-DA3"])
+        self.assertIn("G-TTNA", registrations)  # seeded A320-251N
+        self.assertNotIn("G-EZTH", registrations)  # seeded A320-214
+
+    def test_write_through_api_interns_names(self):
+        response = self.client.post(
+            "/api/aircraft/",
+            {"registration": "ZQ-DA4", "type": "Airbus A320-214", "airline": "ZQ Dimensions"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["airline"], "ZQ Dimensions")
+        self.assertEqual(AircraftType.objects.filter(name="Airbus A320-214").count(), 1)
+        self.assertEqual(Operator.objects.get(name="ZQ Dimensions").aircraft.count(), 3)
+
+
+class OurAirportsImportTests(TestCase):
+    AIRPORTS_CSV = (
+        "id,ident,type,name,latitude_deg,longitude_deg,iso_country,municipality,gps_code,iata_code\n"
+        "1,EGLL,large_airport,London Heathrow Airport,51.4706,-0.461941,GB,London,EGLL,LHR\n"
+        "2,ZQAA,small_airport,Zephyrquay Field,52.5,-1.5,GB,Zephyrquay,ZQAA,\n"
+        "3,ZQAA,small_airport,Duplicate Field,10,10,GB,,ZQAA,\n"
+        "4,GB-0042,small_airport,Quokka Strip,52.7,-1.2,GB,Quokkaton,ZQAB,\n"
+        "5,US-1234,small_airport,No Code Strip,40,-100,US,,,\n"
+        "6,ZQAC,closed,Closed Field,52,-1,GB,,ZQAC,\n"
+        "7,ZQAD,small_airport,Bad Coordinates,,-1,GB,,ZQAD,\n"
+    )
+    FREQUENCIES_CSV = (
+        "id,airport_ref,airport_ident,type,description,frequency_mhz\n"
+        "1,2,ZQAA,TWR,Zephyrquay Tower,118.275\n"
+        "2,4,GB-0042,A/G,Quokka Radio,129.825\n"
+        "3,2,ZQAA,ATIS,,bad\n"
+        "4,5,US-1234,CTAF,,122.8\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.airports_path = self._write("airports.csv.gz", self.AIRPORTS_CSV, gzip.compress)
+        self.frequencies_path = self._write("airport-frequencies.csv", self.FREQUENCIES_CSV)
+
+    def _write(self, name, text, compress=lambda data: data):
+        path = f"{self.workdir}/{name}"
+        with open(path, "wb") as handle:
+            handle.write(compress(text.encode("utf-8")))
+        return path
+
+    def _import(self):
+        return airport_import.import_ourairports(
+            self.airports_path, frequencies_path=self.frequencies_path, batch_size=2
+        )
+
+    def test_import_upserts_airports_and_replaces_frequencies(self):
+        heathrow = Airport.objects.get(icao="EGLL")
+        airports.airport_reference()
+
+        summary = self._import()
+        summary = self._import()
+
+        self.assertEqual(summary["airports"], 3)
+        self.assertEqual(summary["skipped_airports"], 4)
+        self.assertEqual((summary["frequencies"], summary["skipped_frequencies"]), (2, 2))
+        heathrow.refresh_from_db()
+        self.assertEqual((heathrow.name, heathrow.iata, heathrow.country), ("London Heathrow Airport", "LHR", "GB"))
+        quokka = Airport.objects.get(icao="ZQAB")
+        self.assertEqual(quokka.spatial_cell, spatial_cell(52.7, -1.2))
+        self.assertEqual(
+            list(Frequency.objects.filter(airport__icao__in=["ZQAA", "ZQAB"]).values_list("service", "mhz")),
+            [("Tower", Decimal("118.275")), ("Air/Ground", Decimal("129.825"))],
+        )
+        self.assertFalse(Airport.objects.filter(icao__in=["ZQAC", "ZQAD"]).exists())
+        self.assertIn("ZQAB", {row["icao"] for row in airports.airport_reference()})
+        self.assertEqual([hit["id"] for hit in search.search("quokka", kinds=["airport"])], [quokka.id])
+
+    def test_command_reports_counts(self):
+        out = io.StringIO()
+        call_command("import_ourairports", self.airports_path, "--type", "closed", stdout=out)
+
+        self.assertIn("Imported 1 airports and 0 frequencies", out.getvalue())
+        self.assertTrue(Airport.objects.filter(icao="ZQAC").exists())
+
+    def test_nearest_airports(self):
+        self._import()
+
+        response = APIClient().get("/api/airports/nearest/", {"lat": 52.6, "lon": -1.3, "limit": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["icao"] for row in response.data["results"]], ["ZQAB", "ZQAA"])
+        self.assertLess(response.data["results"][0]["distance_km"], 15)
+        far = airports.nearest_airports(-80, 170, limit=1)
+        self.assertEqual(len(far), 1)
+        self.assertEqual(
+            APIClient().get("/api/airports/nearest/", {"lat": 95, "lon": 0}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_nearest_airports_far_from_any_stay_within_budget(self):
+        # The test runner raises if either lookup breaks the action's budget.
+        self._import()
+        client = APIClient()
+
+        remote = client.get("/api/airports/nearest/", {"lat": 0, "lon": 0, "limit": 5})
+        self.assertEqual(remote.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(remote.data["results"]), 5)
+        everything = client.get("/api/airports/nearest/", {"lat": 51.5, "lon": -0.1, "limit": 50})
+        self.assertLess(Airport.objects.count(), 50)
+        self.assertEqual(len(everything.data["results"]), Airport.objects.count())
+        distances = [row["distance_km"] for row in everything.data["results"]]
+        self.assertEqual(distances, sorted(distances))
+
+
+class AirportAutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        airport_autocomplete.invalidate()
+        self.addCleanup(airport_autocomplete.invalidate)
+        self.client = APIClient()
+        self.quay = Airport.objects.create(icao="ZQAA", name="Zephyrquay Field", city="Zephyr", lat=52, lon=-1)
+        self.busy = Airport.objects.create(
+            icao="ZQAB", iata="ZQB", name="Zephyr International", city="Quokkaton", lat=52, lon=-2
+        )
+        for title in ("Fence", "Mound", "Car park"):
+            SpottingLocation.objects.create(airport=self.quay, title=title, description="", lat=52, lon=-1)
+
+    def _icaos(self, query, **params):
+        response = self.client.get("/api/airports/autocomplete/", {"q": query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["icao"] for row in response.data["results"]]
+
+    def test_prefixes_of_codes_names_and_cities_ranked_by_popularity(self):
+        self.assertEqual(self._icaos("zeph"), ["ZQAA", "ZQAB"])
+        self.assertEqual(self._icaos("quok"), ["ZQAB"])
+        self.assertEqual(self._icaos("zqb"), ["ZQAB"])
+        self.assertEqual(self._icaos("ZEPH int"), ["ZQAB"])
+        self.assertEqual(self._icaos("heathrow")[0], "EGLL")
+        # An empty query browses every airport by popularity.
+        self.assertEqual(len(self._icaos("", limit=50)), min(50, Airport.objects.count()))
+        self.assertEqual(self._icaos("zq", limit=1), ["ZQAA"])
+        # A full code beats popularity.
+        self.assertEqual(self._icaos("zqab", limit=1), ["ZQAB"])
+        response = self.client.get("/api/airports/autocomplete/", {"q": "zq", "limit": "lots"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_country_filter_and_directory(self):
+        Airport.objects.create(icao="ZQFA", name="Zephyr Nord", city="Lille", country="France", lat=50, lon=3)
+        self.busy.country = "France"
+        self.busy.save()
+
+        self.assertEqual(self._icaos("zeph", country="france"), ["ZQAB", "ZQFA"])
+        self.assertEqual(self._icaos("", country="France"), ["ZQAB", "ZQFA"])
+        # An exact code outside the country is not forced in.
+        self.assertEqual(self._icaos("zqaa", country="France"), [])
+        directory = self.client.get("/api/airports/directory/").data
+        self.assertEqual(directory["airports"], Airport.objects.count())
+        self.assertIn("France", directory["countries"])
+        self.assertEqual(directory["countries"], sorted(directory["countries"]))
+
+    def test_index_follows_saves_and_deletes_without_rebuilding(self):
+        self.assertEqual(self._icaos("zeph"), ["ZQAA", "ZQAB"])
+        stamp = cache.get(airport_autocomplete.VERSION_KEY)
+
+        with mock.patch.object(airport_autocomplete, "build_index", side_effect=AssertionError("rebuilt")):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.busy.name = "Wombat Regional"
+                self.busy.save()
+                Airport.objects.create(icao="ZQAC", name="Zephyr Heights", lat=53, lon=-1)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.quay.delete()
+
+            self.assertEqual(self._icaos("zeph"), ["ZQAC"])
+            self.assertEqual(self._icaos("wom"), ["ZQAB"])
+
+        self.assertNotEqual(cache.get(airport_autocomplete.VERSION_KEY), stamp)
+
+    def test_dense_prefixes_match_a_full_scan(self):
+        rows = [
+            {"id": number, "icao": f"Z{number:03d}", "iata": "ZQA" if number % 7 == 0 else "",
+             "name": f"Field {number}", "city": f"Town {number % 9}"}
+            for number in range(1, 601)
+        ]
+        index = airport_autocomplete.AirportIndex(rows, popularity={5: 100, 42: 50})
+        index.add({**rows[41], "name": "Renamed Strip"})
+        index.remove(7)
+        index.add({"id": 700, "icao": "Z700", "iata": "", "name": "Field Extra", "city": "Town 3"})
+
+        def scan(query, limit=10):
+            terms = airport_autocomplete.split_words(query)
+            matches = [
+                airport_id
+                for airport_id, words in index.words.items()
+                if all(any(word.startswith(term) for word in words) for term in terms)
+            ]
+            return sorted(matches, key=index.ranks.__getitem__)[:limit]
+
+        self.assertIn("f", index.ranked)
+        for query in ["f", "field", "town 3", "z", "field 4", "re"]:
+            self.assertEqual([row["id"] for row in index.search(query)], scan(query), query)
+        self.assertEqual(index.search("field")[0]["id"], 5)
+
+
+def _state_vector(icao24, lat, lon, speed, track, *, on_ground=False, altitude=600.0):
+    return [icao24, f"{icao24.upper()}  ", "United Kingdom", 0, 0, lon, lat, altitude, on_ground, speed, track,
+            0, None, altitude, None, False, 0]
+
+
+class SpotTrafficTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        airport = Airport.objects.get(icao="EGLL")
+        self.spot = SpottingLocation.objects.create(
+            airport=airport, title="ZQ Myrtle Avenue", description="", lat=51.47, lon=-0.45
+        )
+        self.far_spot = SpottingLocation.objects.create(
+            airport=airport, title="ZQ Far Field", description="", lat=53.0, lon=-2.0
+        )
+        self.payload = {
+            "time": 1700000000,
+            "states": [
+                # ~3.5 km west of the spot, flying east straight over it at 70 m/s.
+                _state_vector("zq0001", 51.47, -0.5, 70.0, 90.0),
+                # 2 km north and climbing away: overhead now.
+                _state_vector("zq0002", 51.488, -0.45, 80.0, 0.0),
+                # Passes 10 km south of the spot.
+                _state_vector("zq0003", 51.38, -0.6, 70.0, 90.0),
+                _state_vector("zq0004", 51.47, -0.46, 0.0, 90.0, on_ground=True),
+                _state_vector("zq0005", 51.47, -0.46, None, 90.0),
+                # ~100 km south of the far spot heading north at 200 m/s.
+                _state_vector("zq0006", 52.1, -2.0, 200.0, 0.0),
+            ],
+        }
+
+    def _states(self):
+        return spot_traffic.StateVectors.from_opensky(self.payload)
+
+    def test_incoming_is_computed_once_per_poll_for_every_spot(self):
+        with mock.patch.object(spot_traffic, "fetch_state_vectors", return_value=self._states()) as fetch:
+            response = self.client.get(f"/api/spots/{self.spot.id}/incoming/")
+            far = self.client.get(f"/api/spots/{self.far_spot.id}/incoming/")
+
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([row["id"] for row in results], ["ZQ0002", "ZQ0001"])
+        self.assertEqual(results[0]["eta_seconds"], 0)
+        self.assertAlmostEqual(results[1]["eta_seconds"], 49, delta=1)
+        self.assertLess(results[1]["closest_km"], 0.1)
+        self.assertAlmostEqual(results[1]["distance_km"], 3.46, delta=0.05)
+        self.assertEqual((results[1]["callsign"], results[1]["alt"], results[1]["speed"]), ("ZQ0001", 1969, 136))
+        self.assertEqual([row["id"] for row in far.data["results"]], ["ZQ0006"])
+        self.assertAlmostEqual(far.data["results"][0]["eta_seconds"], 500, delta=5)
+
+    def test_unavailable_feed_without_cached_traffic(self):
+        with mock.patch.object(
+            spot_traffic, "fetch_state_vectors", side_effect=spot_traffic.LiveTrafficError("timed out")
+        ):
+            response = self.client.get(f"/api/spots/{self.spot.id}/incoming/")
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(self.client.get("/api/spots/999999/incoming/").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_numpy_answers_503(self):
+        fetch = mock.Mock()
+        with mock.patch.object(spot_traffic, "np", None), mock.patch.object(spot_traffic, "fetch_state_vectors", fetch):
+            response = self.client.get(f"/api/spots/{self.spot.id}/incoming/")
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("NumPy", response.data["detail"])
+        fetch.assert_not_called()
+
+    def test_vectorised_approaches_match_a_pointwise_calculation(self):
+        rng = np.random.default_rng(7)
+        self.payload["states"] = [
+            _state_vector(f"zq{index:04d}", *rng.uniform([50, -3], [54, 1]), rng.uniform(0, 250), rng.uniform(0, 360))
+            for index in range(300)
+        ]
+        states = self._states()
+        spot_lat, spot_lon = rng.uniform(51, 53, 40), rng.uniform(-2, 0, 40)
+
+        with mock.patch.object(spot_traffic, "SPOT_BLOCK", 7):
+            approaches = spot_traffic.closest_approaches(states, spot_lat, spot_lon, horizon=600, radius_km=8)
+
+        expected = set()
+        for spot in range(len(spot_lat)):
+            scale = geo.KM_PER_DEGREE * math.cos(math.radians(spot_lat[spot]))
+            for aircraft in range(len(states)):
+                east = (states.lon[aircraft] - spot_lon[spot]) * scale
+                north = (states.lat[aircraft] - spot_lat[spot]) * geo.KM_PER_DEGREE
+                track = math.radians(states.heading[aircraft])
+                ve = states.speed_ms[aircraft] / 1000 * math.sin(track)
+                vn = states.speed_ms[aircraft] / 1000 * math.cos(track)
+                eta = min(max(-(east * ve + north * vn) / (ve * ve + vn * vn), 0), 600)
+                if math.hypot(east + ve * eta, north + vn * eta) <= 8:
+                    expected.add((spot, aircraft))
+        self.assertTrue(expected)
+        self.assertEqual(set(zip(approaches.spot.tolist(), approaches.aircraft.tolist())), expected)
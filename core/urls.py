@@ -1,14 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import (AirportViewSet, FrequencyViewSet, SpottingLocationViewSet, PhotoViewSet,
+from .views import (AirportViewSet, FrequencyViewSet, SpottingLocationViewSet, PhotoViewSet, PhotoUploadViewSet,
                     AircraftViewSet, UserSeenViewSet, PostViewSet, CommentViewSet,
-                    BadgeViewSet, UserBadgeViewSet, LiveFleetView)
+                    BadgeViewSet, UserBadgeViewSet, LiveFleetView, AsyncLiveFleetView, RefreshStatusView, SearchView)
 
 router = DefaultRouter()
 router.register(r"airports", AirportViewSet)
 router.register(r"frequencies", FrequencyViewSet)
 router.register(r"spots", SpottingLocationViewSet)
 router.register(r"photos", PhotoViewSet)
+router.register(r"photo-uploads", PhotoUploadViewSet, basename="photo-upload")
 router.register(r"aircraft", AircraftViewSet)
 router.register(r"seen", UserSeenViewSet)
 router.register(r"posts", PostViewSet)
@@ -18,6 +19,10 @@ router.register(r"userbadges", UserBadgeViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
-    path("fleet/live/", LiveFleetView.as_view(), name="live-fleet"),
+    path("fleet/live/", AsyncLiveFleetView.as_view(), name="live-fleet"),
+    # Thread-per-request variant for WSGI deployments.
+    path("fleet/live/sync/", LiveFleetView.as_view(), name="live-fleet-sync"),
+    path("search/", SearchView.as_view(), name="search"),
+    path("refresh/status/", RefreshStatusView.as_view(), name="refresh-status"),
 ]
 
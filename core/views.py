@@ -1,12 +1,26 @@
-from rest_framework import viewsets, permissions, status
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import mixins, parsers, viewsets, permissions, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from .models import Airport, Frequency, SpottingLocation, Photo, Aircraft, UserSeen, Post, Comment, Badge, UserBadge
+from backend.renderers import CSVRenderer, MessagePackRenderer, NDJSONRenderer, packb, render_json
+
+from .models import (Airport, Frequency, SpottingLocation, Photo, PhotoUpload, Aircraft, UserSeen, Post, Comment,
+                     Badge, UserBadge)
 from .serializers import (AirportSerializer, FrequencySerializer, SpottingLocationSerializer, PhotoSerializer,
-                          AircraftSerializer, UserSeenSerializer, PostSerializer, CommentSerializer,
-                          BadgeSerializer, UserBadgeSerializer)
-from .services.aircraft_feed import AircraftFeedError, fetch_live_fleet
+                          PhotoUploadSerializer,
+                          AircraftSerializer, UserSeenSerializer, PostSerializer, PostDetailSerializer,
+                          CommentSerializer, BadgeSerializer, UserBadgeSerializer)
+from .pagination import CommentCursorPagination, ForumCursorPagination
+from .services import (airport_autocomplete, airports, async_feed, feed_stream, logbook, photo_uploads, scheduler,
+                       search, spot_traffic)
+from .services.aircraft_feed import AircraftFeedError, FeedQuery, fetch_live_fleet
 
 class AirportViewSet(viewsets.ModelViewSet):
     """Expose airports with their related frequencies and spotting locations."""
@@ -18,6 +32,51 @@ class AirportViewSet(viewsets.ModelViewSet):
     )
     serializer_class = AirportSerializer
     permission_classes = [permissions.AllowAny]
+    # One query for airports plus one per prefetch, and one for token auth.
+    # A nearest lookup reads the grid twice at most, then the whole table;
+    # autocomplete and directory only query when they rebuild the index.
+    query_budgets = {"list": 5, "retrieve": 5, "nearest": 4, "autocomplete": 4, "directory": 4}
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        """``?q=[&limit=&country=]``: the most popular airports matching a partial code, name or city.
+
+        Without ``q`` it lists the most popular airports.
+        """
+
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            return Response({"detail": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= airport_autocomplete.MAX_LIMIT:
+            return Response({"detail": "limit is out of range."}, status=status.HTTP_400_BAD_REQUEST)
+        query = request.query_params.get("q", "")
+        country = request.query_params.get("country")
+        return Response({"results": airport_autocomplete.autocomplete(query, limit, country)})
+
+    @action(detail=False, methods=["get"])
+    def directory(self, request):
+        """How many airports, countries and cities are listed, with the country names."""
+
+        return Response(airport_autocomplete.directory_summary())
+
+    @action(detail=False, methods=["get"])
+    def nearest(self, request):
+        """``?lat=&lon=[&limit=]``: the closest airports with their distance in km."""
+
+        params = request.query_params
+        try:
+            lat = float(params["lat"])
+            lon = float(params["lon"])
+            limit = int(params.get("limit", 5))
+        except (KeyError, ValueError):
+            return Response({"detail": "lat and lon are required numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or not 1 <= limit <= 50:
+            return Response(
+                {"detail": "lat, lon or limit is out of range."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"results": airports.nearest_airports(lat, lon, limit=limit)})
+
 
 class FrequencyViewSet(viewsets.ModelViewSet):
     queryset = Frequency.objects.all()
@@ -28,41 +87,235 @@ class SpottingLocationViewSet(viewsets.ModelViewSet):
     queryset = SpottingLocation.objects.select_related("airport").all()
     serializer_class = SpottingLocationSerializer
     permission_classes = [permissions.AllowAny]
+    # The spot itself, plus reading every spot's position on a poll refresh.
+    query_budgets = {"list": 2, "retrieve": 2, "incoming": 3}
+
+    @action(detail=True, methods=["get"])
+    def incoming(self, request, pk=None):
+        """Aircraft due to pass this spot within the live traffic horizon, soonest first."""
+
+        spot = self.get_object()
+        try:
+            return Response(spot_traffic.incoming(spot.pk))
+        except spot_traffic.LiveTrafficError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
 class PhotoViewSet(viewsets.ModelViewSet):
+    """Spotting photos; ``?collapse=1`` hides exact and near-duplicates of earlier uploads."""
+
     queryset = Photo.objects.all()
     serializer_class = PhotoSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budgets = {"list": 2, "retrieve": 2}
+
+    def get_queryset(self):
+        queryset = Photo.objects.all()
+        if self.request.query_params.get("collapse") in ("1", "true"):
+            queryset = queryset.filter(duplicate_of__isnull=True)
+        return queryset
+
+class PhotoUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Resumable photo uploads: create, ``PUT chunk/`` at ``Upload-Offset``, then ``complete/``.
+
+    ``GET`` on an upload reports the offset to resume from; ``DELETE`` aborts it.
+    """
+
+    queryset = PhotoUpload.objects.none()
+    serializer_class = PhotoUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return PhotoUpload.objects.filter(user=self.request.user).select_related("spot")
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        photo_uploads.abort_upload(instance)
+
+    @action(detail=True, methods=["put"])
+    def chunk(self, request, pk=None):
+        upload = self.get_object()
+        raw_offset = request.headers.get("Upload-Offset", request.query_params.get("offset"))
+        try:
+            offset = int(raw_offset)
+            length = int(request.headers.get("Content-Length") or 0)
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "Upload-Offset and Content-Length must be numeric"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Read the body from the raw request stream; touching ``request.data``
+        # would make Django buffer the whole chunk first.
+        try:
+            received = photo_uploads.write_chunk(upload, offset, request.stream, length)
+        except photo_uploads.UploadOffsetMismatch as exc:
+            return Response(
+                {"detail": str(exc), "offset": exc.expected},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except photo_uploads.PhotoUploadError as exc:
+            return Response(
+                {"detail": str(exc), "offset": upload.received},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"id": upload.pk, "offset": received, "size": upload.size})
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            photo, deduplicated = photo_uploads.finalise_upload(upload)
+        except photo_uploads.PhotoUploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        payload = PhotoSerializer(photo, context=self.get_serializer_context()).data
+        payload["deduplicated"] = deduplicated
+        return Response(payload, status=status.HTTP_201_CREATED)
 
 class AircraftViewSet(viewsets.ModelViewSet):
-    queryset = Aircraft.objects.all().order_by("registration")
+    """Known airframes, filterable by ``?operator=`` and ``?family=`` (e.g. ``A320neo``).
+
+    Both filters match exactly and go through the indexed dimension tables.
+    """
+
+    queryset = Aircraft.objects.select_related("aircraft_type", "operator").order_by("registration")
     serializer_class = AircraftSerializer
     permission_classes = [permissions.AllowAny]
+    query_budgets = {"list": 2, "retrieve": 2}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        operator = (params.get("operator") or "").strip()
+        if operator:
+            queryset = queryset.filter(operator__name=operator)
+        family = (params.get("family") or "").strip()
+        if family:
+            queryset = queryset.filter(aircraft_type__family=family)
+        return queryset
 
 class UserSeenViewSet(viewsets.ModelViewSet):
     queryset = UserSeen.objects.none()
     serializer_class = UserSeenSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budgets = {"list": 2, "retrieve": 2}
+    # Imports run the same lookups once per batch.
+    query_repeat_limits = {"import_logbook": None}
 
     def get_queryset(self):
         return (
             UserSeen.objects.filter(user=self.request.user)
-            .select_related("aircraft", "airport")
+            .select_related("aircraft__aircraft_type", "aircraft__operator", "airport")
             .order_by("-seen_at")
         )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=["get"], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Stream the whole logbook as CSV or, for ``Accept: application/x-ndjson``, NDJSON."""
+
+        rows = logbook.export_rows(request.user)
+        renderer = request.accepted_renderer
+        chunks = logbook.ndjson_chunks(rows) if renderer.format == "ndjson" else logbook.csv_chunks(rows)
+        if isinstance(request._request, ASGIRequest):
+            chunks = logbook.aiter_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=renderer.media_type)
+        response["Content-Disposition"] = f'attachment; filename="logbook.{renderer.format}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["get", "post"],
+        url_path="import",
+        parser_classes=[parsers.MultiPartParser, parsers.FormParser],
+    )
+    def import_logbook(self, request):
+        """Import a CSV or NDJSON ``file`` (POST) or report the latest import (GET)."""
+
+        if request.method == "GET":
+            progress = logbook.import_progress(request.user)
+            if progress is None:
+                return Response({"detail": "No logbook import has run."}, status=status.HTTP_404_NOT_FOUND)
+            return Response(progress)
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "Upload the logbook as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            summary = logbook.import_logbook(request.user, upload)
+        except logbook.LogbookImportError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary, status=status.HTTP_201_CREATED if summary["created"] else status.HTTP_200_OK)
+
+def _filter_by_airport(queryset, params, prefix=""):
+    """Narrow a forum queryset by ``?airport=`` (primary key or ICAO code)."""
+
+    airport = (params.get("airport") or "").strip()
+    if not airport:
+        return queryset
+    if airport.isdigit():
+        return queryset.filter(**{f"{prefix}airport_id": int(airport)})
+    return queryset.filter(**{f"{prefix}airport__icao__iexact": airport})
+
+
 class PostViewSet(viewsets.ModelViewSet):
+    """Forum threads, keyset paginated and annotated with their comment counts.
+
+    Listing a page is one query; retrieving a thread is two (the post and its
+    prefetched comments), regardless of how many replies it has.
+    """
+
     queryset = Post.objects.all().order_by("-created")
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budgets = {"list": 2, "retrieve": 3}
+    pagination_class = ForumCursorPagination
+
+    def get_queryset(self):
+        queryset = (
+            Post.objects.select_related("user", "airport")
+            .annotate(comment_count=Count("comments"))
+            .order_by("-created")
+        )
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "comments",
+                    queryset=Comment.objects.select_related("user").order_by("created"),
+                )
+            )
+        return _filter_by_airport(queryset, self.request.query_params)
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return PostDetailSerializer
+        return PostSerializer
 
 class CommentViewSet(viewsets.ModelViewSet):
+    """Comments, filterable by ``?post=`` and ``?airport=`` and keyset paginated."""
+
     queryset = Comment.objects.all().order_by("created")
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budgets = {"list": 2, "retrieve": 2}
+    pagination_class = CommentCursorPagination
+
+    def get_queryset(self):
+        queryset = Comment.objects.select_related("user").order_by("created")
+        params = self.request.query_params
+        post = (params.get("post") or "").strip()
+        if post.isdigit():
+            queryset = queryset.filter(post_id=int(post))
+        return _filter_by_airport(queryset, params, prefix="post__")
 
 class BadgeViewSet(viewsets.ModelViewSet):
     queryset = Badge.objects.all()
@@ -75,25 +328,45 @@ class UserBadgeViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
 
+def _parse_limit(value):
+    # Absent means the default cap; an explicit limit=0 asks for the whole feed,
+    # which is streamed (see core.services.feed_stream).
+    if value in (None, ""):
+        return None
+    return int(value)
+
+
 class LiveFleetView(APIView):
     """Expose a live view of the global aircraft fleet using the configured feed."""
 
     permission_classes = [permissions.AllowAny]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
 
     def get(self, request):
         params = request.query_params
         registration = params.get("registration")
         country = params.get("country")
         try:
-            limit = int(params.get("limit", 0) or 0)
+            limit = _parse_limit(params.get("limit"))
         except ValueError:
             return Response({"detail": "limit must be numeric"}, status=status.HTTP_400_BAD_REQUEST)
 
+        query = FeedQuery.build(registration=registration, country=country, limit=limit)
+        media_type = feed_stream.stream_format(request, query)
+        if media_type:
+            try:
+                records = feed_stream.open_records(query, settings.AIRCRAFT_FEED_URL)
+            except AircraftFeedError as exc:
+                return Response({"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return feed_stream.streaming_response(
+                media_type, records, {"registration": registration, "country": country}
+            )
+
         try:
             results = fetch_live_fleet(
                 registration=registration,
                 country=country,
-                limit=limit or None,
+                limit=limit,
             )
         except AircraftFeedError as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -109,3 +382,109 @@ class LiveFleetView(APIView):
             }
         )
 
+
+def _negotiated_response(request, data, status: int = status.HTTP_200_OK) -> HttpResponse:
+    # Encoded like the DRF views so both /fleet/live/ variants answer alike,
+    # including DRF's ?format= override.
+    msgpack_type = MessagePackRenderer.media_type
+    requested = request.GET.get(api_settings.URL_FORMAT_OVERRIDE or "")
+    if requested:
+        wants_msgpack = requested == MessagePackRenderer.format
+    else:
+        wants_msgpack = request.get_preferred_type(["application/json", msgpack_type]) == msgpack_type
+    if wants_msgpack:
+        return HttpResponse(packb(data), content_type=msgpack_type, status=status)
+    return HttpResponse(render_json(data), content_type="application/json", status=status)
+
+
+class AsyncLiveFleetView(View):
+    """Async twin of :class:`LiveFleetView` serving ``/fleet/live/`` under ASGI.
+
+    Waiting on the upstream feed suspends the request instead of holding a
+    worker thread, so one ASGI worker can carry many slow feed requests.
+    """
+
+    async def get(self, request):
+        params = request.GET
+        registration = params.get("registration")
+        country = params.get("country")
+        try:
+            limit = _parse_limit(params.get("limit"))
+        except ValueError:
+            return _negotiated_response(
+                request, {"detail": "limit must be numeric"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        query = FeedQuery.build(registration=registration, country=country, limit=limit)
+        media_type = feed_stream.stream_format(request, query)
+        if media_type:
+            try:
+                records = await feed_stream.aopen_records(query, settings.AIRCRAFT_FEED_URL)
+            except AircraftFeedError as exc:
+                return _negotiated_response(
+                    request, {"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+            return feed_stream.streaming_response(
+                media_type, records, {"registration": registration, "country": country}
+            )
+
+        try:
+            results = await async_feed.afetch_live_fleet(
+                registration=registration,
+                country=country,
+                limit=limit,
+            )
+        except AircraftFeedError as exc:
+            return _negotiated_response(
+                request, {"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        return _negotiated_response(
+            request,
+            {
+                "count": len(results),
+                "results": results,
+                "filters": {
+                    "registration": registration,
+                    "country": country,
+                },
+            }
+        )
+
+
+class RefreshStatusView(APIView):
+    """Report the background cache refresh jobs and how fresh their caches are."""
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        return Response({"jobs": scheduler.status()})
+
+
+class SearchView(APIView):
+    """Ranked full-text search across posts, comments, spotting locations and airports."""
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        query = (params.get("q") or "").strip()
+        if not query:
+            return Response({"detail": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        kinds = [kind for kind in params.getlist("type") if kind]
+        unknown = sorted(set(kinds) - set(search.SEARCH_KINDS))
+        if unknown:
+            return Response(
+                {"detail": f"Unknown type: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            limit = int(params.get("limit", 20) or 20)
+        except ValueError:
+            return Response({"detail": "limit must be numeric"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, 100))
+
+        results = search.search(query, kinds=kinds or None, limit=limit)
+        return Response({"count": len(results), "query": query, "results": results})
@@ -1,7 +1,9 @@
 "use client";
 
 import Link from "next/link";
-import { useDeferredValue, useMemo, useState } from "react";
+import { useDeferredValue, useEffect, useMemo, useState } from "react";
+
+import { API_BASE } from "@/lib/api";
 
 type Airport = {
   id: number;
@@ -12,80 +14,70 @@ type Airport = {
   country: string;
 };
 
+export type AirportDirectory = {
+  airports: number;
+  countries: string[];
+  cities: number;
+};
+
 type AirportsExplorerProps = {
-  airports: Airport[];
+  initialAirports: Airport[];
+  directory: AirportDirectory;
 };
 
 const CONTROL_CLASSES =
   "rounded-2xl border border-white/10 bg-white/5 px-4 py-3 text-sm text-slate-100 shadow-inner shadow-black/20 focus:border-cyan-400/60 focus:outline-none focus:ring-2 focus:ring-cyan-400/20";
 
-function sortAirports(a: Airport, b: Airport) {
-  return a.icao.localeCompare(b.icao);
-}
-
-function normalise(value: string) {
-  return value.toLowerCase();
-}
+// The most matches the autocomplete endpoint returns per query.
+const AUTOCOMPLETE_LIMIT = 50;
 
-export function AirportsExplorer({ airports }: AirportsExplorerProps) {
+export function AirportsExplorer({ initialAirports, directory }: AirportsExplorerProps) {
   const [search, setSearch] = useState("");
   const [countryFilter, setCountryFilter] = useState("all");
 
   const deferredSearch = useDeferredValue(search);
+  const [matches, setMatches] = useState<Airport[] | null>(null);
 
-  const sortedAirports = useMemo(() => {
-    return [...airports].sort(sortAirports);
-  }, [airports]);
-
-  const countries = useMemo(() => {
-    const set = new Set<string>();
-    airports.forEach((airport) => {
-      if (airport.country) {
-        set.add(airport.country);
-      }
-    });
-    return [...set].sort((a, b) => a.localeCompare(b));
-  }, [airports]);
-
-  const filteredAirports = useMemo(() => {
-    const hasQuery = deferredSearch.trim().length > 0;
-    const query = normalise(deferredSearch.trim());
-
-    return sortedAirports.filter((airport) => {
-      if (countryFilter !== "all" && airport.country !== countryFilter) {
-        return false;
-      }
-
-      if (!hasQuery) {
-        return true;
-      }
-
-      const target = `${airport.icao} ${airport.iata} ${airport.name} ${airport.city} ${airport.country}`;
-      return normalise(target).includes(query);
-    });
-  }, [countryFilter, deferredSearch, sortedAirports]);
+  useEffect(() => {
+    const query = deferredSearch.trim();
+    if (!query && countryFilter === "all") {
+      setMatches(null);
+      return;
+    }
+
+    // Ranked matches come from the server's index, filtered by country there,
+    // so the browser never needs the full airport list.
+    const controller = new AbortController();
+    const params = new URLSearchParams({ q: query, limit: String(AUTOCOMPLETE_LIMIT) });
+    if (countryFilter !== "all") {
+      params.set("country", countryFilter);
+    }
+    fetch(`${API_BASE}/airports/autocomplete/?${params}`, { signal: controller.signal })
+      .then((res) => (res.ok ? res.json() : Promise.reject(new Error(`autocomplete failed: ${res.status}`))))
+      .then((data: { results: Airport[] }) => setMatches(data.results))
+      .catch((error) => {
+        if (!controller.signal.aborted) {
+          console.error("Failed to load airport matches", error);
+          setMatches([]);
+        }
+      });
+
+    return () => controller.abort();
+  }, [deferredSearch, countryFilter]);
+
+  const filteredAirports = matches ?? initialAirports;
 
   const resultSummary = useMemo(() => {
     if (!filteredAirports.length) {
       return "No airports match the current filters";
     }
 
-    if (filteredAirports.length === airports.length) {
-      return `${airports.length} airports available`;
+    if (filteredAirports.length === directory.airports) {
+      return `${directory.airports} airports available`;
     }
 
-    return `${filteredAirports.length} of ${airports.length} airports shown`;
-  }, [airports.length, filteredAirports.length]);
-
-  const distinctCities = useMemo(() => {
-    const set = new Set<string>();
-    airports.forEach((airport) => {
-      if (airport.city) {
-        set.add(`${airport.city}, ${airport.country}`);
-      }
-    });
-    return set.size;
-  }, [airports]);
+    return `${filteredAirports.length} of ${directory.airports} airports shown`;
+  }, [directory.airports, filteredAirports.length]);
 
   const handleReset = () => {
     setSearch("");
@@ -132,7 +124,7 @@ export function AirportsExplorer({ airports }: AirportsExplorerProps) {
             className={CONTROL_CLASSES}
           >
             <option value="all">All countries</option>
-            {countries.map((country) => (
+            {directory.countries.map((country) => (
               <option key={country} value={country}>
                 {country}
               </option>
@@ -153,9 +145,9 @@ export function AirportsExplorer({ airports }: AirportsExplorerProps) {
       </div>
 
       <div className="grid gap-4 sm:grid-cols-3">
-        <StatCard label="Airports covered" value={airports.length.toString()} />
-        <StatCard label="Countries represented" value={countries.length.toString()} />
-        <StatCard label="Spotting cities" value={distinctCities.toString()} />
+        <StatCard label="Airports covered" value={directory.airports.toString()} />
+        <StatCard label="Countries represented" value={directory.countries.length.toString()} />
+        <StatCard label="Spotting cities" value={directory.cities.toString()} />
       </div>
 
       <div className="flex items-center justify-between text-xs uppercase tracking-[0.3em] text-slate-400">
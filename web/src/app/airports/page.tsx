@@ -1,6 +1,6 @@
 import { PageWrapper } from "@/app/components/page-wrapper";
 import { apiGet } from "@/lib/api";
-import { AirportsExplorer } from "./airports-explorer";
+import { AirportsExplorer, type AirportDirectory } from "./airports-explorer";
 
 type Airport = {
   id: number;
@@ -11,12 +11,23 @@ type Airport = {
   country: string;
 };
 
+// Airports listed before the user searches or picks a country.
+const FIRST_PAGE_SIZE = 50;
+
 export default async function AirportsPage() {
   let airports: Airport[] = [];
+  let directory: AirportDirectory = { airports: 0, countries: [], cities: 0 };
   let loadError: string | null = null;
 
   try {
-    airports = await apiGet<Airport[]>("/airports/");
+    // The most popular airports and the directory's totals; searching and
+    // filtering by country are answered by the server as the user types.
+    const [firstPage, summary] = await Promise.all([
+      apiGet<{ results: Airport[] }>(`/airports/autocomplete/?limit=${FIRST_PAGE_SIZE}`),
+      apiGet<AirportDirectory>("/airports/directory/"),
+    ]);
+    airports = firstPage.results;
+    directory = summary;
   } catch (error) {
     const message =
       error instanceof Error
@@ -48,7 +59,7 @@ export default async function AirportsPage() {
           </p>
         </div>
       ) : (
-        <AirportsExplorer airports={airports} />
+        <AirportsExplorer initialAirports={airports} directory={directory} />
       )}
     </PageWrapper>
   );